@@ -42,6 +42,7 @@ HEATMAPS_DIR.mkdir(exist_ok=True)
 ATLETA_STATE_FILE = HEATMAPS_DIR / '.atleta_state.json'
 
 CAPTURA_LOG = Path('/tmp/captura_script.log')
+CAPTURA_PREVIEW = Path('/tmp/captura_preview.jpg')
 HISTORICO_FILE = Path('historico_capturas.json')
 
 # Estado global da captura em andamento
@@ -122,10 +123,10 @@ def _recuperar_revisao_do_disco() -> dict:
 _captura_refs_state = {}
 
 
-# Obter IDs únicos
+# Obter IDs únicos (ESQ_id_12.jpg = melhor crop; ESQ_id_12_2.jpg, _3... = demais do top-K)
 ids_dict = defaultdict(list)
-for img_path in IMG_DIR.glob('*.jpg'):
-    id_num = img_path.stem.split('_id_')[1]
+for img_path in sorted(IMG_DIR.glob('*.jpg')):
+    id_num = img_path.stem.split('_id_')[1].split('_')[0]
     ids_dict[id_num].append(img_path.name)
 
 IDS_SORTED = sorted(ids_dict.keys(), key=int)
@@ -213,7 +214,7 @@ def salvar():
     if nome == 'DESCARTADO':
         descartados_dir = IMG_DIR / '_descartados'
         descartados_dir.mkdir(exist_ok=True)
-        for img in IMG_DIR.glob(f'*_id_{id_num}.*'):
+        for img in [*IMG_DIR.glob(f'*_id_{id_num}.*'), *IMG_DIR.glob(f'*_id_{id_num}_*.*')]:
             img.rename(descartados_dir / img.name)
             moved += 1
 
@@ -742,12 +743,18 @@ def api_videos_processar():
         model      = data.get('model', 'yolo11n.pt').strip()
         confidence = str(data.get('confidence', 0.5))
         output_dir = data.get('output_dir', 'jogadores_terca').strip() or 'jogadores_terca'
+        ao_vivo    = bool(data.get('ao_vivo', False))
+        retomar    = bool(data.get('retomar', False))
+        workers    = bool(data.get('workers', False))
+        alvo       = str(data.get('alvo', '') or '').strip()
 
         if not video_esq and not video_dir:
             return jsonify({'success': False, 'error': 'Nenhum vídeo selecionado'}), 400
 
-        # Limpa log anterior
+        # Limpa log e preview anteriores
         CAPTURA_LOG.write_text('')
+        if CAPTURA_PREVIEW.exists():
+            CAPTURA_PREVIEW.unlink()
 
         script_path = executor.scripts_dir / 'script.py'
         cmd = executor.get_python_command() + [str(script_path), '--headless']
@@ -756,6 +763,20 @@ def api_videos_processar():
         if video_dir:
             cmd += ['--video-dir', video_dir]
         cmd += ['--model', model, '--confidence', confidence, '--output-dir', output_dir]
+        # Preview throttled: o script só anota os frames que vão para o preview
+        cmd += ['--preview', str(CAPTURA_PREVIEW), '--preview-fps', '1']
+        # Ao vivo: URLs seguem o frame mais recente em vez de acumular atraso
+        if ao_vivo:
+            cmd += ['--live']
+        # Retoma do checkpoint gravado quando a captura anterior foi parada
+        if retomar:
+            cmd += ['--resume']
+        # Uma câmera por processo (modelo e threads próprios por câmera)
+        if workers:
+            cmd += ['--workers']
+        # Controle de qualidade: imgsz/stride ajustados para sustentar a taxa (ajustes vão para o log)
+        if alvo:
+            cmd += ['--alvo', alvo]
 
         log_file = open(CAPTURA_LOG, 'w', buffering=1)
         process = subprocess.Popen(
@@ -838,6 +859,16 @@ def api_videos_status():
     })
 
 
+@app.route('/api/videos/preview', methods=['GET'])
+def api_videos_preview():
+    """Serve o frame anotado mais recente da captura em andamento."""
+    if not CAPTURA_PREVIEW.exists():
+        return '', 204
+    resp = send_file(str(CAPTURA_PREVIEW), mimetype='image/jpeg')
+    resp.headers['Cache-Control'] = 'no-store'
+    return resp
+
+
 def _salvar_historico(imgs_new, imgs_total):
     """Salva entrada no histórico de capturas (JSON append)."""
     try:
@@ -906,20 +937,18 @@ def atleta_upload_fotos():
 
     # Se nenhuma foto enviada, usar imagens já existentes (crops do extrator)
     if not caminhos:
-        caminhos = [str(p) for p in sorted(atleta_dir.glob('*.jpg'))
-                    if p.name != 'embedding.json']
+        caminhos = [str(p) for p in sorted(atleta_dir.glob('*.jpg'))]
         caminhos += [str(p) for p in sorted(atleta_dir.glob('*.png'))]
 
     if not caminhos:
         return jsonify({'success': False, 'error': 'Nenhuma foto disponível. Envie fotos ou use o extrator.'}), 400
 
     try:
+        from scripts import banco_embeddings, pool_modelos
         embedding = gerar_embedding_referencia(caminhos)
-        emb_file  = atleta_dir / 'embedding.json'
-        emb_file.write_text(
-            json.dumps({'nome': nome, 'embedding': embedding}, ensure_ascii=False),
-            encoding='utf-8'
-        )
+        # embedding.npy + manifest (tem precedência sobre um embedding.json antigo)
+        banco_embeddings.salvar_referencia(atleta_dir, nome, embedding,
+                                           modelo=pool_modelos.obter_embedder().nome)
         return jsonify({'success': True, 'nome': nome, 'n_fotos': len(caminhos)})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -975,9 +1004,8 @@ def atleta_extrair_frame():
         if not ret:
             return jsonify({'success': False, 'error': f'Frame no timestamp {ts}s não encontrado'}), 400
 
-        from ultralytics import YOLO
-        yolo  = YOLO('yolo11n.pt', verbose=False)
-        yolo.to('cpu')
+        from scripts import pool_modelos
+        yolo  = pool_modelos.obter_detector()     # já carregado e aquecido no startup
         h_fr, w_fr = frame.shape[:2]
         results = yolo(frame, classes=[0], verbose=False)[0]
         boxes   = []
@@ -1141,7 +1169,7 @@ def atleta_capturar_refs():
     Roda em background thread; use /api/atleta/capturar_refs/status para acompanhar.
     Após varredura muda status para 'aguardando_revisao' com lista de candidatos (base64).
     """
-    import threading, json as _json, base64 as _b64
+    import threading, base64 as _b64
     global _captura_refs_state
 
     data          = request.get_json() or {}
@@ -1155,8 +1183,8 @@ def atleta_capturar_refs():
     if not nome or not src:
         return jsonify({'success': False, 'error': 'Nome e fonte são obrigatórios'}), 400
 
-    emb_file = ATLETA_REFS_DIR / nome / 'embedding.json'
-    if not emb_file.exists():
+    from scripts import banco_embeddings
+    if not banco_embeddings.tem_referencia(ATLETA_REFS_DIR / nome):
         return jsonify({'success': False,
                         'error': f'Embedding não encontrado para "{nome}". Gere primeiro.'}), 400
 
@@ -1169,14 +1197,11 @@ def atleta_capturar_refs():
     def _run():
         global _captura_refs_state
         try:
-            # CPU PyTorch (GPU desabilitada)
-            from scripts.analisar_atleta import _build_model, _embedding as _emb_fn
-            model_emb = _build_model()
-            print('[CAPTURA] ReID via PyTorch CPU', flush=True)
-            from ultralytics import YOLO
+            from scripts import pool_modelos
+            embedder = pool_modelos.obter_embedder()   # instância compartilhada (scripts/pool_modelos.py)
+            print(f'[CAPTURA] ReID via {embedder.backend} ({embedder.nome})', flush=True)
 
-            emb_data = _json.loads(emb_file.read_text())
-            ref_emb  = np.array(emb_data['embedding'] if isinstance(emb_data, dict) else emb_data)
+            ref_emb  = banco_embeddings.carregar_referencia(ATLETA_REFS_DIR / nome)
 
             if src.startswith('http'):
                 result = subprocess.run(
@@ -1197,8 +1222,7 @@ def atleta_capturar_refs():
             dur_s    = total_fr / fps
             step_fr  = max(1, int(step_s * fps))
 
-            yolo       = YOLO('yolo11n.pt', verbose=False)
-            yolo.to('cpu')
+            yolo       = pool_modelos.obter_detector()
 
             atleta_dir  = ATLETA_REFS_DIR / nome
             atleta_dir.mkdir(exist_ok=True)
@@ -1248,7 +1272,7 @@ def atleta_capturar_refs():
                         avaliados += 1
                         continue
 
-                    emb = _emb_fn(model_emb, crop)
+                    emb = embedder.embedding(crop)
                     sim = float(np.dot(emb, ref_emb))
                     avaliados += 1
 
@@ -1339,7 +1363,7 @@ def atleta_testar_rastreamento():
     Extrai um frame, roda YOLO + ReID e devolve o frame anotado:
     caixa âmbar = match acima do limiar, cinza = descartado.
     """
-    import base64, json as _json
+    import base64
     data      = request.get_json() or {}
     nome      = data.get('nome', '').strip()
     src       = data.get('src', '').strip()
@@ -1349,14 +1373,13 @@ def atleta_testar_rastreamento():
     if not nome or not src:
         return jsonify({'success': False, 'error': 'Nome e fonte são obrigatórios'}), 400
 
-    emb_file = ATLETA_REFS_DIR / nome / 'embedding.json'
-    if not emb_file.exists():
+    from scripts import banco_embeddings
+    if not banco_embeddings.tem_referencia(ATLETA_REFS_DIR / nome):
         return jsonify({'success': False,
                         'error': f'Embedding não encontrado para "{nome}". Gere primeiro.'}), 400
 
     try:
-        emb_data = _json.loads(emb_file.read_text())
-        ref_emb = np.array(emb_data['embedding'] if isinstance(emb_data, dict) else emb_data)
+        ref_emb = banco_embeddings.carregar_referencia(ATLETA_REFS_DIR / nome)
 
         if src.startswith('http'):
             result = subprocess.run(
@@ -1388,20 +1411,18 @@ def atleta_testar_rastreamento():
             return jsonify({'success': False,
                             'error': f'Frame no timestamp {ts}s não encontrado'}), 400
 
-        from ultralytics import YOLO
-        # CPU PyTorch (GPU desabilitada)
-        from scripts.analisar_atleta import _build_model, _embedding as _emb_fn
-        model_emb = _build_model()
-        print('[TESTAR] ReID via PyTorch CPU', flush=True)
+        from scripts import pool_modelos
+        embedder = pool_modelos.obter_embedder()   # instância compartilhada (scripts/pool_modelos.py)
+        print(f'[TESTAR] ReID via {embedder.backend} ({embedder.nome})', flush=True)
 
-        yolo      = YOLO('yolo11n.pt', verbose=False)
-        yolo.to('cpu')
+        yolo      = pool_modelos.obter_detector()
         h_fr, w_fr = frame.shape[:2]
         results   = yolo(frame, classes=[0], verbose=False)[0]
 
         annotated = frame.copy()
         n_matches = 0
 
+        caixas, crops = [], []
         for box in results.boxes:
             x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
             x1, y1 = max(0, x1), max(0, y1)
@@ -1409,9 +1430,13 @@ def atleta_testar_rastreamento():
             crop = frame[y1:y2, x1:x2]
             if crop.size == 0:
                 continue
+            caixas.append((x1, y1, x2, y2))
+            crops.append(crop)
 
-            emb     = _emb_fn(model_emb, crop)
-            sim     = float(np.dot(emb, ref_emb))
+        # Todos os crops do frame numa única chamada ao embedder
+        sims = embedder.embeddings(crops) @ ref_emb if crops else []
+        for (x1, y1, x2, y2), sim in zip(caixas, sims):
+            sim     = float(sim)
             matched = sim >= threshold
 
             if matched:
@@ -1459,14 +1484,16 @@ def atleta_analisar():
     nome      = data.get('nome', '').strip()
     video     = data.get('video', '').strip()
     threshold = float(data.get('threshold', 0.65))
+    fatias    = max(1, int(data.get('fatias', 1)))   # >1: vídeo dividido entre processos
+    alvo      = str(data.get('alvo', '') or '').strip() or None   # tempo-real | 2x | fps
 
     if not nome:
         return jsonify({'success': False, 'error': 'Nome do atleta é obrigatório'}), 400
     if not video:
         return jsonify({'success': False, 'error': 'Vídeo é obrigatório'}), 400
 
-    emb_file = ATLETA_REFS_DIR / nome / 'embedding.json'
-    if not emb_file.exists():
+    from scripts import banco_embeddings
+    if not banco_embeddings.tem_referencia(ATLETA_REFS_DIR / nome):
         return jsonify({
             'success': False,
             'error': f'Embedding de "{nome}" não encontrado. Envie as fotos primeiro.'
@@ -1486,8 +1513,7 @@ def atleta_analisar():
     if _atleta_state.get('status') == 'rodando':
         return jsonify({'success': False, 'error': 'Análise já em andamento'}), 400
 
-    ref_data      = json.loads(emb_file.read_text(encoding='utf-8'))
-    ref_embedding = ref_data['embedding']
+    ref_embedding = banco_embeddings.carregar_referencia(ATLETA_REFS_DIR / nome)
 
     preview_path = f'/tmp/atleta_preview_{nome.replace(" ","_")}.jpg'
     _atleta_state = {
@@ -1522,7 +1548,7 @@ def atleta_analisar():
                 path = tmp_file
                 _atleta_state.update({'progresso': 5, 'msg': 'Download concluído. Analisando...'})
 
-            resultado = analisar_video(path, ref_embedding, _atleta_state)
+            resultado = analisar_video(path, ref_embedding, _atleta_state, fatias, alvo)
             ts = datetime.now().strftime('%Y%m%d_%H%M%S')
             nome_arquivo = f'heatmap_{nome}_{ts}.png'
             csv_arquivo  = f'posicoes_{nome}_{ts}.csv'
@@ -1588,10 +1614,11 @@ def atleta_csv_download(filename):
 @app.route('/api/atleta/atletas', methods=['GET'])
 def atleta_listar():
     """Lista atletas com embedding gerado."""
+    from scripts import banco_embeddings
     atletas = []
     if ATLETA_REFS_DIR.exists():
         for d in sorted(ATLETA_REFS_DIR.iterdir()):
-            if d.is_dir() and (d / 'embedding.json').exists():
+            if d.is_dir() and banco_embeddings.tem_referencia(d):
                 n_fotos = len(list(d.glob('*.jpg'))) + len(list(d.glob('*.png')))
                 atletas.append({'nome': d.name, 'n_fotos': n_fotos})
     return jsonify({'success': True, 'atletas': atletas})
@@ -1702,6 +1729,13 @@ def atleta_matriz_confusao():
         return jsonify({'erro': f'Erro: {e}'}), 500
 
 
+@app.route('/api/modelos/status', methods=['GET'])
+def modelos_status():
+    """Estado do pool de modelos: carga, aquecimento e memória de cada um."""
+    from scripts import pool_modelos
+    return jsonify(pool_modelos.status())
+
+
 # Recuperar candidatos .revisao/ pendentes de sessões anteriores
 _captura_refs_state = _recuperar_revisao_do_disco()
 
@@ -1718,5 +1752,10 @@ if __name__ == '__main__':
     print(f"🏷️  Classificar: http://localhost:5001/classificar")
     print("\n   Pressione Ctrl+C para sair\n")
     print("="*70 + "\n")
+
+    # Com o reloader do debug, só o processo filho (WERKZEUG_RUN_MAIN) serve requisições
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        from scripts import pool_modelos
+        pool_modelos.aquecer()     # YOLO + ReID carregados em segundo plano
     
     app.run(debug=True, port=5001)
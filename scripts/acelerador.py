@@ -2,38 +2,53 @@
 Acelerador de inferência via OpenVINO (Intel UHD GPU + CPU otimizado).
 
 Exports (feitos uma vez na primeira execução):
-  - scripts/reid_backbone.onnx  → ResNet50 backbone para ReID
+  - scripts/reid_backbone.onnx  → ResNet50 backbone para ReID (eixo de batch dinâmico)
+
+Precisão do ReID (argumento → variável REID_PRECISAO → 'fp32'):
+  - 'fp32' → reid_backbone.onnx
+  - 'int8' → scripts/reid_backbone_int8.xml, IR quantizado pelo NNCF com crops
+             reais (gerado por `python -m scripts.quantizar_reid`, que também
+             mede ganho de latência e deriva de similaridade contra o FP32)
+
+ReID em lote: embeddings(crops) agrupa até 32 crops no menor lote de 8/16/32
+que couber. Cada tamanho é compilado uma vez com
+shape estático e o lote é completado com zeros — um frame com 20 jogadores é
+uma única inferência de 32, não 20 de 1.
+
+Muitos crops de uma vez (mais que o maior lote — fotos de referência, datasets):
+fila assíncrona (AsyncInferQueue) compilada com PERFORMANCE_HINT=THROUGHPUT.
+Vários pedidos de LOTE_ASSINCRONO crops ficam em voo (um por stream de CPU) e
+o callback de cada um escreve os embeddings na matriz de saída pré-alocada;
+enquanto isso o processo principal já pré-processa o próximo lote. O caminho
+síncrono (um frame) segue compilado com PERFORMANCE_HINT=LATENCY.
 
 Hierarquia de dispositivos:
   ReID  → GPU > CPU  (OpenVINO)
-  YOLO  → PyTorch CPU (mais rápido que OV para este modelo)
+  YOLO  → detector_backend.py (PyTorch/OpenVINO/ONNX; o mais rápido é medido por host)
 """
 
 from __future__ import annotations
+import os
+import threading
 import time
 from pathlib import Path
 
-import cv2
 import numpy as np
 import torch
 import torch.nn as nn
-from PIL import Image
-from torchvision import transforms
+
+from scripts.preprocessamento_reid import IMG_SIZE, preprocessar
 
 SCRIPTS_DIR = Path(__file__).parent
 ONNX_REID   = SCRIPTS_DIR / 'reid_backbone.onnx'
-IMG_SIZE    = (256, 128)
-
-_transform = transforms.Compose([
-    transforms.Resize(IMG_SIZE),
-    transforms.ToTensor(),
-    transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
-])
-
+REID_INT8   = SCRIPTS_DIR / 'reid_backbone_int8.xml'   # + .bin (quantizar_reid.py)
+PRECISOES   = ('fp32', 'int8')
+LOTES_REID  = (1, 8, 16, 32)     # tamanhos compilados (1 = embedding() de um crop só)
+LOTE_ASSINCRONO = 8              # crops por pedido da fila assíncrona
 
 # ─── Export helper ────────────────────────────────────────────────
 def _exportar_reid_onnx() -> None:
-    """Exporta ResNet50 backbone para ONNX (executado só uma vez)."""
+    """Exporta ResNet50 backbone para ONNX com batch dinâmico (executado só uma vez)."""
     from torchvision import models
     print('[ACELERADOR] Exportando ResNet50 → ONNX ...', flush=True)
     resnet   = models.resnet50(weights=models.ResNet50_Weights.IMAGENET1K_V2)
@@ -43,46 +58,132 @@ def _exportar_reid_onnx() -> None:
         backbone, dummy, str(ONNX_REID),
         opset_version=11,
         input_names=['input'], output_names=['output'],
+        dynamic_axes={'input': {0: 'batch'}, 'output': {0: 'batch'}},
     )
     print(f'[ACELERADOR] ONNX salvo → {ONNX_REID}', flush=True)
 
 
+def garantir_onnx(core) -> Path:
+    """reid_backbone.onnx com batch dinâmico em disco (exporta/refaz se preciso)."""
+    if ONNX_REID.exists() and core.read_model(str(ONNX_REID)).input(0).get_partial_shape()[0].is_static:
+        # Export antigo (1,3,256,128): refaz com o eixo de batch dinâmico
+        print('[ACELERADOR] ONNX com batch fixo — exportando de novo', flush=True)
+        ONNX_REID.unlink()
+    if not ONNX_REID.exists():
+        _exportar_reid_onnx()
+    return ONNX_REID
+
+
+def resolver_precisao(precisao: str = None) -> str:
+    """Argumento → variável REID_PRECISAO → 'fp32'."""
+    precisao = (precisao or os.environ.get('REID_PRECISAO') or 'fp32').lower()
+    if precisao not in PRECISOES:
+        raise ValueError(f"Precisão do ReID desconhecida: {precisao} (use {', '.join(PRECISOES)})")
+    return precisao
+
+
 # ─── OpenVINO ReID ────────────────────────────────────────────────
 class ReIDAccelerado:
     """
     Extrator de embeddings ReID com OpenVINO.
     Usa GPU Intel se disponível, cai para CPU OpenVINO otimizado.
+    precisao: 'fp32' (ONNX) ou 'int8' (IR quantizado); padrão REID_PRECISAO.
     """
 
-    def __init__(self):
+    def __init__(self, precisao: str = None):
         import openvino as ov
 
-        if not ONNX_REID.exists():
-            _exportar_reid_onnx()
+        core = ov.Core()
+        self.precisao = resolver_precisao(precisao)
+        if self.precisao == 'int8':
+            if not REID_INT8.exists():
+                raise FileNotFoundError(f'{REID_INT8} não encontrado — rode: python -m scripts.quantizar_reid')
+            self._modelo = REID_INT8
+        else:
+            self._modelo = garantir_onnx(core)
 
-        core    = ov.Core()
         devices = core.available_devices
         device  = 'CPU'   # GPU desabilitada — evitar travamentos
-        print(f'[ACELERADOR] ReID compilando para {device} '
+        print(f'[ACELERADOR] ReID {self.precisao.upper()} compilando para {device} '
               f'(disponíveis: {devices}) ...', flush=True)
 
-        t0    = time.perf_counter()
-        model = core.read_model(str(ONNX_REID))
-        self._infer = core.compile_model(model, device).create_infer_request()
-        self._device = device
+        self._core    = core
+        self._device  = device
+        self._lotes   = {}     # tamanho do lote → infer request (compilado na primeira vez)
+        self._fila    = None   # AsyncInferQueue (THROUGHPUT), criada no primeiro uso
+        self._lock    = threading.Lock()   # singleton compartilhado pelas threads do Flask
+        t0 = time.perf_counter()
+        self._request(1)
         print(f'[ACELERADOR] ReID pronto em {device} '
               f'({(time.perf_counter()-t0)*1000:.0f} ms de compilação)', flush=True)
 
+    def _compilar(self, lote: int, hint: str):
+        """Modelo compilado com shape estático (lote, 3, H, W) e o hint de desempenho dado."""
+        model = self._core.read_model(str(self._modelo))
+        model.reshape({0: [lote, 3, IMG_SIZE[0], IMG_SIZE[1]]})
+        return self._core.compile_model(model, self._device, {'PERFORMANCE_HINT': hint})
+
+    def _request(self, lote: int):
+        """Infer request síncrono para lotes desse tamanho (latência mínima)."""
+        if lote not in self._lotes:
+            self._lotes[lote] = self._compilar(lote, 'LATENCY').create_infer_request()
+        return self._lotes[lote]
+
+    def _fila_assincrona(self):
+        """AsyncInferQueue com um pedido por stream que o hint THROUGHPUT escolher."""
+        if self._fila is None:
+            from openvino import AsyncInferQueue
+
+            t0 = time.perf_counter()
+            compilado = self._compilar(LOTE_ASSINCRONO, 'THROUGHPUT')
+            self._fila = AsyncInferQueue(compilado, 0)   # 0 = OPTIMAL_NUMBER_OF_INFER_REQUESTS
+            self._dim  = int(np.prod(compilado.output(0).get_shape()[1:]))
+            print(f'[ACELERADOR] Fila assíncrona: {len(self._fila)} pedidos × {LOTE_ASSINCRONO} crops '
+                  f'({(time.perf_counter()-t0)*1000:.0f} ms de compilação)', flush=True)
+        return self._fila
+
+    def _embeddings_assincronos(self, crops: list) -> np.ndarray:
+        """Todos os crops pela fila assíncrona; pré-processamento sobreposto à inferência."""
+        fila  = self._fila_assincrona()
+        saida = np.empty((len(crops), self._dim), dtype=np.float32)
+
+        def _concluido(request, userdata):
+            inicio, n = userdata
+            saida[inicio:inicio + n] = request.get_output_tensor(0).data[:n].reshape(n, -1)
+
+        fila.set_callback(_concluido)
+        entrada = np.empty((LOTE_ASSINCRONO, 3, *IMG_SIZE), dtype=np.float32)
+        for inicio in range(0, len(crops), LOTE_ASSINCRONO):
+            grupo = crops[inicio:inicio + LOTE_ASSINCRONO]
+            preprocessar(grupo, entrada)
+            # start_async copia a entrada para o tensor do pedido (o buffer pode ser reusado)
+            fila.start_async({'input': entrada}, (inicio, len(grupo)))
+        fila.wait_all()
+        return saida
+
+    @staticmethod
+    def _lote_para(n: int) -> int:
+        """Menor tamanho compilado que comporta n crops (n ≤ maior lote)."""
+        return next(b for b in LOTES_REID if b >= n)
+
+    def embeddings(self, crops: list) -> np.ndarray:
+        """Matriz (N, D) de embeddings L2-normalizados, dados N crops em BGR."""
+        if not len(crops):
+            return np.zeros((0, 0), dtype=np.float32)
+        with self._lock:
+            if len(crops) > LOTES_REID[-1]:
+                embs = self._embeddings_assincronos(crops)
+            else:
+                lote    = self._lote_para(len(crops))
+                entrada = preprocessar(crops, np.empty((lote, 3, *IMG_SIZE), dtype=np.float32))
+                infer = self._request(lote)
+                infer.infer({'input': entrada})
+                embs = infer.get_output_tensor(0).data[:len(crops)].reshape(len(crops), -1).copy()
+        return embs / (np.linalg.norm(embs, axis=1, keepdims=True) + 1e-8)
+
     def embedding(self, crop_bgr: np.ndarray) -> np.ndarray:
         """Retorna embedding L2-normalizado dado um crop em BGR."""
-        rgb = cv2.cvtColor(crop_bgr, cv2.COLOR_BGR2RGB)
-        img = Image.fromarray(rgb)
-        t   = _transform(img).unsqueeze(0).numpy()          # (1,3,H,W) float32
-        self._infer.infer({'input': t})
-        out  = self._infer.get_output_tensor(0).data.copy()
-        emb  = out.squeeze()
-        norm = np.linalg.norm(emb)
-        return emb / (norm + 1e-8)
+        return self.embeddings([crop_bgr])[0]
 
     @property
     def device(self) -> str:
@@ -90,17 +191,16 @@ class ReIDAccelerado:
 
 
 # ─── Singleton por processo ────────────────────────────────────────
-_reid_instance: ReIDAccelerado | None = None
+_reid_instances: dict[str, ReIDAccelerado] = {}
 
-def get_reid() -> ReIDAccelerado:
-    """Retorna instância singleton do extrator ReID acelerado."""
-    global _reid_instance
-    if _reid_instance is None:
-        _reid_instance = ReIDAccelerado()
-    return _reid_instance
+def get_reid(precisao: str = None) -> ReIDAccelerado:
+    """Retorna instância singleton (uma por precisão) do extrator ReID acelerado."""
+    precisao = resolver_precisao(precisao)
+    if precisao not in _reid_instances:
+        _reid_instances[precisao] = ReIDAccelerado(precisao)
+    return _reid_instances[precisao]
 
 
 def reset_reid() -> None:
-    """Força recriação do modelo (útil após nova exportação)."""
-    global _reid_instance
-    _reid_instance = None
+    """Força recriação do modelo (útil após nova exportação ou quantização)."""
+    _reid_instances.clear()
@@ -8,18 +8,18 @@ Pipeline:
 """
 
 import csv
+import os
+from contextlib import nullcontext
 import cv2
 import torch
-import torch.nn as nn
 import numpy as np
 from pathlib import Path
-from torchvision import transforms, models
-from PIL import Image
+
+from scripts.preprocessamento_reid import preprocessar
 
 # ─── Configurações ────────────────────────────────────────────────
 SIMILARITY_THRESHOLD = 0.65   # Limiar padrão — abaixar para mais detecções
 SKIP_FRAMES = 3               # Analisa 1 a cada N frames (velocidade vs precisão)
-IMG_SIZE = (256, 128)         # Altura × Largura padrão ReID
 MODEL_NAME = 'osnet_x1_0'    # Modelo padrão (tenta OSNet, fallback ResNet50)
 
 device = torch.device('cpu')   # GPU desabilitada — usar apenas RAM
@@ -27,115 +27,100 @@ device = torch.device('cpu')   # GPU desabilitada — usar apenas RAM
 
 # ─── Modelo ───────────────────────────────────────────────────────
 def _build_model(model_name: str = MODEL_NAME):
-    """Constrói backbone de ReID. Tenta OSNet via timm, fallback ResNet50."""
+    """Constrói backbone de ReID (PyTorch eager). Tenta OSNet via timm, fallback ResNet50."""
+    from scripts.embedders import modulo_torch
     if model_name.startswith('osnet'):
         try:
             import timm
-            model = timm.create_model(model_name, pretrained=True, num_classes=0)
-            model.eval()
+            model = timm.create_model(model_name, pretrained=True, num_classes=0).eval()
             print(f'[MODELO] {model_name} carregado via timm', flush=True)
             return model.to(device)
         except Exception as e:
             print(f'[AVISO] OSNet falhou ({e}), usando ResNet50', flush=True)
     # Fallback: ResNet50
-    resnet = models.resnet50(weights=models.ResNet50_Weights.IMAGENET1K_V2)
-    backbone = nn.Sequential(*list(resnet.children())[:-1])
-    backbone.eval()
+    model = modulo_torch('resnet50')
     print('[MODELO] ResNet50 carregado', flush=True)
-    return backbone.to(device)
-
-
-_transform = transforms.Compose([
-    transforms.Resize(IMG_SIZE),
-    transforms.ToTensor(),
-    transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
-])
+    return model.to(device)
 
 
 def _embedding(model, crop_bgr: np.ndarray) -> np.ndarray:
     """Extrai embedding L2-normalizado de um crop em BGR."""
-    rgb = cv2.cvtColor(crop_bgr, cv2.COLOR_BGR2RGB)
-    img = Image.fromarray(rgb)
-    t = _transform(img).unsqueeze(0).to(device)
+    return _embeddings(model, [crop_bgr])[0]
+
+
+def _embeddings(model, crops: list) -> np.ndarray:
+    """Matriz (N, D) L2-normalizada — todos os crops de um frame numa única chamada."""
+    t = torch.from_numpy(preprocessar(crops))     # (N, 3, H, W) já normalizado (preprocessamento_reid)
     with torch.no_grad():
-        out = model(t)
-        emb = out.squeeze().cpu().numpy()
-    norm = np.linalg.norm(emb)
-    return emb / (norm + 1e-8)
+        embs = model(t.to(device)).reshape(len(crops), -1).cpu().numpy()
+    return embs / (np.linalg.norm(embs, axis=1, keepdims=True) + 1e-8)
 
 
 # ─── Referência ───────────────────────────────────────────────────
 def gerar_embedding_referencia(fotos_paths: list) -> list:
     """
     Recebe lista de caminhos de fotos do atleta.
-    Retorna embedding médio como lista Python (serializável em JSON).
+    Retorna embedding médio como lista Python (gravado com banco_embeddings.salvar_referencia).
     """
-    try:
-        from scripts.acelerador import get_reid
-        reid = get_reid()
-        embeddings = []
-        for p in fotos_paths:
-            img = cv2.imread(str(p))
-            if img is None:
-                continue
-            embeddings.append(reid.embedding(img))
-    except Exception as e:
-        print(f'[AVISO] Acelerador falhou ({e}), usando PyTorch', flush=True)
-        model = _build_model()
-        embeddings = []
-        for p in fotos_paths:
-            img = cv2.imread(str(p))
-            if img is None:
-                continue
-            embeddings.append(_embedding(model, img))
-
-    if not embeddings:
+    imagens = [img for img in (cv2.imread(str(p)) for p in fotos_paths) if img is not None]
+    if not imagens:
         raise ValueError("Nenhuma foto de referência válida.")
 
+    from scripts.embedders import get_embedder
+    embeddings = get_embedder().embeddings(imagens)   # backend mais rápido do host (embedders.py)
+
     ref = np.mean(embeddings, axis=0)
     ref = ref / (np.linalg.norm(ref) + 1e-8)
     return ref.tolist()
 
 
 # ─── Análise do vídeo ─────────────────────────────────────────────
-def analisar_video(video_path: str, ref_embedding: list, state: dict) -> dict:
+def _analisar_intervalo(video_path: str, ref_embedding: list, threshold: float,
+                        inicio: int, fim: int, preview_path: str, total_frames: int,
+                        progresso=None, state: dict = None, alvo: str = None, partes: int = 1) -> dict:
     """
-    Percorre o vídeo, detecta pessoas com YOLO e compara com embedding de referência.
-    Atualiza `state` em tempo real com progresso.
-    Retorna dicionário com posições normalizadas (0..1), estatísticas e incertos.
+    Frames [inicio, fim) (base 0) do vídeo: detecta pessoas com YOLO e compara
+    cada crop com o embedding de referência.
+    progresso(frame_idx): chamado a cada 30 frames; state: atualizado com os matches.
+    alvo: taxa a sustentar (ver controle_qualidade.py) — SKIP_FRAMES e o imgsz do
+    YOLO passam a ser ajustados em execução; partes: processos dividindo o vídeo.
     """
-    from ultralytics import YOLO
+    from scripts.controle_qualidade import ControladorQualidade, imgsz_controlavel, resolver_alvo
+    from scripts.detector_backend import carregar_detector
+
+    from scripts.embedders import get_embedder
 
-    # ReID: CPU PyTorch (GPU desabilitada)
-    model_emb = _build_model()
-    _emb_fn   = _embedding
-    print('[ANÁLISE] ReID via PyTorch CPU', flush=True)
+    # ReID: mesmo embedder das referências, no backend mais rápido do host
+    embedder = get_embedder()
+    print(f'[ANÁLISE] ReID via {embedder.backend} ({embedder.nome})', flush=True)
 
-    yolo = YOLO('yolo11n.pt', verbose=False)
-    yolo.to('cpu')
+    yolo = carregar_detector()     # backend via DETECTOR_BACKEND (padrão: pytorch CPU)
     ref_emb = np.array(ref_embedding)
 
-    threshold = state.get('threshold', SIMILARITY_THRESHOLD)
     near_miss_min = max(0.0, threshold - 0.15)   # zona de incerteza
 
     cap = cv2.VideoCapture(video_path)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 1
+    if inicio and cap.isOpened():
+        cap.set(cv2.CAP_PROP_POS_FRAMES, inicio)
     fps = cap.get(cv2.CAP_PROP_FPS) or 25
     w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
+    alvo_fps = resolver_alvo(alvo, fps, partes)
+    controle = None
+    if alvo_fps:
+        controle = ControladorQualidade(alvo_fps, imgsz=imgsz_controlavel(yolo), stride=SKIP_FRAMES,
+                                        nome='ANÁLISE')
+        print(f'[ANÁLISE] Controle de qualidade: alvo {alvo_fps:.1f} fps', flush=True)
+    medir = controle.medir if controle else (lambda etapa: nullcontext())
+
     posicoes        = []   # matches acima do threshold
     incertos        = []   # near-misses (near_miss_min ≤ sim < threshold)
-    frame_idx       = 0
+    frame_idx       = inicio
     deteccoes_total = 0
     matches_total   = 0
 
-    state.update({
-        'status': 'rodando', 'progresso': 0,
-        'frame': 0, 'total_frames': total_frames, 'matches': 0,
-    })
-
-    while cap.isOpened():
+    while cap.isOpened() and (fim is None or frame_idx < fim):
         ret, frame = cap.read()
         if not ret:
             break
@@ -143,20 +128,25 @@ def analisar_video(video_path: str, ref_embedding: list, state: dict) -> dict:
         frame_idx += 1
 
         # Atualizar progresso a cada 30 frames
-        if frame_idx % 30 == 0:
-            state['progresso'] = int(frame_idx / total_frames * 100)
-            state['frame'] = frame_idx
+        if frame_idx % 30 == 0 and progresso is not None:
+            progresso(frame_idx)
 
-        # Pular frames para desempenho
-        if frame_idx % SKIP_FRAMES != 0:
+        # Pular frames para desempenho (stride do controle de qualidade, se ativo)
+        if controle is not None:
+            controle.frame()
+            if not controle.processar_frame(frame_idx):
+                continue
+        elif frame_idx % SKIP_FRAMES != 0:
             continue
 
-        results = yolo(frame, classes=[0], verbose=False)[0]
+        with medir('detector'):
+            extra = {'imgsz': controle.imgsz} if controle and controle.imgsz else {}
+            results = yolo(frame, classes=[0], verbose=False, **extra)[0]
 
         # Preview: cópia anotada do frame atual
         preview = frame.copy()
-        preview_path = state.get('preview_path', '/tmp/atleta_preview.jpg')
 
+        caixas, crops = [], []
         for box in results.boxes:
             x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
             x1, y1 = max(0, x1), max(0, y1)
@@ -164,10 +154,18 @@ def analisar_video(video_path: str, ref_embedding: list, state: dict) -> dict:
             crop = frame[y1:y2, x1:x2]
             if crop.size == 0:
                 continue
+            caixas.append((x1, y1, x2, y2))
+            crops.append(crop)
 
+        # Todos os jogadores do frame numa única inferência de ReID
+        sims = []
+        if crops:
+            with medir('reid'):
+                sims = embedder.embeddings(crops) @ ref_emb   # cosine (vetores já L2-norm)
+
+        for (x1, y1, x2, y2), sim in zip(caixas, sims):
             deteccoes_total += 1
-            emb = _emb_fn(model_emb, crop)
-            sim = float(np.dot(emb, ref_emb))   # cosine (vetores já L2-norm)
+            sim = float(sim)
 
             matched   = sim >= threshold
             near_miss = (not matched) and (sim >= near_miss_min)
@@ -201,7 +199,8 @@ def analisar_video(video_path: str, ref_embedding: list, state: dict) -> dict:
                     'sim': round(sim, 4),
                 })
                 matches_total += 1
-                state['matches'] = matches_total
+                if state is not None:
+                    state['matches'] = matches_total
             elif near_miss:
                 incertos.append({
                     'frame': frame_idx,
@@ -215,36 +214,125 @@ def analisar_video(video_path: str, ref_embedding: list, state: dict) -> dict:
         cv2.putText(preview, hud, (8, 20),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 220, 60), 1)
 
-        # Salvar preview (reduzir resolucao para agilizar transferência)
+        # Salvar preview (reduzir resolucao para agilizar transferência); com
+        # fatias em paralelo vários processos gravam o mesmo arquivo → tmp + replace
         ph = 360
         pw = int(w * ph / h)
         small = cv2.resize(preview, (pw, ph))
-        cv2.imwrite(preview_path, small, [cv2.IMWRITE_JPEG_QUALITY, 70])
+        tmp_path = f'{preview_path}.{os.getpid()}.tmp.jpg'
+        if cv2.imwrite(tmp_path, small, [cv2.IMWRITE_JPEG_QUALITY, 70]):
+            os.replace(tmp_path, preview_path)
 
     cap.release()
-
-    state.update({'progresso': 99, 'frame': frame_idx})
+    if controle is not None:
+        print(f'[ANÁLISE] Controle de qualidade: {controle.resumo()}', flush=True)
 
     return {
         'posicoes': posicoes,
         'incertos': incertos,
-        'total_frames': total_frames,
+        'frame': frame_idx,
         'fps': fps,
         'video_w': w,
         'video_h': h,
         'matches': matches_total,
         'deteccoes': deteccoes_total,
+        'ajustes': controle.ajustes if controle else [],
+    }
+
+
+def _analisar_fatia(video_path, ref_embedding, threshold, fatia, preview_path, total_frames,
+                    alvo=None, partes=1):
+    """Uma fatia do vídeo num processo do pool (progresso vai para o processo principal)."""
+    from scripts.processamento_paralelo import reportar_progresso
+    return _analisar_intervalo(video_path, ref_embedding, threshold, fatia.inicio, fatia.fim,
+                               preview_path, total_frames,
+                               progresso=lambda f: reportar_progresso(f - fatia.inicio),
+                               alvo=alvo, partes=partes)
+
+
+def analisar_video(video_path: str, ref_embedding: list, state: dict, fatias: int = 1,
+                   alvo: str = None) -> dict:
+    """
+    Percorre o vídeo, detecta pessoas com YOLO e compara com embedding de referência.
+    Atualiza `state` em tempo real com progresso.
+    Retorna dicionário com posições normalizadas (0..1), estatísticas e incertos.
+
+    fatias > 1: o vídeo é dividido em intervalos analisados em paralelo (processos).
+    Como cada detecção é comparada sozinha (sem rastreador), as fatias não
+    precisam de sobreposição e o resultado é o mesmo da análise sequencial.
+
+    alvo: 'tempo-real', '2x' (no máximo 2x a duração) ou fps — o salto de frames
+    e o imgsz do YOLO se ajustam para cumprir (ajustes vão no resultado).
+    """
+    threshold = state.get('threshold', SIMILARITY_THRESHOLD)
+    preview_path = state.get('preview_path', '/tmp/atleta_preview.jpg')
+
+    cap = cv2.VideoCapture(video_path)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 1
+    cap.release()
+
+    state.update({
+        'status': 'rodando', 'progresso': 0,
+        'frame': 0, 'total_frames': total_frames, 'matches': 0,
+    })
+
+    if fatias <= 1:
+        def progresso(frame_idx):
+            state['progresso'] = int(frame_idx / total_frames * 100)
+            state['frame'] = frame_idx
+
+        resultado = _analisar_intervalo(video_path, ref_embedding, threshold, 0, None,
+                                        preview_path, total_frames, progresso, state, alvo)
+        partes = [resultado]
+    else:
+        from scripts.processamento_paralelo import dividir_intervalos, executar_fatias
+
+        intervalos = dividir_intervalos(total_frames, fatias, sobreposicao=0)
+        feitos = [0] * len(intervalos)
+
+        def progresso(indice, frames):
+            feitos[indice] = frames
+            state['frame'] = sum(feitos)
+            state['progresso'] = int(sum(feitos) / total_frames * 100)
+
+        print(f'[ANÁLISE] {len(intervalos)} fatias em paralelo', flush=True)
+        tarefas = [(video_path, ref_embedding, threshold, f, preview_path, total_frames,
+                    alvo, len(intervalos))
+                   for f in intervalos]
+        partes = executar_fatias(_analisar_fatia, tarefas, len(tarefas), progresso=progresso)
+
+    # Fatias em ordem → posições e incertos já ordenados por frame
+    posicoes = [p for r in partes for p in r['posicoes']]
+    incertos = [p for r in partes for p in r['incertos']]
+    matches_total = sum(r['matches'] for r in partes)
+    state.update({'progresso': 99, 'frame': partes[-1]['frame'], 'matches': matches_total})
+
+    return {
+        'posicoes': posicoes,
+        'incertos': incertos,
+        'total_frames': total_frames,
+        'fps': partes[0]['fps'],
+        'video_w': partes[0]['video_w'],
+        'video_h': partes[0]['video_h'],
+        'matches': matches_total,
+        'deteccoes': sum(r['deteccoes'] for r in partes),
         'threshold_usado': threshold,
+        'ajustes_qualidade': [a for r in partes for a in r['ajustes']],
     }
 
 
 # ─── Calibração de Threshold (Curva Precision × Recall) ──────────
-def calibrar_threshold(nome: str, atleta_refs_dir, n_negativo: int = 200) -> dict:
+def calibrar_threshold(nome: str, atleta_refs_dir, n_negativo: int = 200,
+                       embeddings_fn=None, ref_emb=None) -> dict:
     """
     Computa curva Precision × Recall para o atleta usando:
     - Positivos: embeddings das fotos de referência do próprio atleta
     - Negativos: embeddings de OUTROS atletas (ou frames aleatórios)
 
+    embeddings_fn(crops) → matriz (N, D) L2-normalizada (padrão: embedders.get_embedder);
+    ref_emb: embedding de referência (padrão: embedding.npy/.json do atleta) — usados
+    por quantizar_reid.py para comparar FP32 e INT8 com o mesmo protocolo.
+
     Retorna dict com:
       thresholds, precision, recall, f1, best_threshold, best_f1
     """
@@ -252,27 +340,26 @@ def calibrar_threshold(nome: str, atleta_refs_dir, n_negativo: int = 200) -> dic
     atleta_refs_dir = Path(atleta_refs_dir)
 
     # ── Carregar embeddings de referência do atleta (positivos)
-    emb_file = atleta_refs_dir / nome / 'embedding.json'
-    if not emb_file.exists():
-        raise ValueError(f'Embedding não encontrado para {nome}. Gere o embedding primeiro.')
+    if ref_emb is None:
+        from scripts import banco_embeddings
+        if not banco_embeddings.tem_referencia(atleta_refs_dir / nome):
+            raise ValueError(f'Embedding não encontrado para {nome}. Gere o embedding primeiro.')
+        ref_emb = banco_embeddings.carregar_referencia(atleta_refs_dir / nome)
+    ref_emb = np.array(ref_emb)
 
-    import json
-    data = json.loads(emb_file.read_text(encoding='utf-8'))
-    ref_emb = np.array(data['embedding'])
+    if embeddings_fn is None:
+        from scripts.embedders import get_embedder
+        embeddings_fn = get_embedder().embeddings
 
-    model = _build_model()
+    def _sims(fotos) -> list:
+        imgs = [img for img in (cv2.imread(str(p)) for p in fotos) if img is not None]
+        return (embeddings_fn(imgs) @ ref_emb).tolist() if imgs else []
 
     # ── Positivos: similarities das fotos do próprio atleta
     pasta_pos = atleta_refs_dir / nome
     fotos_pos = sorted(p for p in pasta_pos.iterdir()
                        if p.suffix.lower() in ('.jpg', '.jpeg', '.png'))
-    sims_pos = []
-    for p in fotos_pos:
-        img = cv2.imread(str(p))
-        if img is None:
-            continue
-        emb = _embedding(model, img)
-        sims_pos.append(float(np.dot(emb, ref_emb)))
+    sims_pos = _sims(fotos_pos)
 
     if len(sims_pos) < 3:
         raise ValueError('Fotos de referência insuficientes (mínimo 3).')
@@ -282,14 +369,8 @@ def calibrar_threshold(nome: str, atleta_refs_dir, n_negativo: int = 200) -> dic
     for other_dir in atleta_refs_dir.iterdir():
         if not other_dir.is_dir() or other_dir.name == nome:
             continue
-        for p in sorted(other_dir.iterdir())[:50]:
-            if p.suffix.lower() not in ('.jpg', '.jpeg', '.png'):
-                continue
-            img = cv2.imread(str(p))
-            if img is None:
-                continue
-            emb = _embedding(model, img)
-            sims_neg.append(float(np.dot(emb, ref_emb)))
+        sims_neg += _sims(p for p in sorted(other_dir.iterdir())[:50]
+                          if p.suffix.lower() in ('.jpg', '.jpeg', '.png'))
 
     # Se não houver outros atletas, usar ruído (distratores sintéticos)
     if len(sims_neg) < 10:
@@ -353,18 +434,17 @@ def matriz_confusao_atletas(atleta_refs_dir) -> dict:
     Retorna a matriz de similaridade média e lista de atletas.
     """
     from pathlib import Path
-    import json
+    from scripts import banco_embeddings
+    from scripts.embedders import get_embedder
     atleta_refs_dir = Path(atleta_refs_dir)
-    model = _build_model()
+    embedder = get_embedder()
 
     # ── Carregar embeddings de referência
     atletas, refs = [], {}
     for d in sorted(atleta_refs_dir.iterdir()):
-        emb_file = d / 'embedding.json'
-        if not d.is_dir() or not emb_file.exists():
+        if not d.is_dir() or not banco_embeddings.tem_referencia(d):
             continue
-        data = json.loads(emb_file.read_text(encoding='utf-8'))
-        refs[d.name] = np.array(data['embedding'])
+        refs[d.name] = banco_embeddings.carregar_referencia(d)
         atletas.append(d.name)
 
     if len(atletas) < 2:
@@ -378,13 +458,10 @@ def matriz_confusao_atletas(atleta_refs_dir) -> dict:
         pasta_i = atleta_refs_dir / nome_i
         fotos_i = sorted(p for p in pasta_i.iterdir()
                          if p.suffix.lower() in ('.jpg', '.jpeg', '.png'))[:30]
-        embs_i = []
-        for p in fotos_i:
-            img = cv2.imread(str(p))
-            if img is not None:
-                embs_i.append(_embedding(model, img))
-        if not embs_i:
+        imgs_i = [img for img in (cv2.imread(str(p)) for p in fotos_i) if img is not None]
+        if not imgs_i:
             continue
+        embs_i = embedder.embeddings(imgs_i)
 
         for j, nome_j in enumerate(atletas):
             ref_j = refs[nome_j]
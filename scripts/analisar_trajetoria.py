@@ -5,13 +5,20 @@ Integra os IDs rastreados com os nomes dos jogadores
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
 import supervision as sv
 import json
 import os
 from collections import defaultdict
 from pathlib import Path
 
+from deteccao_fundo import TAMANHO_TILE_PADRAO, carregar_faixa
+from detector_backend import OPCOES_BACKEND, carregar_detector
+from gate_movimento import GateMovimento, LIMIAR_PADRAO, STRIDE_PADRAO
+from processamento_paralelo import (SOBREPOSICAO_PADRAO, RegistroJanelas, abrir_na_fatia,
+                                    costurar_fatias, dividir_video, executar_fatias,
+                                    reportar_progresso)
+from rastreamento import MODOS_COM_ID, MODO_PADRAO, criar_rastreador, detectar
+
 # Configurações
 VIDEO_ESQ = "/home/nunes/Downloads/Jogo 03-02-2026 - Ataque do 🔵 (🔵 1 x 1 ⚫)2.mp4"
 VIDEO_DIR = "/home/nunes/Downloads/Jogo 03-02-2026 - Ataque do ⚫ (⚫ 1 x 1 🔵)2.mp4"
@@ -29,6 +36,13 @@ ALTURA_VIDEO_PIXELS = 1080
 ESCALA_X = LARGURA_CAMPO_METROS / LARGURA_VIDEO_PIXELS
 ESCALA_Y = COMPRIMENTO_CAMPO_METROS / ALTURA_VIDEO_PIXELS
 
+def detectar_pessoas(model, frame, fundo=None):
+    """Pessoas no frame; com `fundo` (FaixaFundo), a faixa do fundo também vai em tiles."""
+    detections = detectar(model, frame, classes=[0])
+    if fundo is not None:
+        detections = fundo.completar(model, [frame], [detections], [0])[0]
+    return detections
+
 class AnalisadorTrajetoria:
     def __init__(self):
         # Carregar classificações
@@ -181,15 +195,116 @@ class AnalisadorTrajetoria:
         
         return ranking
 
-def analisar_video(video_path, camera_name):
-    """Analisa um vídeo e calcula trajetórias"""
+def _trajetoria_fatia(video_path, fatia, sobreposicao, modo_rastreador,
+                      gate, gate_stride, gate_limiar, detector, fundo=None):
+    """Centros (frame, x, y) por ID local numa fatia do vídeo (roda num processo do pool)."""
+    model = carregar_detector(detector, MODEL_PATH)
+    tracker = criar_rastreador(modo_rastreador)
+    gate_mov = GateMovimento(gate_stride, gate_limiar) if gate else None
+    registro = RegistroJanelas(fatia, sobreposicao)
+    pontos = defaultdict(list)
+
+    cap = abrir_na_fatia(video_path, fatia)
+    frame_idx = fatia.leitura
+    while frame_idx < fatia.fim:
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        if gate_mov is None or gate_mov.avaliar(frame):
+            detections = detectar_pessoas(model, frame, fundo)  # Apenas pessoas
+            detections = tracker.atualizar(detections, frame)
+        else:
+            detections = tracker.prever()
+        registro.registrar(frame_idx, detections, frame)
+
+        # Frames de aquecimento só servem para a costura dos IDs
+        if frame_idx >= fatia.inicio:
+            for (x1, y1, x2, y2), track_id in zip(detections.xyxy, detections.tracker_id):
+                pontos[int(track_id)].append((frame_idx, (x1 + x2) / 2, (y1 + y2) / 2))
+
+        frame_idx += 1
+        if frame_idx % 30 == 0:
+            reportar_progresso(frame_idx - fatia.leitura)
+    cap.release()
+
+    return {
+        'pontos':   dict(pontos),
+        'registro': registro.resultado(),
+        'gate':     gate_mov.resumo() if gate_mov else None,
+    }
+
+
+def analisar_video_fatiado(video_path, camera_name, modo_rastreador=MODO_PADRAO,
+                           gate=False, gate_stride=STRIDE_PADRAO, gate_limiar=LIMIAR_PADRAO,
+                           detector=None, fatias=4, sobreposicao=SOBREPOSICAO_PADRAO, fundo=None):
+    """
+    Mesma análise de analisar_video, com o vídeo dividido em `fatias` intervalos
+    processados em paralelo (sem janela). Os IDs são costurados nas bordas e as
+    distâncias recalculadas na ordem dos frames.
+    """
+    partes = dividir_video(video_path, fatias, sobreposicao)
+    total = sum(f.fim - f.leitura for f in partes)
+    feitos = [0] * len(partes)
+    print(f"   {len(partes)} fatias em paralelo (sobreposição de {sobreposicao} frames)\n")
+
+    def progresso(indice, frames):
+        feitos[indice] = frames
+        print(f"\r   Progresso: {sum(feitos)}/{total} frames ({sum(feitos) / total * 100:.1f}%)",
+              end='', flush=True)
+
+    tarefas = [(video_path, f, sobreposicao, modo_rastreador, gate, gate_stride, gate_limiar, detector, fundo)
+               for f in partes]
+    resultados = executar_fatias(_trajetoria_fatia, tarefas, len(tarefas), progresso=progresso)
+    print()
+    mapas = costurar_fatias([r['registro'] for r in resultados])
+
+    analisador = AnalisadorTrajetoria()
+    cap = cv2.VideoCapture(video_path)
+    analisador.fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+
+    # Junta os pontos de cada ID global e refaz as distâncias na ordem dos frames
+    pontos = defaultdict(list)
+    for res, mapa in zip(resultados, mapas):
+        for track_id, lista in res['pontos'].items():
+            pontos[mapa[track_id]].extend(lista)
+    for track_id, lista in pontos.items():
+        for _, cx, cy in sorted(lista):
+            analisador.atualizar_trajetoria(track_id, cx, cy)
+    analisador.frame_count = partes[-1].fim
+
+    ids_locais = sum(len(m) for m in mapas)
+    print(f"\n🧵 {ids_locais} IDs locais → {len(pontos)} IDs após a costura entre fatias")
+    for res in resultados:
+        if res['gate']:
+            print(f"⚡ Gate de movimento: {res['gate']}")
+    return analisador
+
+
+def analisar_video(video_path, camera_name, modo_rastreador=MODO_PADRAO,
+                   gate=False, gate_stride=STRIDE_PADRAO, gate_limiar=LIMIAR_PADRAO,
+                   detector=None, fatias=0, sobreposicao=SOBREPOSICAO_PADRAO, fundo=None):
+    """
+    Analisa um vídeo e calcula trajetórias (gate=True: YOLO só com movimento, resto via Kalman).
+    fatias > 1: divide o vídeo em intervalos processados em paralelo (ver analisar_video_fatiado).
+    fundo: FaixaFundo — jogadores do lado oposto detectados também em tiles (deteccao_fundo.py).
+    """
     print(f"\n🎥 Processando: {camera_name}")
     print(f"   Vídeo: {Path(video_path).name}\n")
+
+    if fatias > 1:
+        analisador = analisar_video_fatiado(video_path, camera_name, modo_rastreador, gate,
+                                            gate_stride, gate_limiar, detector, fatias, sobreposicao,
+                                            fundo)
+        analisador.gerar_relatorio(camera_name)
+        return analisador
     
     # Inicializar
-    model = YOLO(MODEL_PATH)
-    tracker = sv.ByteTrack()
+    model = carregar_detector(detector, MODEL_PATH)
+    tracker = criar_rastreador(modo_rastreador)
     analisador = AnalisadorTrajetoria()
+    gate_mov = GateMovimento(gate_stride, gate_limiar) if gate else None
     
     cap = cv2.VideoCapture(video_path)
     analisador.fps = cap.get(cv2.CAP_PROP_FPS)
@@ -205,16 +320,12 @@ def analisar_video(video_path, camera_name):
         
         analisador.frame_count += 1
         
-        # Detecção e rastreamento
-        results = model.track(
-            frame,
-            persist=True,
-            classes=[0],  # Apenas pessoas
-            verbose=False
-        )[0]
-        
-        detections = sv.Detections.from_ultralytics(results)
-        detections = tracker.update_with_detections(detections)
+        # Detecção (predict) + um único rastreador; frames pulados pelo gate usam a predição
+        if gate_mov is None or gate_mov.avaliar(frame):
+            detections = detectar_pessoas(model, frame, fundo)  # Apenas pessoas
+            detections = tracker.atualizar(detections, frame)
+        else:
+            detections = tracker.prever()
         
         # Atualizar trajetórias
         for i in range(len(detections)):
@@ -257,6 +368,9 @@ def analisar_video(video_path, camera_name):
     
     cap.release()
     cv2.destroyAllWindows()
+
+    if gate_mov is not None:
+        print(f"\n⚡ Gate de movimento: {gate_mov.resumo()}")
     
     # Gerar relatório
     analisador.gerar_relatorio(camera_name)
@@ -270,7 +384,28 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('--camera', choices=['1', '2', '3'], default='3',
                         help='1=ESQ, 2=DIR, 3=Ambas (padrão: 3)')
+    parser.add_argument('--rastreador', default=MODO_PADRAO, choices=MODOS_COM_ID,
+                        help='Backend de rastreamento (padrão: bytetrack)')
+    parser.add_argument('--gate', action='store_true',
+                        help='Roda o YOLO só com movimento ou a cada N frames (resto via Kalman)')
+    parser.add_argument('--gate-stride', type=int, default=STRIDE_PADRAO,
+                        help='Máximo de frames seguidos sem detector no modo --gate')
+    parser.add_argument('--gate-limiar', type=float, default=LIMIAR_PADRAO,
+                        help='Diferença média (0-255) que força uma detecção no modo --gate')
+    parser.add_argument('--detector', default=None, choices=OPCOES_BACKEND,
+                        help='Backend do YOLO (padrão: DETECTOR_BACKEND ou pytorch)')
+    parser.add_argument('--fatias', type=int, default=0,
+                        help='Divide o vídeo em N intervalos processados em paralelo (sem janela)')
+    parser.add_argument('--sobreposicao', type=int, default=SOBREPOSICAO_PADRAO,
+                        help='Frames compartilhados entre fatias vizinhas para costurar os IDs')
+    parser.add_argument('--fundo', default=None,
+                        help='Faixa do fundo do campo em frações da altura (ex: 0,0.45) detectada também em tiles')
+    parser.add_argument('--fundo-tile', type=int, default=TAMANHO_TILE_PADRAO,
+                        help='Lado dos tiles da faixa do fundo, em pixels do frame original')
     args = parser.parse_args()
+    gate_kw = dict(gate=args.gate, gate_stride=args.gate_stride, gate_limiar=args.gate_limiar,
+                   detector=args.detector, fatias=args.fatias, sobreposicao=args.sobreposicao,
+                   fundo=carregar_faixa(args.fundo, args.fundo_tile))
 
     # Modo interativo: se stdin é um terminal real, pede input
     if sys.stdin.isatty() and args.camera == '3':
@@ -290,13 +425,13 @@ if __name__ == '__main__':
     print("="*70)
 
     if escolha == '1':
-        analisar_video(VIDEO_ESQ, "ESQ")
+        analisar_video(VIDEO_ESQ, "ESQ", args.rastreador, **gate_kw)
     elif escolha == '2':
-        analisar_video(VIDEO_DIR, "DIR")
+        analisar_video(VIDEO_DIR, "DIR", args.rastreador, **gate_kw)
     elif escolha == '3':
         print("\n📹 Processando câmera ESQ...")
-        analisar_video(VIDEO_ESQ, "ESQ")
+        analisar_video(VIDEO_ESQ, "ESQ", args.rastreador, **gate_kw)
         print("\n📹 Processando câmera DIR...")
-        analisar_video(VIDEO_DIR, "DIR")
+        analisar_video(VIDEO_DIR, "DIR", args.rastreador, **gate_kw)
     else:
         print("❌ Opção inválida!")
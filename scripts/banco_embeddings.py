@@ -0,0 +1,201 @@
+"""
+Formato binário das galerias de embeddings.
+
+Antes a database do ReID treinado (embeddings_reid/embeddings_database.json,
+indent=4) e a referência de cada atleta (atleta_refs/<nome>/embedding.json)
+eram listas de floats em texto — 2048 números por atleta, lidos e parseados
+a cada requisição. Agora cada galeria são dois arquivos lado a lado:
+
+    embeddings_database.npy            matriz (P, D) float32 ou float16
+    embeddings_database.manifest.json  {'nomes': [...], 'dimensao': D,
+                                        'dtype', 'modelo', 'modelo_hash', ...}
+
+A matriz é aberta com np.load(mmap_mode='r'): só as páginas usadas são lidas.
+`nomes` tem uma entrada por linha, então um jogador pode repetir (vários
+protótipos — ver galeria.Galeria.de_linhas).
+
+Durante a migração os leitores aceitam os dois formatos: se o .npy não existe,
+caem no .json antigo. Conversão única dos arquivos existentes:
+
+    python scripts/banco_embeddings.py --converter            # mantém os .json
+    python scripts/banco_embeddings.py --converter --float16 --remover-json
+"""
+
+import argparse
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+
+FORMATO        = 1
+SUFIXO_MATRIZ  = '.npy'
+SUFIXO_MANIFEST = '.manifest.json'
+DTYPES         = ('float32', 'float16')
+
+DATABASE_REID  = Path('embeddings_reid') / 'embeddings_database'
+ATLETA_REFS    = Path('atleta_refs')
+REFERENCIA     = 'embedding'      # atleta_refs/<nome>/embedding.npy
+
+
+def _base(caminho) -> Path:
+    """'x.json', 'x.npy' ou 'x.manifest.json' → 'x' (sem sufixo)."""
+    caminho = Path(caminho)
+    nome = caminho.name
+    for sufixo in (SUFIXO_MANIFEST, SUFIXO_MATRIZ, '.json'):
+        if nome.endswith(sufixo):
+            return caminho.with_name(nome[:-len(sufixo)])
+    return caminho
+
+
+def _arquivos(caminho):
+    base = _base(caminho)
+    return (base.with_name(base.name + SUFIXO_MATRIZ),
+            base.with_name(base.name + SUFIXO_MANIFEST),
+            base.with_name(base.name + '.json'))
+
+
+def hash_arquivo(caminho, tamanho: int = 12):
+    """sha256 (prefixo) do arquivo do modelo; None se não existir."""
+    caminho = Path(caminho)
+    if not caminho.exists():
+        return None
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+    return h.hexdigest()[:tamanho]
+
+
+def existe(caminho) -> bool:
+    """Galeria presente em qualquer um dos formatos."""
+    matriz, manifest, legado = _arquivos(caminho)
+    return (matriz.exists() and manifest.exists()) or legado.exists()
+
+
+def salvar(caminho, nomes, matriz, dtype: str = 'float32', modelo: str = None,
+           modelo_hash: str = None, **extra) -> Path:
+    """Grava a matriz (P, D) e o manifest; devolve o caminho do .npy."""
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype {dtype} inválido (use {', '.join(DTYPES)})")
+    matriz = np.atleast_2d(np.asarray(matriz, dtype=dtype))
+    nomes = list(nomes)
+    if len(nomes) != len(matriz):
+        raise ValueError(f"{len(nomes)} nomes para {len(matriz)} linhas")
+    arq_matriz, arq_manifest, _ = _arquivos(caminho)
+    arq_matriz.parent.mkdir(parents=True, exist_ok=True)
+    np.save(arq_matriz, matriz)
+    manifest = {
+        'formato':     FORMATO,
+        'nomes':       nomes,
+        'linhas':      len(matriz),
+        'dimensao':    int(matriz.shape[1]),
+        'dtype':       dtype,
+        'modelo':      modelo,
+        'modelo_hash': modelo_hash,
+        **extra,
+    }
+    arq_manifest.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding='utf-8')
+    return arq_matriz
+
+
+def _ler_legado(arquivo: Path):
+    """JSON antigo: {nome: vetor} (database) ou {'nome', 'embedding'} / lista (atleta)."""
+    dados = json.loads(arquivo.read_text(encoding='utf-8'))
+    if isinstance(dados, list):
+        return [_base(arquivo).parent.name], np.asarray([dados], dtype=np.float32), {}
+    if 'embedding' in dados:
+        nome = dados.get('nome') or _base(arquivo).parent.name
+        return [nome], np.asarray([dados['embedding']], dtype=np.float32), {}
+    nomes, linhas = [], []
+    for nome, emb in dados.items():
+        emb = np.atleast_2d(np.asarray(emb, dtype=np.float32))   # vários protótipos por nome
+        nomes.extend([nome] * len(emb))
+        linhas.append(emb)
+    return nomes, np.concatenate(linhas) if linhas else np.zeros((0, 0), np.float32), {}
+
+
+def carregar(caminho):
+    """
+    (nomes por linha, matriz (P, D), manifest). Formato binário via mmap
+    (somente leitura, no dtype gravado); sem ele, o JSON antigo em float32.
+    """
+    arq_matriz, arq_manifest, legado = _arquivos(caminho)
+    if arq_matriz.exists() and arq_manifest.exists():
+        manifest = json.loads(arq_manifest.read_text(encoding='utf-8'))
+        matriz = np.load(arq_matriz, mmap_mode='r')
+        if matriz.shape != (manifest['linhas'], manifest['dimensao']):
+            raise ValueError(f"{arq_matriz}: forma {matriz.shape} não confere com o manifest")
+        return manifest['nomes'], matriz, manifest
+    if legado.exists():
+        return _ler_legado(legado)
+    raise FileNotFoundError(f"Galeria não encontrada: {arq_matriz} nem {legado}")
+
+
+# ─── Referência de um atleta (atleta_refs/<nome>/) ────────────────
+def tem_referencia(atleta_dir) -> bool:
+    return existe(Path(atleta_dir) / REFERENCIA)
+
+
+def salvar_referencia(atleta_dir, nome: str, embedding, modelo: str = None) -> Path:
+    return salvar(Path(atleta_dir) / REFERENCIA, [nome], [embedding], modelo=modelo)
+
+
+def carregar_referencia(atleta_dir) -> np.ndarray:
+    """Embedding (D,) float32 do atleta (cópia — pequeno e enviado a outros processos)."""
+    _, matriz, _ = carregar(Path(atleta_dir) / REFERENCIA)
+    return np.array(matriz[0], dtype=np.float32)
+
+
+# ─── Conversão única dos JSON existentes ──────────────────────────
+def converter(arquivo_json, dtype: str = 'float32', remover_json: bool = False, **extra) -> Path:
+    arquivo_json = Path(arquivo_json)
+    nomes, matriz, _ = _ler_legado(arquivo_json)
+    destino = salvar(arquivo_json, nomes, matriz, dtype=dtype, origem=arquivo_json.name, **extra)
+    if remover_json:
+        arquivo_json.unlink()
+    return destino
+
+
+def _metadata_reid():
+    """modelo/hash do ReID treinado a partir de embeddings_reid/metadata.json."""
+    arquivo = DATABASE_REID.parent / 'metadata.json'
+    if not arquivo.exists():
+        return {}
+    meta = json.loads(arquivo.read_text(encoding='utf-8'))
+    modelo = meta.get('model_path')
+    return {'modelo': modelo, 'modelo_hash': hash_arquivo(modelo) if modelo else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Galerias de embeddings em formato binário (.npy + manifest)')
+    parser.add_argument('--converter', action='store_true',
+                        help='Converte embeddings_database.json e atleta_refs/*/embedding.json')
+    parser.add_argument('--float16', action='store_true', help='Grava a matriz em float16 (metade do tamanho)')
+    parser.add_argument('--remover-json', action='store_true', help='Apaga o .json depois de converter')
+    args = parser.parse_args()
+
+    if not args.converter:
+        parser.print_help()
+        return
+
+    dtype = 'float16' if args.float16 else 'float32'
+    alvos = []
+    legado = DATABASE_REID.with_name(DATABASE_REID.name + '.json')
+    if legado.exists():
+        alvos.append((legado, _metadata_reid()))
+    if ATLETA_REFS.exists():
+        alvos += [(d / f'{REFERENCIA}.json', {}) for d in sorted(ATLETA_REFS.iterdir())
+                  if (d / f'{REFERENCIA}.json').exists()]
+
+    if not alvos:
+        print("Nenhum JSON de embeddings para converter.")
+        return
+    for arquivo, extra in alvos:
+        antes = arquivo.stat().st_size
+        destino = converter(arquivo, dtype, args.remover_json, **extra)
+        print(f"✓ {arquivo} ({antes / 1024:.0f} KB) → {destino} ({destino.stat().st_size / 1024:.0f} KB)")
+
+
+if __name__ == '__main__':
+    main()
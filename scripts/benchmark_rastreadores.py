@@ -0,0 +1,140 @@
+"""
+Benchmark dos backends de rastreamento (rastreamento.py).
+
+Para cada modo roda os mesmos N frames de um vídeo e mede:
+  - FPS de ponta a ponta (detecção + associação)
+  - IDs únicos criados
+  - Trocas de ID: caixas que se sobrepõem (IoU ≥ 0.5) em frames consecutivos
+    mas mudaram de tracker_id. Sem ground truth, é uma aproximação útil
+    para comparar os modos entre si.
+
+O modo 'duplo' reproduz o pipeline antigo (model.track + sv.ByteTrack)
+para mostrar o custo de associar duas vezes.
+
+Uso:
+    python scripts/benchmark_rastreadores.py --video jogo.mp4 --frames 600
+"""
+
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+import supervision as sv
+from ultralytics import YOLO
+
+from rastreamento import MODOS, TRACKER_CFG, criar_rastreador, detectar
+
+IOU_MESMA_PESSOA = 0.5
+
+
+def contar_trocas_id(anterior: sv.Detections, atual: sv.Detections) -> int:
+    """Conta pares de caixas sobrepostas entre frames consecutivos com IDs diferentes."""
+    if (anterior is None or len(anterior) == 0 or len(atual) == 0
+            or anterior.tracker_id is None or atual.tracker_id is None):
+        return 0
+    iou = sv.box_iou_batch(anterior.xyxy, atual.xyxy)
+    trocas = 0
+    usados = set()
+    # Emparelhamento guloso pelo maior IoU
+    for i in np.argsort(-iou.max(axis=1)):
+        j = int(np.argmax(iou[i]))
+        if iou[i, j] < IOU_MESMA_PESSOA or j in usados:
+            continue
+        usados.add(j)
+        if anterior.tracker_id[i] != atual.tracker_id[j]:
+            trocas += 1
+    return trocas
+
+
+def _passo_duplo(model, tracker, frame):
+    """Pipeline antigo: tracker interno do Ultralytics + sv.ByteTrack."""
+    results = model.track(frame, persist=True, classes=[0], verbose=False)[0]
+    return tracker.update_with_detections(sv.Detections.from_ultralytics(results))
+
+
+def medir_modo(video: str, modo: str, model_path: str, max_frames: int) -> dict:
+    model = YOLO(model_path)
+    cap   = cv2.VideoCapture(video)
+    fps_video = cap.get(cv2.CAP_PROP_FPS) or 30
+
+    if modo == 'duplo':
+        rastreador = sv.ByteTrack(frame_rate=int(fps_video))
+        passo = lambda f: _passo_duplo(model, rastreador, f)
+    else:
+        rastreador = criar_rastreador(modo, frame_rate=int(fps_video))
+        passo = lambda f: rastreador.atualizar(detectar(model, f), f)
+
+    ret, frame = cap.read()
+    if not ret:
+        cap.release()
+        raise ValueError(f"Não foi possível ler {video}")
+    model.predict(frame, classes=[0], verbose=False)   # aquecimento (fora da medição)
+
+    frames, trocas = 0, 0
+    ids = set()
+    anterior = None
+    tempo = 0.0
+    while ret and frames < max_frames:
+        t0 = time.perf_counter()
+        dets = passo(frame)
+        tempo += time.perf_counter() - t0
+
+        frames += 1
+        if dets.tracker_id is not None:
+            ids.update(int(t) for t in dets.tracker_id)
+            trocas += contar_trocas_id(anterior, dets)
+        anterior = dets
+        ret, frame = cap.read()
+    cap.release()
+
+    tem_id = modo != 'nenhum'
+    return {
+        'modo':        modo,
+        'frames':      frames,
+        'fps':         round(frames / tempo, 2) if tempo else 0.0,
+        'ms_por_frame': round(tempo / max(frames, 1) * 1000, 1),
+        'ids_unicos':  len(ids) if tem_id else None,
+        'trocas_id':   trocas if tem_id else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dos modos de rastreamento')
+    parser.add_argument('--video', required=True, help='Vídeo local para o teste')
+    parser.add_argument('--model', default='yolo11n.pt')
+    parser.add_argument('--frames', type=int, default=600, help='Frames por modo')
+    parser.add_argument('--modos', nargs='+', default=list(MODOS) + ['duplo'],
+                        choices=list(MODOS) + ['duplo'])
+    parser.add_argument('--saida', default=None, help='Salvar resultados em JSON')
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print("⏱️  BENCHMARK DE RASTREAMENTO")
+    print("="*70)
+    print(f"Vídeo: {args.video}")
+    print(f"Frames por modo: {args.frames}")
+    print(f"Config Ultralytics: {TRACKER_CFG.name}\n")
+
+    resultados = []
+    for modo in args.modos:
+        print(f"▶ {modo}...", flush=True)
+        resultados.append(medir_modo(args.video, modo, args.model, args.frames))
+
+    print(f"\n{'Modo':<12} {'FPS':>7} {'ms/frame':>9} {'IDs':>6} {'Trocas':>7}")
+    print("-" * 45)
+    for r in resultados:
+        ids    = '-' if r['ids_unicos'] is None else r['ids_unicos']
+        trocas = '-' if r['trocas_id'] is None else r['trocas_id']
+        print(f"{r['modo']:<12} {r['fps']:>7.2f} {r['ms_por_frame']:>9.1f} {ids:>6} {trocas:>7}")
+    print("="*70 + "\n")
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print(f"✓ Resultados salvos em {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Cache de ReID por track para o ReconhecedorReID.
+
+Antes cada detecção de cada frame extraía um embedding ResNet50, mesmo de um
+track cuja identidade já estava decidida, e a janela de votação era uma lista
+por track_id (list.pop(0)) que nunca saía do dicionário. Aqui cada track tem
+um ring buffer fixo de votos (índice do jogador na galeria + confiança) e o
+embedding só é recalculado quando:
+
+  - o track é novo, ou passaram `cada` frames desde o último embedding;
+  - a altura/largura da caixa mudou mais que `limiar_caixa` (aproximação,
+    oclusão parcial) ou a aparência mudou (miniatura 8×16 com diferença média
+    acima de `limiar_aparencia` — troca de ID no rastreador);
+  - e, com a votação confiante (janela cheia, `consenso` dos votos no mesmo
+    jogador), só nos dois casos de mudança — a cadência para de contar.
+
+Tracks não vistos por `expira` frames são descartados (memória constante com
+o número de tracks ativos, não com o total do vídeo).
+"""
+
+import cv2
+import numpy as np
+
+JANELA_PADRAO    = 10
+CADA_PADRAO      = 5      # frames entre embeddings de um track ainda indeciso
+EXPIRA_FRAMES    = 30     # lost_track_buffer padrão do ByteTrack
+LIMIAR_CAIXA     = 0.25   # variação relativa de largura/altura
+LIMIAR_APARENCIA = 0.12   # diferença média da miniatura (0–1)
+CONSENSO         = 0.8    # fração dos votos no vencedor para parar de recalcular
+MINIATURA        = (8, 16)
+
+
+def _miniatura(crop_bgr) -> np.ndarray:
+    return cv2.resize(crop_bgr, MINIATURA, interpolation=cv2.INTER_AREA).astype(np.float32) / 255
+
+
+class _Track:
+    __slots__ = ('votos', 'confs', 'n', 'visto', 'ultimo', 'caixa', 'miniatura')
+
+    def __init__(self, janela: int):
+        self.votos     = np.full(janela, -1, dtype=np.int32)   # índice na galeria (-1 = abaixo do limiar)
+        self.confs     = np.zeros(janela, dtype=np.float32)
+        self.n         = 0            # votos já registrados (posição do ring = n % janela)
+        self.visto     = 0
+        self.ultimo    = None         # frame do último embedding
+        self.caixa     = None         # (w, h) no último embedding
+        self.miniatura = None
+
+
+class CacheTracks:
+    """Votos e decisão de re-embedding por track_id, com expiração."""
+
+    def __init__(self, nomes, janela: int = JANELA_PADRAO, cada: int = CADA_PADRAO,
+                 expira: int = EXPIRA_FRAMES, limiar_caixa: float = LIMIAR_CAIXA,
+                 limiar_aparencia: float = LIMIAR_APARENCIA, consenso: float = CONSENSO):
+        self.nomes   = list(nomes)
+        self.janela  = janela
+        self.cada    = max(1, cada)
+        self.expira  = expira
+        self.limiar_caixa     = limiar_caixa
+        self.limiar_aparencia = limiar_aparencia
+        self.consenso = consenso
+        self._tracks = {}
+        self._frame  = 0
+        self.embeddings = 0       # embeddings extraídos
+        self.consultas  = 0       # detecções que passaram pelo cache
+
+    def __contains__(self, track_id) -> bool:
+        return int(track_id) in self._tracks
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def novo_frame(self, frame: int) -> None:
+        """Avança o relógio e descarta os tracks não vistos há `expira` frames."""
+        self._frame = frame
+        limite = frame - self.expira
+        for track_id in [t for t, tr in self._tracks.items() if tr.visto < limite]:
+            del self._tracks[track_id]
+
+    def precisa_embedding(self, track_id, crop_bgr) -> bool:
+        """Marca o track como visto e diz se o crop atual deve ser re-embedado."""
+        self.consultas += 1
+        track = self._tracks.get(int(track_id))
+        if track is None:
+            track = self._tracks[int(track_id)] = _Track(self.janela)
+        track.visto = self._frame
+        if track.ultimo is None:
+            return True
+
+        h, w = crop_bgr.shape[:2]
+        w0, h0 = track.caixa
+        if abs(w - w0) > self.limiar_caixa * w0 or abs(h - h0) > self.limiar_caixa * h0:
+            return True
+        if np.abs(_miniatura(crop_bgr) - track.miniatura).mean() > self.limiar_aparencia:
+            return True
+        if self.confiante(track_id):
+            return False
+        return self._frame - track.ultimo >= self.cada
+
+    def registrar(self, track_id, crop_bgr, indice: int, confianca: float) -> None:
+        """Voto do embedding recém-extraído (indice -1 = nenhum jogador acima do limiar)."""
+        track = self._tracks[int(track_id)]
+        pos = track.n % self.janela
+        track.votos[pos] = indice
+        track.confs[pos] = confianca if indice >= 0 else 0.0
+        track.n += 1
+        track.ultimo    = self._frame
+        track.caixa     = crop_bgr.shape[1::-1]
+        track.miniatura = _miniatura(crop_bgr)
+        self.embeddings += 1
+
+    def tem_votos(self, track_id) -> bool:
+        track = self._tracks.get(int(track_id))
+        return track is not None and track.n > 0
+
+    def _validos(self, track):
+        k = min(track.n, self.janela)
+        return track.votos[:k], track.confs[:k]
+
+    def confiante(self, track_id) -> bool:
+        track = self._tracks[int(track_id)]
+        if track.n < self.janela:
+            return False
+        votos, _ = self._validos(track)
+        validos = votos[votos >= 0]
+        if not len(validos):
+            return False
+        return np.bincount(validos).max() >= self.consenso * self.janela
+
+    def votacao(self, track_id) -> dict:
+        """Vencedor por maioria na janela do track e confiança média dos seus votos."""
+        votos, confs = self._validos(self._tracks[int(track_id)])
+        validos = votos >= 0
+        if not validos.any():
+            return {'nome': f'Desconhecido (ID {track_id})', 'confianca': 0}
+        vencedor = int(np.bincount(votos[validos]).argmax())   # empate: menor índice da galeria
+        return {'nome': self.nomes[vencedor],
+                'confianca': float(confs[votos == vencedor].mean())}
+
+    def resumo(self) -> str:
+        taxa = self.embeddings / self.consultas if self.consultas else 0.0
+        return f"{self.embeddings} embeddings para {self.consultas} detecções ({taxa:.0%}), {len(self)} tracks ativos"
@@ -0,0 +1,619 @@
+"""
+Captura com uma câmera por processo (script.py --workers).
+
+No modo normal as duas câmeras dividem um processo: um GIL e um único pool
+de threads do torch. Aqui cada câmera roda num worker próprio (multiprocessing
+spawn), com sua instância do detector, seu rastreador, seu gravador de cards
+e um orçamento de threads fixo (--threads-por-worker), então uma sessão de
+duas câmeras escala pelos núcleos da máquina de captura.
+
+O processo principal só coordena: repassa a parada (.stop_script, SIGTERM,
+Ctrl+C, 'q'), mostra o progresso e monta o preview lado a lado. Os frames
+anotados não são serializados: cada câmera tem um slot 640x360 BGR em
+multiprocessing.shared_memory, e o worker só anota quando o principal pede
+(janela aberta ou preview vencido), como no modo de um processo.
+
+Checkpoints (--resume) são por câmera: <checkpoint>_ESQ.pkl e <checkpoint>_DIR.pkl.
+
+--fatias N: em vez de um processo por câmera, cada vídeo local é dividido em
+N intervalos processados num pool, com os IDs costurados nas bordas (ver
+processamento_paralelo.py). Os cards de cada fatia vão para uma pasta
+temporária e, no fim, os K melhores de cada ID global vão para a saída.
+
+Uso (o script.py troca o próprio processo por este com --workers ou --fatias):
+    python scripts/script.py --video-esq esq.mp4 --video-dir dir.mp4 --workers --headless
+    python scripts/script.py --video-esq esq.mp4 --video-dir dir.mp4 --fatias 4 --headless
+"""
+
+import os
+import queue
+import shutil
+import signal
+import sys
+import time
+from collections import defaultdict
+from multiprocessing import get_context, shared_memory
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from captura_video import CapturaAoVivo, abrir_fonte, e_stream, liberar_frame
+from checkpoint_captura import caminho_padrao, carregar_checkpoint, remover_checkpoint, salvar_checkpoint
+from melhores_crops import ler_nome_card, nome_card
+from opcoes_captura import criar_parser
+
+LARGURA_PREVIEW = 640
+ALTURA_PREVIEW  = 360
+STOP_FLAG_FILE  = Path(".stop_script")
+CAMERAS         = ("ESQ", "DIR")
+
+
+class SlotPreview:
+    """
+    Último frame anotado de uma câmera (640x360 BGR) em memória compartilhada.
+    O principal liga `pedido`; o worker anota o próximo frame, copia para o
+    slot e incrementa `versao`.
+    """
+
+    def __init__(self, ctx, camera):
+        self.camera = camera
+        self.shm    = shared_memory.SharedMemory(create=True, size=ALTURA_PREVIEW * LARGURA_PREVIEW * 3)
+        self.lock   = ctx.Lock()
+        self.pedido = ctx.Value('b', 0, lock=False)
+        self.versao = ctx.Value('L', 0, lock=False)
+
+    def _imagem(self):
+        return np.ndarray((ALTURA_PREVIEW, LARGURA_PREVIEW, 3), dtype=np.uint8, buffer=self.shm.buf)
+
+    # Worker
+    def escrever(self, frame):
+        with self.lock:
+            cv2.resize(frame, (LARGURA_PREVIEW, ALTURA_PREVIEW), dst=self._imagem())
+            self.versao.value += 1
+        self.pedido.value = 0
+
+    # Principal
+    def ler(self):
+        with self.lock:
+            return self._imagem().copy()
+
+    def fechar(self, remover=False):
+        self.shm.close()
+        if remover:
+            self.shm.unlink()
+
+
+def caminho_checkpoint_camera(caminho, camera) -> Path:
+    caminho = Path(caminho)
+    return caminho.with_name(f"{caminho.stem}_{camera}{caminho.suffix}")
+
+
+# ─── Worker (um processo por câmera) ──────────────────────────────
+def _configurar_threads(n):
+    os.environ['OMP_NUM_THREADS'] = str(n)
+    cv2.setNumThreads(n)
+    try:
+        import torch
+        torch.set_num_threads(n)
+    except ImportError:
+        pass
+
+
+def executar_camera(camera, video, opcoes, slot, fila, parar):
+    """Loop de captura de uma câmera: leitura → gate → YOLO → rastreador → cards."""
+    # Ctrl+C chega ao grupo todo: quem decide parar é o principal (via `parar`)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *_: parar.set())
+    _configurar_threads(opcoes['threads'])
+
+    from detector_backend import carregar_detector
+    from controle_qualidade import ControladorQualidade, imgsz_controlavel, resolver_alvo
+    from deteccao_fundo import carregar_faixa
+    from gate_movimento import GateMovimento
+    from gravador_crops import GravadorCrops
+    from pipeline_camera import FiltroRosto, PipelineCamera, detectar_lote
+    from roi import carregar_rois
+    from rastreamento import criar_rastreador
+
+    def avisar(tipo, **dados):
+        try:
+            fila.put_nowait((tipo, camera, dados))
+        except queue.Full:
+            pass
+
+    gravador   = GravadorCrops(opcoes['output_dir'])
+    model      = carregar_detector(opcoes['detector'], opcoes['model'])
+    rastreador = criar_rastreador(opcoes['rastreador'])
+    rois       = carregar_rois(opcoes['roi']) if opcoes['roi'] else {}
+    fundo      = carregar_faixa(opcoes['fundo'], opcoes['fundo_tile'])
+
+    # Retomada: checkpoint próprio desta câmera
+    ckpt     = caminho_checkpoint_camera(opcoes['checkpoint'], camera)
+    fontes   = {camera: video}
+    inicio   = 0
+    if opcoes['resume']:
+        checkpoint = carregar_checkpoint(ckpt, fontes)
+        if checkpoint is None:
+            print(f"⚠️  [{camera}] Nenhum checkpoint válido em {ckpt} — começando do início", flush=True)
+        else:
+            rastreador = checkpoint['rastreadores'][camera]
+            gravador.incluir_salvos(checkpoint['salvos'])
+            inicio = checkpoint['frames'][camera]
+            print(f"↻ [{camera}] Retomando do frame {inicio} (checkpoint de {checkpoint['data']})", flush=True)
+            if e_stream(video):
+                print(f"⚠️  [{camera}] Stream não permite seek: segue do ponto atual", flush=True)
+
+    gate = GateMovimento(opcoes['gate_stride'], opcoes['gate_limiar']) if opcoes['gate'] else None
+    pipe = PipelineCamera(camera, model, rastreador, gravador, opcoes['confidence'],
+                          roi=rois.get(camera), gate=gate, filtro_rosto=FiltroRosto(opcoes['rostos']),
+                          top_k=opcoes['top_k'], fundo=fundo)
+
+    lote_max = max(1, opcoes['batch'])
+    cap = abrir_fonte(video, inicio, prefetch=opcoes['prefetch'],
+                      largura=opcoes['stream_width'], fps=opcoes['stream_fps'],
+                      n_buffers=opcoes['prefetch'] + lote_max + 2,
+                      ao_vivo=opcoes['live'], buffer_ao_vivo=opcoes['live_buffer'],
+                      parar=parar.is_set)
+    avisar('inicio', total=int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), fps=cap.get(cv2.CAP_PROP_FPS) or 25)
+
+    # Controle de qualidade (--alvo): cada câmera tem modelo e threads próprios → controlador próprio
+    alvo = resolver_alvo(opcoes['alvo'], cap.get(cv2.CAP_PROP_FPS))
+    controle = pipe.controle = (ControladorQualidade(alvo, imgsz=imgsz_controlavel(model), nome=camera)
+                                if alvo else None)
+
+    def _salvar_checkpoint():
+        salvar_checkpoint(ckpt, {
+            'fontes':       fontes,
+            'frames':       {camera: concluidos},
+            'rastreadores': {camera: pipe.rastreador},
+            'salvos':       gravador.nomes_gravados(),
+        })
+
+    frame_count = concluidos = ultimo_checkpoint = inicio
+    interrompido = False
+    while cap.isOpened() and not parar.is_set():
+        frames = []
+        for _ in range(lote_max):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        if not frames:
+            break
+
+        rodar = [(controle is None or controle.processar_frame(frame_count + i)) and pipe.precisa_detectar(f)
+                 for i, f in enumerate(frames)]
+        if opcoes['batch']:
+            lote = [f for f, r in zip(frames, rodar) if r]
+            if controle is None:
+                dets = iter(detectar_lote(model, lote, [pipe.roi] * len(lote), fundo) if lote else [])
+            else:
+                with controle.medir('detector'):
+                    dets = iter(detectar_lote(model, lote, [pipe.roi] * len(lote), fundo, controle.imgsz)
+                                if lote else [])
+            dets = [next(dets) if r else None for r in rodar]
+        else:
+            dets = [None] * len(frames)
+
+        for frame, det, r in zip(frames, dets, rodar):
+            if parar.is_set():
+                interrompido = True
+                break
+            frame_count += 1
+            anotar = bool(slot.pedido.value)
+            saida = pipe.processar(frame, det, anotar, prever=not r)
+            if anotar:
+                slot.escrever(saida)
+            concluidos = frame_count
+            if controle is not None:
+                controle.frame()
+            if frame_count % 30 == 0:
+                estado = cap.estatisticas() if isinstance(cap, CapturaAoVivo) else None
+                avisar('progresso', frames=frame_count, ao_vivo=estado)
+
+        for frame in frames:
+            liberar_frame(cap, frame)
+
+        if opcoes['checkpoint_every'] and concluidos - ultimo_checkpoint >= opcoes['checkpoint_every']:
+            _salvar_checkpoint()
+            ultimo_checkpoint = concluidos
+        if len(frames) < lote_max:
+            break
+
+    interrompido = interrompido or parar.is_set()
+    pipe.finalizar()
+    stats_gravacao = gravador.encerrar()
+    if interrompido:
+        _salvar_checkpoint()
+    else:
+        remover_checkpoint(ckpt)
+    cap.release()
+
+    avisar('fim', frames=frame_count, interrompido=interrompido, gravacao=stats_gravacao,
+           gate=gate.resumo() if gate else None, controle=controle.resumo() if controle else None,
+           ao_vivo=cap.estatisticas() if isinstance(cap, CapturaAoVivo) else None)
+
+
+# ─── Fatias no tempo (--fatias N) ─────────────────────────────────
+def processar_fatia_camera(camera, video, fatia, sobreposicao, opcoes, pasta):
+    """
+    Uma fatia [inicio, fim) de uma câmera. Os cards vão para `pasta` com os IDs
+    locais da fatia; o principal renomeia para os IDs globais depois da costura.
+    """
+    from detector_backend import carregar_detector
+    from deteccao_fundo import carregar_faixa
+    from gate_movimento import GateMovimento
+    from gravador_crops import GravadorCrops
+    from pipeline_camera import FiltroRosto, PipelineCamera, detectar_lote
+    from processamento_paralelo import RegistroJanelas, abrir_na_fatia, deve_parar, reportar_progresso
+    from roi import carregar_rois
+    from rastreamento import criar_rastreador
+
+    os.makedirs(pasta, exist_ok=True)
+    gravador = GravadorCrops(pasta)
+    model    = carregar_detector(opcoes['detector'], opcoes['model'])
+    rois     = carregar_rois(opcoes['roi']) if opcoes['roi'] else {}
+    fundo    = carregar_faixa(opcoes['fundo'], opcoes['fundo_tile'])
+    gate     = GateMovimento(opcoes['gate_stride'], opcoes['gate_limiar']) if opcoes['gate'] else None
+    pipe     = PipelineCamera(camera, model, criar_rastreador(opcoes['rastreador']), gravador,
+                              opcoes['confidence'], roi=rois.get(camera), gate=gate,
+                              filtro_rosto=FiltroRosto(opcoes['rostos']), top_k=opcoes['top_k'],
+                              fundo=fundo)
+    registro = RegistroJanelas(fatia, sobreposicao)
+
+    cap = abrir_na_fatia(video, fatia)
+    lote_max  = max(1, opcoes['batch'])
+    frame_idx = fatia.leitura
+    interrompido = False
+    while frame_idx < fatia.fim and not interrompido:
+        frames = []
+        for _ in range(min(lote_max, fatia.fim - frame_idx)):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        if not frames:
+            break
+
+        rodar = [pipe.precisa_detectar(f) for f in frames]
+        if opcoes['batch']:
+            lote = [f for f, r in zip(frames, rodar) if r]
+            dets = iter(detectar_lote(model, lote, [pipe.roi] * len(lote), fundo) if lote else [])
+            dets = [next(dets) if r else None for r in rodar]
+        else:
+            dets = [None] * len(frames)
+
+        for frame, det, r in zip(frames, dets, rodar):
+            # Aquecimento (antes do início da fatia): só rastreia, os cards são da fatia anterior
+            pipe.processar(frame, det, anotar=False, prever=not r, salvar=frame_idx >= fatia.inicio)
+            registro.registrar(frame_idx, pipe.deteccoes, frame)
+            frame_idx += 1
+            if frame_idx % 30 == 0:
+                reportar_progresso(frame_idx - fatia.leitura)
+                if deve_parar():
+                    interrompido = True
+                    break
+    cap.release()
+    pipe.finalizar()
+
+    return {
+        'camera':       camera,
+        'fatia':        fatia,
+        'frames':       max(0, frame_idx - fatia.inicio),
+        'interrompido': interrompido,
+        'registro':     registro.resultado(),
+        'gravacao':     gravador.encerrar(),
+        'scores':       pipe.selecionador.scores,
+        'gate':         gate.resumo() if gate else None,
+    }
+
+
+def _mover_cards(camera, resultados, mapas, pastas, destino: Path, k: int) -> int:
+    """
+    Junta os cards das fatias nos IDs globais: um track costurado entre fatias
+    fica com os K crops de maior score entre todas elas.
+    """
+    candidatos = defaultdict(list)       # id global → [(score, arquivo)]
+    for res, mapa, pasta in zip(resultados, mapas, pastas):
+        for nome, score in res['scores'].items():
+            lido = ler_nome_card(nome)
+            arq = Path(pasta) / nome
+            if lido is None or lido[1] not in mapa or not arq.exists():
+                continue
+            candidatos[mapa[lido[1]]].append((score, arq))
+
+    movidos = 0
+    for id_global, lista in candidatos.items():
+        # Card de uma execução anterior na pasta de saída: mantido, como no modo sequencial
+        if (destino / nome_card(camera, id_global)).exists():
+            continue
+        lista.sort(key=lambda c: c[0], reverse=True)
+        for rank, (_, arq) in enumerate(lista[:k], 1):
+            os.replace(arq, destino / nome_card(camera, id_global, rank))
+            movidos += 1
+    return movidos
+
+
+def main_fatias(args, opcoes):
+    """Cada vídeo local dividido em N intervalos; os intervalos rodam num pool de processos."""
+    from processamento_paralelo import costurar_fatias, dividir_video, executar_fatias
+
+    fontes = {"ESQ": args.video_esq, "DIR": args.video_dir}
+    streams = [c for c, v in fontes.items() if e_stream(v)]
+    if streams:
+        print(f"❌ Erro: --fatias precisa de arquivos locais (stream em {', '.join(streams)})")
+        return 1
+    for opcao, nome in ((args.resume, '--resume'), (args.output_video, '--output-video'),
+                        (args.preview, '--preview'), (args.live, '--live')):
+        if opcao:
+            print(f"⚠️  {nome} não é suportado com --fatias — ignorado")
+
+    fatias = {c: dividir_video(v, args.fatias, max(0, args.sobreposicao)) for c, v in fontes.items()}
+    temporaria = Path(args.output_dir) / '.fatias'
+    tarefas, pastas = [], {c: [] for c in CAMERAS}
+    for c in CAMERAS:
+        for f in fatias[c]:
+            pasta = temporaria / f"{c}_{f.indice:02d}"
+            pastas[c].append(pasta)
+            tarefas.append((c, fontes[c], f, max(0, args.sobreposicao), opcoes, str(pasta)))
+    totais = {c: fatias[c][-1].fim for c in CAMERAS}
+
+    print(f"\n{'='*60}")
+    print(f"🎬 Iniciando captura de imagens (vídeo fatiado em {args.fatias} intervalos)")
+    print(f"{'='*60}")
+    print(f"Vídeo ESQ: {fontes['ESQ']} ({totais['ESQ']} frames)")
+    print(f"Vídeo DIR: {fontes['DIR']} ({totais['DIR']} frames)")
+    print(f"Rastreador: {args.rastreador}")
+    print(f"Processos: {len(tarefas)} | sobreposição: {args.sobreposicao} frames")
+    print(f"{'='*60}\n")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    parar = {'flag': False}
+
+    def signal_handler(sig, frame):
+        print('\n\n⚠️  Interrupção detectada! Finalizando...')
+        parar['flag'] = True
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    def deve_parar():
+        if STOP_FLAG_FILE.exists() and not parar['flag']:
+            print('\n\n⚠️  Flag de parada detectada! Finalizando...')
+            STOP_FLAG_FILE.unlink()
+            parar['flag'] = True
+        return parar['flag']
+
+    feitos = [0] * len(tarefas)
+    total = sum(f.fim - f.leitura for c in CAMERAS for f in fatias[c])
+
+    def progresso(indice_tarefa, frames):
+        feitos[indice_tarefa] = frames
+        print(f"\rProgresso: {sum(feitos)}/{total} frames ({sum(feitos) / total * 100:.1f}%)",
+              end='', flush=True)
+
+    print("\nIniciando processamento...")
+    print("✓ Modo sem janela (headless) - execute 'touch .stop_script' para parar")
+    t0 = time.monotonic()
+    resultados = executar_fatias(processar_fatia_camera, tarefas, len(tarefas),
+                                 progresso=progresso, threads=args.threads_por_worker,
+                                 parar=deve_parar)
+
+    interrompido = parar['flag'] or any(r['interrompido'] for r in resultados)
+    print(f"\n\n{'='*60}")
+    print("✅ Processamento finalizado!" if not interrompido else "⚠️  Processamento interrompido")
+    print(f"{'='*60}")
+    for c in CAMERAS:
+        res_c = [r for r in resultados if r['camera'] == c]
+        mapas = costurar_fatias([r['registro'] for r in res_c])
+        movidos = _mover_cards(c, res_c, mapas, pastas[c], Path(args.output_dir), max(1, args.top_k))
+        ids_locais = sum(len(m) for m in mapas)
+        ids_globais = len({g for m in mapas for g in m.values()})
+        print(f"Frames processados {c}: {sum(r['frames'] for r in res_c)}/{totais[c]}")
+        print(f"IDs {c}: {ids_globais} ({ids_locais - ids_globais} costurados entre fatias) | "
+              f"cards novos: {movidos}")
+        for r in res_c:
+            if r['gate']:
+                print(f"Gate de movimento {c}/{r['fatia'].indice}: {r['gate']}")
+    shutil.rmtree(temporaria, ignore_errors=True)
+    print(f"Imagens salvas em: {args.output_dir}/")
+    print(f"Tempo: {time.monotonic() - t0:.1f}s")
+    print(f"{'='*60}\n")
+    return 0
+
+
+# ─── Processo principal ───────────────────────────────────────────
+def main():
+    args, _ = criar_parser().parse_known_args()
+    headless = (
+        args.headless or
+        os.environ.get('HEADLESS', '0') == '1' or
+        os.environ.get('DISPLAY', '') == ''
+    )
+    preview_intervalo = 1.0 / args.preview_fps if args.preview_fps > 0 else 0.0
+    checkpoint = args.checkpoint or caminho_padrao(args.output_dir)
+    threads = args.threads_por_worker or max(1, (os.cpu_count() or 2) // len(CAMERAS))
+    fontes = {"ESQ": args.video_esq, "DIR": args.video_dir}
+
+    opcoes = {
+        'model': args.model, 'detector': args.detector, 'confidence': args.confidence,
+        'output_dir': args.output_dir, 'rostos': args.rostos, 'top_k': max(1, args.top_k),
+        'rastreador': args.rastreador,
+        'roi': args.roi, 'fundo': args.fundo, 'fundo_tile': args.fundo_tile,
+        'alvo': args.alvo, 'batch': max(0, args.batch), 'prefetch': max(0, args.prefetch),
+        'stream_width': args.stream_width, 'stream_fps': args.stream_fps,
+        'live': args.live, 'live_buffer': max(1, args.live_buffer),
+        'gate': args.gate, 'gate_stride': max(1, args.gate_stride), 'gate_limiar': args.gate_limiar,
+        'resume': args.resume, 'checkpoint': str(checkpoint),
+        'checkpoint_every': max(0, args.checkpoint_every), 'threads': threads,
+    }
+    if args.fatias > 1:
+        return main_fatias(args, opcoes)
+
+    print(f"\n{'='*60}")
+    print("🎬 Iniciando captura de imagens (um processo por câmera)")
+    print(f"{'='*60}")
+    print(f"Modo: {'🖥️  Headless (sem janela)' if headless else '🪟 Com janela'}")
+    print(f"Vídeo ESQ: {fontes['ESQ']}")
+    print(f"Vídeo DIR: {fontes['DIR']}")
+    print(f"Rastreador: {args.rastreador}")
+    print(f"Workers: {len(CAMERAS)} × {threads} thread(s)")
+    if args.batch:
+        print(f"Batch: {args.batch} frame(s) por câmera")
+    print(f"{'='*60}\n")
+    if args.output_video:
+        print("⚠️  --output-video não é suportado com --workers — ignorado")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    ctx   = get_context('spawn')
+    fila  = ctx.Queue(maxsize=256)
+    parar = ctx.Event()
+    slots = {c: SlotPreview(ctx, c) for c in CAMERAS}
+
+    # Parada vinda de fora (Ctrl+C, SIGTERM do executor) vale para os dois workers
+    def signal_handler(sig, frame):
+        print('\n\n⚠️  Interrupção detectada! Finalizando...')
+        parar.set()
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    processos = {
+        c: ctx.Process(target=executar_camera, name=f"captura-{c}",
+                       args=(c, fontes[c], opcoes, slots[c], fila, parar))
+        for c in CAMERAS
+    }
+    for p in processos.values():
+        p.start()
+
+    print("\nIniciando processamento...")
+    if headless:
+        print("✓ Modo sem janela (headless) - execute 'touch .stop_script' para parar")
+    else:
+        print("✓ Pressione 'q' na janela do vídeo para sair")
+    print("✓ Salvando apenas imagens com rostos detectados" if args.rostos else "✓ Salvando todas as imagens")
+
+    totais    = {}
+    frames    = {c: 0 for c in CAMERAS}
+    ao_vivo   = {}
+    finais    = {}
+    versoes   = {c: 0 for c in CAMERAS}
+    aguardando = False
+    ultimo_preview = 0.0
+
+    def _mensagens(timeout):
+        try:
+            tipo, camera, dados = fila.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while True:
+            if tipo == 'inicio':
+                totais[camera] = dados['total']
+            elif tipo == 'progresso':
+                frames[camera] = dados['frames']
+                if dados['ao_vivo']:
+                    ao_vivo[camera] = dados['ao_vivo']
+            elif tipo == 'fim':
+                frames[camera] = dados['frames']
+                finais[camera] = dados
+            try:
+                tipo, camera, dados = fila.get_nowait()
+            except queue.Empty:
+                return
+
+    def _progresso():
+        if len(totais) < len(CAMERAS):
+            return
+        if all(totais.values()):
+            partes = [f"{c} {frames[c]}/{totais[c]} ({frames[c] / totais[c] * 100:.1f}%)" for c in CAMERAS]
+            print("\rProgresso: " + " | ".join(partes), end='', flush=True)
+        else:
+            partes = [f"{c} {frames[c]}" for c in CAMERAS]
+            partes += [f"{c}: {st['descartados']} descartados, latência {st['latencia_ms']:.0f} ms"
+                       for c, st in ao_vivo.items()]
+            print("\rFrames: " + " | ".join(partes), end='', flush=True)
+
+    ultimo_progresso = 0.0
+    while any(p.is_alive() for p in processos.values()):
+        _mensagens(0.02)
+        agora = time.monotonic()
+
+        if STOP_FLAG_FILE.exists() and not parar.is_set():
+            print('\n\n⚠️  Flag de parada detectada! Finalizando...')
+            STOP_FLAG_FILE.unlink()
+            parar.set()
+
+        if agora - ultimo_progresso >= 1.0:
+            _progresso()
+            ultimo_progresso = agora
+
+        # Preview: pede um frame anotado a cada câmera e junta quando os dois chegam
+        # (ou quando a câmera que falta já terminou)
+        devido = (not headless) or (bool(args.preview) and agora - ultimo_preview >= preview_intervalo)
+        if devido and not aguardando and not parar.is_set():
+            for s in slots.values():
+                s.pedido.value = 1
+            aguardando = True
+        if aguardando and all(slots[c].versao.value != versoes[c] or not processos[c].is_alive()
+                              for c in CAMERAS):
+            for c in CAMERAS:
+                versoes[c] = slots[c].versao.value
+            combined = np.hstack([slots[c].ler() for c in CAMERAS])
+            aguardando = False
+            ultimo_preview = agora
+            if args.preview:
+                tmp_path = f"{args.preview}.tmp.jpg"
+                if cv2.imwrite(tmp_path, combined, [cv2.IMWRITE_JPEG_QUALITY, 70]):
+                    os.replace(tmp_path, args.preview)
+            if not headless:
+                cv2.imshow("Futebol de Terca - Analise Multi-Camera", combined)
+        if not headless and cv2.waitKey(1) & 0xFF == ord('q'):
+            print("\n✓ Usuário solicitou parada")
+            parar.set()
+
+    for p in processos.values():
+        p.join()
+    _mensagens(0.1)
+    for s in slots.values():
+        s.fechar(remover=True)
+
+    interrompido = parar.is_set() or any(d['interrompido'] for d in finais.values())
+    if interrompido:
+        print(f"\n💾 Checkpoints salvos: "
+              f"{', '.join(str(caminho_checkpoint_camera(checkpoint, c)) for c in CAMERAS)} (use --resume)")
+
+    print(f"\n\n{'='*60}")
+    print("✅ Processamento finalizado!" if not interrompido else "⚠️  Processamento interrompido")
+    print(f"{'='*60}")
+    for c in CAMERAS:
+        total = f"/{totais[c]}" if totais.get(c) else " (stream)"
+        print(f"Frames processados {c}: {frames[c]}{total}")
+    print(f"Imagens salvas em: {args.output_dir}/")
+    for c in CAMERAS:
+        dados = finais.get(c)
+        if dados is None:
+            print(f"⚠️  Worker {c} terminou sem resumo (código {processos[c].exitcode})")
+            continue
+        if dados['gate']:
+            print(f"Gate de movimento {c}: {dados['gate']}")
+        if dados['controle']:
+            print(f"Controle de qualidade {c}: {dados['controle']}")
+        st = dados['ao_vivo']
+        if st:
+            print(f"Ao vivo {c}: {st['entregues']}/{st['lidos']} frames processados, "
+                  f"{st['descartados']} descartados, latência média {st['latencia_media_ms']:.0f} ms "
+                  f"(máx {st['latencia_max_ms']:.0f} ms)")
+        g = dados['gravacao']
+        print(f"Cards gravados {c}: {g['gravados']} "
+              f"({g['pendentes_no_encerramento']} gravados no encerramento, "
+              f"{g['descartados']} descartados por fila cheia, "
+              f"{g['erros']} erros)")
+    print(f"{'='*60}\n")
+
+    if not headless:
+        cv2.destroyAllWindows()
+    return 1 if any(p.exitcode for p in processos.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
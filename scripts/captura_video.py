@@ -0,0 +1,413 @@
+"""
+Leitura de vídeo para a captura (script.py).
+
+  - StreamCapture   → URL de stream via pipe yt-dlp | ffmpeg (imita cv2.VideoCapture)
+  - CapturaPrefetch → decodifica à frente numa thread, com fila limitada
+  - CapturaAoVivo   → streams ao vivo: drena o pipe numa thread e mantém só os
+                      N frames mais recentes (latência limitada, descarta o resto)
+  - abrir_fonte     → escolhe e empilha as classes acima para um arquivo ou URL
+
+StreamCapture lê cada frame com readinto() direto num anel de buffers
+pré-alocados (sem bytes intermediários nem .copy()). O frame devolvido é
+o próprio buffer: quem consome chama liberar_frame(cap, frame) quando
+terminar de usá-lo, e o buffer volta para o anel.
+
+O OpenCV e o ffmpeg liberam o GIL durante o decode, então a thread produtora
+decodifica o próximo frame enquanto a thread principal roda o YOLO.
+"""
+
+import json
+import queue
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+class StreamCapture:
+    """
+    Imita cv2.VideoCapture mas obtém frames via pipe:
+      yt-dlp (download) | ffmpeg (decode) -> frames bgr24
+    Usado quando a fonte é uma URL de stream (YouTube, etc.)
+
+    largura/fps: reduz resolução e taxa já no ffmpeg (-vf scale,fps), antes
+    dos bytes atravessarem o pipe. n_buffers: tamanho inicial do anel; se o
+    consumidor segurar mais frames que isso, o anel cresce sob demanda.
+    """
+    def __init__(self, url, largura=None, fps=None, n_buffers=8):
+        self._url    = url
+        self._opened = False
+        self._procs  = []
+        self._w = self._h = 0
+
+        # Obtém dimensões via yt-dlp --dump-json
+        try:
+            info_r = subprocess.run(
+                [sys.executable, '-m', 'yt_dlp',
+                 '--extractor-args', 'youtube:player_client=android',
+                 '--dump-json', '--no-download', '--quiet', '--no-warnings',
+                 '--no-playlist', url],
+                capture_output=True, text=True, timeout=25
+            )
+            if info_r.returncode == 0 and info_r.stdout.strip():
+                info = json.loads(info_r.stdout.splitlines()[0])
+                self._w = info.get('width',  640) or 640
+                self._h = info.get('height', 360) or 360
+        except Exception:
+            pass
+
+        if not self._w:
+            self._w, self._h = 640, 360  # fallback 360p
+
+        # Resolução de saída do ffmpeg: mantém o aspecto, lados pares (bgr24/yuv)
+        if largura and largura < self._w:
+            self._h = max(2, int(round(self._h * largura / self._w / 2)) * 2)
+            self._w = int(largura) // 2 * 2
+        filtros = f'scale={self._w}:{self._h}'
+        if fps:
+            filtros += f',fps={fps}'
+
+        # yt-dlp: baixa stream direto para stdout via cliente android (sem SABR)
+        yt_proc = subprocess.Popen(
+            [sys.executable, '-m', 'yt_dlp',
+             '--extractor-args', 'youtube:player_client=android',
+             '-f', '18/best[height<=480]/best',
+             '--no-playlist', '--quiet', '--no-warnings',
+             '-o', '-', url],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        # ffmpeg: decodifica e emite frames BGR24 brutos para stdout
+        ff_proc = subprocess.Popen(
+            ['ffmpeg', '-i', 'pipe:0',
+             '-f', 'rawvideo', '-pix_fmt', 'bgr24',
+             '-vf', filtros,
+             'pipe:1', '-loglevel', 'quiet'],
+            stdin=yt_proc.stdout,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        yt_proc.stdout.close()  # permite SIGPIPE se ffmpeg morrer
+        self._procs  = [yt_proc, ff_proc]
+        self._ff     = ff_proc
+        self._bytes_per_frame = self._w * self._h * 3
+
+        # Anel de buffers: _livres guarda os que podem ser preenchidos de novo
+        self._lock_buffers = threading.Lock()
+        self._buffers = {}
+        self._livres  = deque()
+        for _ in range(max(1, n_buffers)):
+            self._livres.append(self._novo_buffer())
+
+        self._opened = True
+        print(f"\n📺 Stream pipe iniciado ({self._w}x{self._h}"
+              + (f" @ {fps}fps" if fps else "") + ") — yt-dlp → ffmpeg → OpenCV")
+
+    def _novo_buffer(self):
+        buf = np.empty((self._h, self._w, 3), dtype=np.uint8)
+        self._buffers[id(buf)] = buf
+        return buf
+
+    def _pegar_buffer(self):
+        with self._lock_buffers:
+            if self._livres:
+                return self._livres.popleft()
+            # Consumidor segurando todos os buffers: cresce o anel
+            return self._novo_buffer()
+
+    def liberar(self, frame):
+        """Devolve ao anel um frame entregue por read() que não será mais usado."""
+        if frame is None:
+            return
+        with self._lock_buffers:
+            if id(frame) in self._buffers and frame is self._buffers[id(frame)]:
+                self._livres.append(frame)
+
+    def isOpened(self):
+        # O fim do pipe é detectado em read(); frames já no pipe ainda são entregues
+        return self._opened
+
+    def read(self):
+        if not self._opened:
+            return False, None
+        frame = self._pegar_buffer()
+        destino = memoryview(frame).cast('B')
+        lidos = 0
+        while lidos < self._bytes_per_frame:
+            n = self._ff.stdout.readinto(destino[lidos:])
+            if not n:
+                # Fim do pipe (ou frame incompleto): devolve o buffer e encerra
+                self.liberar(frame)
+                self._opened = False
+                return False, None
+            lidos += n
+        return True, frame
+
+    def get(self, prop_id):
+        """Streams não têm frame count."""
+        return 0
+
+    def release(self):
+        self._opened = False
+        for p in self._procs:
+            try:
+                p.terminate()
+            except Exception:
+                pass
+
+
+class CapturaPrefetch:
+    """
+    Envolve uma captura (cv2.VideoCapture ou StreamCapture) com uma thread
+    produtora que enche uma fila limitada de frames já decodificados.
+
+    - Back-pressure: com a fila cheia a produtora espera o consumidor.
+    - Parada: `parar` (callable, ex. lambda: STOP_FLAG) é consultado a cada
+      frame; release() encerra a thread antes de liberar a captura.
+    Mantém a interface isOpened / read / get / release.
+    """
+
+    _FIM = object()
+    _PROPS_CACHE = (cv2.CAP_PROP_FRAME_COUNT, cv2.CAP_PROP_FPS,
+                    cv2.CAP_PROP_FRAME_WIDTH, cv2.CAP_PROP_FRAME_HEIGHT)
+
+    def __init__(self, cap, tamanho_fila=4, parar=None):
+        self._cap     = cap
+        self._fila    = queue.Queue(maxsize=max(1, tamanho_fila))
+        self._encerrar = threading.Event()
+        self._parar   = parar
+        self._fim     = not cap.isOpened()
+        # Propriedades lidas antes da thread começar (evita get() concorrente com read())
+        self._props   = {p: cap.get(p) for p in self._PROPS_CACHE}
+        self._thread  = threading.Thread(target=self._produzir, daemon=True)
+        if not self._fim:
+            self._thread.start()
+
+    def _deve_parar(self):
+        return self._encerrar.is_set() or (self._parar is not None and self._parar())
+
+    def _colocar(self, item):
+        """put() que acorda periodicamente para respeitar o pedido de parada."""
+        while not self._encerrar.is_set():
+            try:
+                self._fila.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if self._parar is not None and self._parar():
+                    return False
+        return False
+
+    def _produzir(self):
+        try:
+            while not self._deve_parar():
+                ret, frame = self._cap.read()
+                if not ret:
+                    break
+                if not self._colocar(frame):
+                    liberar_frame(self._cap, frame)
+                    break
+        except Exception as e:
+            print(f"\n⚠️  Erro na leitura antecipada: {e}", flush=True)
+        finally:
+            # Garante que o consumidor não fique bloqueado em read()
+            while not self._encerrar.is_set():
+                try:
+                    self._fila.put(self._FIM, timeout=0.1)
+                    break
+                except queue.Full:
+                    if self._parar is not None and self._parar():
+                        # Consumidor também está parando: descarta um frame para caber o FIM
+                        try:
+                            liberar_frame(self._cap, self._fila.get_nowait())
+                        except queue.Empty:
+                            pass
+
+    def isOpened(self):
+        return not self._fim
+
+    def read(self):
+        if self._fim:
+            return False, None
+        item = self._fila.get()
+        if item is self._FIM:
+            self._fim = True
+            return False, None
+        return True, item
+
+    def get(self, prop_id):
+        if prop_id in self._props:
+            return self._props[prop_id]
+        return self._cap.get(prop_id)
+
+    def liberar(self, frame):
+        liberar_frame(self._cap, frame)
+
+    def release(self):
+        self._fim = True
+        self._encerrar.set()
+        # Esvazia a fila para destravar a produtora caso esteja em put()
+        try:
+            while True:
+                item = self._fila.get_nowait()
+                if item is not self._FIM:
+                    self.liberar(item)
+        except queue.Empty:
+            pass
+        if self._thread.is_alive():
+            self._thread.join(timeout=2)
+        self._cap.release()
+
+
+class CapturaAoVivo:
+    """
+    Modo ao vivo para streams: uma thread lê o pipe o mais rápido possível e
+    guarda só os últimos `n_frames` frames. Se a detecção for mais lenta que o
+    tempo real, os frames antigos são descartados (e devolvidos ao anel) em vez
+    de acumular atraso no pipe.
+
+    - read() entrega o frame mais antigo entre os guardados (com n_frames=1,
+      sempre o mais novo disponível) e bloqueia só se ainda não chegou nenhum.
+    - Latência de ponta a ponta: do frame sair do pipe até o consumidor pedir
+      o próximo (ou seja, leitura + espera + processamento do frame anterior).
+    Mantém a interface isOpened / read / get / liberar / release.
+    """
+
+    def __init__(self, cap, n_frames=1, parar=None):
+        self._cap       = cap
+        self._frames    = deque()
+        self._n_frames  = max(1, n_frames)
+        self._cond      = threading.Condition()
+        self._encerrar  = threading.Event()
+        self._parar     = parar
+        self._fim_leitura = not cap.isOpened()
+        self._fim       = self._fim_leitura
+        self._t_entregue = None
+        # Estatísticas
+        self.lidos       = 0
+        self.descartados = 0
+        self.entregues   = 0
+        self._lat_soma   = 0.0
+        self._lat_max    = 0.0
+        self._lat_ultima = 0.0
+        self._thread = threading.Thread(target=self._ler, daemon=True)
+        if not self._fim:
+            self._thread.start()
+
+    def _ler(self):
+        try:
+            while not self._encerrar.is_set():
+                if self._parar is not None and self._parar():
+                    break
+                ret, frame = self._cap.read()
+                if not ret:
+                    break
+                agora = time.monotonic()
+                with self._cond:
+                    self.lidos += 1
+                    self._frames.append((frame, agora))
+                    while len(self._frames) > self._n_frames:
+                        antigo, _ = self._frames.popleft()
+                        liberar_frame(self._cap, antigo)
+                        self.descartados += 1
+                    self._cond.notify()
+        except Exception as e:
+            print(f"\n⚠️  Erro na leitura ao vivo: {e}", flush=True)
+        finally:
+            with self._cond:
+                self._fim_leitura = True
+                self._cond.notify_all()
+
+    def _registrar_latencia(self):
+        if self._t_entregue is None:
+            return
+        lat = time.monotonic() - self._t_entregue
+        self._lat_ultima = lat
+        self._lat_soma  += lat
+        self._lat_max    = max(self._lat_max, lat)
+        self._t_entregue = None
+
+    def isOpened(self):
+        return not self._fim
+
+    def read(self):
+        self._registrar_latencia()
+        if self._fim:
+            return False, None
+        with self._cond:
+            while not self._frames and not self._fim_leitura:
+                self._cond.wait(timeout=0.1)
+                if self._parar is not None and self._parar():
+                    break
+            if not self._frames:
+                self._fim = True
+                return False, None
+            frame, t_leitura = self._frames.popleft()
+        self.entregues  += 1
+        self._t_entregue = t_leitura
+        return True, frame
+
+    def estatisticas(self) -> dict:
+        """Frames lidos/descartados/entregues e latência (ms) de ponta a ponta."""
+        medidos = self.entregues - (1 if self._t_entregue is not None else 0)
+        return {
+            'lidos':       self.lidos,
+            'descartados': self.descartados,
+            'entregues':   self.entregues,
+            'latencia_ms':        round(self._lat_ultima * 1000, 1),
+            'latencia_media_ms':  round(self._lat_soma / medidos * 1000, 1) if medidos > 0 else 0.0,
+            'latencia_max_ms':    round(self._lat_max * 1000, 1),
+        }
+
+    def get(self, prop_id):
+        return self._cap.get(prop_id)
+
+    def liberar(self, frame):
+        liberar_frame(self._cap, frame)
+
+    def release(self):
+        self._fim = True
+        self._encerrar.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=2)
+        with self._cond:
+            while self._frames:
+                frame, _ = self._frames.popleft()
+                liberar_frame(self._cap, frame)
+        self._cap.release()
+
+
+def liberar_frame(cap, frame):
+    """Devolve o frame ao anel da captura, se ela tiver um (no-op para cv2.VideoCapture)."""
+    liberar = getattr(cap, 'liberar', None)
+    if liberar is not None:
+        liberar(frame)
+
+
+def e_stream(caminho) -> bool:
+    return bool(caminho) and caminho.startswith(('http://', 'https://'))
+
+
+def abrir_fonte(caminho, inicio=0, prefetch=4, largura=None, fps=None, n_buffers=8,
+                ao_vivo=False, buffer_ao_vivo=1, parar=None):
+    """
+    Abre arquivo local ou stream YouTube via pipe, já com a leitura em thread:
+    CapturaAoVivo para streams com ao_vivo=True, CapturaPrefetch caso contrário.
+    inicio: frame inicial (seek só em arquivos locais, antes da thread começar).
+    """
+    if e_stream(caminho):
+        cap = StreamCapture(caminho, largura=largura, fps=fps,
+                            n_buffers=n_buffers + (buffer_ao_vivo if ao_vivo else 0))
+        if ao_vivo:
+            return CapturaAoVivo(cap, buffer_ao_vivo, parar=parar)
+    else:
+        cap = cv2.VideoCapture(caminho)
+        # Seek antes da thread de prefetch começar a ler
+        if inicio and cap.isOpened():
+            cap.set(cv2.CAP_PROP_POS_FRAMES, inicio)
+    if prefetch > 0:
+        cap = CapturaPrefetch(cap, prefetch, parar=parar)
+    return cap
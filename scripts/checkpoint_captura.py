@@ -0,0 +1,65 @@
+"""
+Checkpoints da captura (script.py) para retomar uma execução interrompida.
+
+O checkpoint guarda, por fonte, o índice do próximo frame a processar, o
+estado completo dos rastreadores (para os IDs continuarem de onde pararam e
+não colidirem com os cards já salvos) e o conjunto de cards já gravados.
+
+É gravado a cada N frames e na parada (.stop_script, SIGTERM, timeout do
+executor), sempre de forma atômica: arquivo temporário + os.replace, então
+uma interrupção no meio da escrita nunca corrompe o checkpoint anterior.
+"""
+
+import os
+import pickle
+from datetime import datetime
+from pathlib import Path
+
+VERSAO = 1
+NOME_PADRAO = '.checkpoint_captura.pkl'
+
+
+def caminho_padrao(output_dir) -> Path:
+    """O checkpoint fica junto dos cards que ele descreve."""
+    return Path(output_dir) / NOME_PADRAO
+
+
+def salvar_checkpoint(caminho, estado: dict) -> None:
+    caminho = Path(caminho)
+    dados = dict(estado, versao=VERSAO, data=datetime.now().isoformat(timespec='seconds'))
+    tmp = caminho.with_name(caminho.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        pickle.dump(dados, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, caminho)
+
+
+def carregar_checkpoint(caminho, fontes: dict = None):
+    """
+    Lê o checkpoint. Retorna None se não existir, for de outra versão ou se
+    as fontes (câmera → vídeo) não baterem com as da execução atual.
+    """
+    caminho = Path(caminho)
+    if not caminho.exists():
+        return None
+    try:
+        with open(caminho, 'rb') as f:
+            dados = pickle.load(f)
+    except Exception as e:
+        print(f"⚠️  Checkpoint ilegível ({caminho}): {e}")
+        return None
+    if dados.get('versao') != VERSAO:
+        print(f"⚠️  Checkpoint de outra versão ignorado ({caminho})")
+        return None
+    if fontes is not None and dados.get('fontes') != fontes:
+        print(f"⚠️  Checkpoint é de outros vídeos — ignorado ({caminho})")
+        return None
+    return dados
+
+
+def remover_checkpoint(caminho) -> None:
+    try:
+        Path(caminho).unlink()
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,226 @@
+"""
+Controle adaptativo de qualidade: mantém uma taxa alvo de processamento.
+
+Os mesmos scripts rodam em notebook e em servidor, mas o tamanho de entrada
+do YOLO, o salto de frames (SKIP_FRAMES) e a frequência do ReID eram
+constantes. O controlador mede o tempo de cada etapa em tempo de execução e,
+a cada janela (~2 s), compara a taxa de frames do vídeo consumidos por
+segundo com o alvo:
+
+  - abaixo do alvo → piora um ajuste, escolhido pela etapa que mais pesa:
+        detector → imgsz menor (640 → 512 → 416 → 320)
+        reid     → ReID de cada track a cada N frames (1 → 2 → 3 → 5 → 10)
+        resto (etapa medida < 30% do tempo) ou ajuste já no limite
+                 → stride (processa 1 a cada N frames)
+  - folga (≥ FOLGA × alvo) por algumas janelas seguidas → desfaz o último
+    ajuste; sem nada para desfazer, melhora rumo à qualidade máxima.
+    Se o ajuste melhorado volta a ser piorado, passa a exigir o dobro de
+    janelas com folga antes da próxima melhora (evita oscilar).
+
+Toda mudança é impressa e fica em `ajustes` (frame, de → para, taxa, motivo).
+
+Alvo (--alvo):
+    tempo-real   → fps do vídeo (streams ao vivo)
+    2x           → no máximo 2x a duração do vídeo (fps / 2)
+    12           → 12 frames por segundo
+
+Uso:
+    controle = ControladorQualidade(resolver_alvo('tempo-real', fps), imgsz=640, stride=1)
+    for idx, frame in enumerate(frames):
+        if controle.processar_frame(idx):
+            with controle.medir('detector'):
+                detections = detectar(model, frame, imgsz=controle.imgsz)
+        controle.frame()
+"""
+
+import time
+from contextlib import contextmanager
+
+IMGSZ_NIVEIS  = (640, 512, 416, 320)      # múltiplos de 32, do melhor para o mais barato
+STRIDE_NIVEIS = (1, 2, 3, 4, 6, 8)
+REID_NIVEIS   = (1, 2, 3, 5, 10)
+
+JANELA_S      = 2.0     # segundos entre avaliações
+FOLGA         = 1.25    # taxa ≥ FOLGA × alvo → sobra tempo para melhorar
+TOLERANCIA    = 0.95    # taxa < TOLERANCIA × alvo → piora um ajuste
+CALMAS_MIN    = 2       # janelas seguidas com folga antes de melhorar
+CALMAS_MAX    = 16
+PARCELA_MIN   = 0.3     # fração do tempo da janela para uma etapa ditar o ajuste
+FPS_PADRAO    = 25.0    # streams sem fps informado
+
+
+def resolver_alvo(texto, fps_video: float = None, partes: int = 1):
+    """
+    'tempo-real' | '2x' | '12' → frames do vídeo por segundo a sustentar (None = desligado).
+    partes: processos dividindo o mesmo vídeo (cada um precisa de alvo/partes).
+    """
+    if not texto:
+        return None
+    fps = fps_video or FPS_PADRAO
+    texto = str(texto).strip().lower()
+    try:
+        if texto in ('tempo-real', 'tempo_real', 'realtime', '1x'):
+            alvo = fps
+        elif texto.endswith('x'):
+            alvo = fps / float(texto[:-1])
+        else:
+            alvo = float(texto)
+    except ValueError:
+        raise ValueError(f"Alvo inválido: {texto!r} (use tempo-real, 2x ou um número de fps)")
+    if alvo <= 0:
+        raise ValueError(f"Alvo inválido: {texto!r}")
+    return alvo / max(1, partes)
+
+
+def _niveis(padrao: tuple, inicial) -> tuple:
+    """Escada de valores com o valor inicial incluído (ordem do melhor para o mais barato)."""
+    if inicial in padrao:
+        return padrao
+    reverso = padrao[0] > padrao[-1]
+    return tuple(sorted(set(padrao) | {inicial}, reverse=reverso))
+
+
+class ControladorQualidade:
+    """
+    Ajusta imgsz, stride e cadência do ReID para sustentar `alvo_fps`.
+    imgsz=None / reid_cada=None: esse ajuste não existe no script
+    (ex.: IR OpenVINO estático só aceita o imgsz do export).
+    """
+
+    def __init__(self, alvo_fps: float, imgsz: int = None, stride: int = 1,
+                 reid_cada: int = None, nome: str = '', janela: float = JANELA_S):
+        self.alvo   = alvo_fps
+        self.nome   = nome
+        self.janela = janela
+        iniciais = {'imgsz': imgsz, 'stride': max(1, stride), 'reid': reid_cada and max(1, reid_cada)}
+        escadas  = {'imgsz': IMGSZ_NIVEIS, 'stride': STRIDE_NIVEIS, 'reid': REID_NIVEIS}
+        self._niveis, self._indice = {}, {}
+        for ajuste, inicial in iniciais.items():
+            if inicial:
+                self._niveis[ajuste] = _niveis(escadas[ajuste], inicial)
+                self._indice[ajuste] = self._niveis[ajuste].index(inicial)
+        self._pilha     = []        # ajustes piorados (desfeitos na ordem inversa)
+        self._tempos    = {}        # etapa → segundos na janela atual
+        self._frames    = 0
+        self._inicio    = time.perf_counter()
+        self._calmas    = 0
+        self._calmas_necessarias = CALMAS_MIN
+        self._ultima_melhora = None
+        self.frames_total = 0
+        self.ultima_taxa  = None
+        self.ajustes      = []
+
+    # ─── Valores atuais ───────────────────────────────────────────
+    def _valor(self, ajuste):
+        if ajuste not in self._niveis:
+            return None
+        return self._niveis[ajuste][self._indice[ajuste]]
+
+    @property
+    def imgsz(self):
+        return self._valor('imgsz')
+
+    @property
+    def stride(self):
+        return self._valor('stride')
+
+    @property
+    def reid_cada(self):
+        return self._valor('reid') or 1
+
+    def processar_frame(self, indice: int) -> bool:
+        """O frame `indice` do vídeo passa pelo pipeline (os demais são pulados pelo stride)."""
+        return indice % self.stride == 0
+
+    def rodar_reid(self, indice: int) -> bool:
+        """O frame `indice` (já processado) recalcula o ReID dos tracks."""
+        return (indice // self.stride) % self.reid_cada == 0
+
+    # ─── Medição ──────────────────────────────────────────────────
+    @contextmanager
+    def medir(self, etapa: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._tempos[etapa] = self._tempos.get(etapa, 0.0) + time.perf_counter() - t0
+
+    def frame(self, n: int = 1) -> None:
+        """n frames do vídeo consumidos (processados ou pulados); avalia ao fim de cada janela."""
+        self._frames += n
+        self.frames_total += n
+        decorrido = time.perf_counter() - self._inicio
+        if decorrido >= self.janela and self._frames:
+            self._avaliar(self._frames / decorrido, decorrido)
+            self._frames = 0
+            self._tempos = {}
+            self._inicio = time.perf_counter()
+
+    # ─── Decisão ──────────────────────────────────────────────────
+    def _avaliar(self, taxa: float, decorrido: float) -> None:
+        self.ultima_taxa = taxa
+        if taxa < TOLERANCIA * self.alvo:
+            self._calmas = 0
+            self._piorar(taxa, decorrido)
+        elif taxa >= FOLGA * self.alvo:
+            self._calmas += 1
+            if self._calmas >= self._calmas_necessarias:
+                self._calmas = 0
+                self._melhorar(taxa)
+        else:
+            self._calmas = 0
+
+    def _pode_piorar(self, ajuste) -> bool:
+        return ajuste in self._niveis and self._indice[ajuste] < len(self._niveis[ajuste]) - 1
+
+    def _piorar(self, taxa: float, decorrido: float) -> None:
+        etapa, tempo = max(self._tempos.items(), key=lambda kv: kv[1], default=('resto', 0.0))
+        parcela = tempo / decorrido
+        # Etapa medida pequena: o custo está no resto (decode, rastreio, anotação) → stride
+        ajuste = {'detector': 'imgsz', 'reid': 'reid'}.get(etapa) if parcela >= PARCELA_MIN else None
+        if not self._pode_piorar(ajuste):
+            ajuste = 'stride'
+        if not self._pode_piorar(ajuste):
+            return
+        if ajuste == self._ultima_melhora:
+            # A última melhora não coube no orçamento: espera mais antes da próxima
+            self._calmas_necessarias = min(CALMAS_MAX, self._calmas_necessarias * 2)
+            self._ultima_melhora = None
+        parcela = f"{etapa} {parcela:.0%} do tempo"
+        self._mudar(ajuste, +1, taxa, f"{taxa:.1f} fps < alvo {self.alvo:.1f}; {parcela}")
+        self._pilha.append(ajuste)
+
+    def _melhorar(self, taxa: float) -> None:
+        if self._pilha:
+            ajuste = self._pilha.pop()
+        else:
+            # Nada a desfazer: melhora rumo ao máximo (stride primeiro — é o que mais perde informação)
+            ajuste = next((a for a in ('stride', 'imgsz', 'reid')
+                           if a in self._niveis and self._indice[a] > 0), None)
+            if ajuste is None:
+                return
+        self._mudar(ajuste, -1, taxa, f"{taxa:.1f} fps ≥ {FOLGA:.2f}× alvo {self.alvo:.1f}")
+        self._ultima_melhora = ajuste
+
+    def _mudar(self, ajuste, passo, taxa, motivo) -> None:
+        de = self._valor(ajuste)
+        self._indice[ajuste] += passo
+        para = self._valor(ajuste)
+        self.ajustes.append({
+            'frame': self.frames_total, 'ajuste': ajuste, 'de': de, 'para': para,
+            'taxa': round(taxa, 2), 'alvo': round(self.alvo, 2), 'motivo': motivo,
+        })
+        prefixo = f"[{self.nome}] " if self.nome else ""
+        print(f"⚙️  {prefixo}Qualidade (frame {self.frames_total}): {ajuste} {de} → {para} ({motivo})",
+              flush=True)
+
+    def resumo(self) -> str:
+        atuais = ", ".join(f"{a}={self._valor(a)}" for a in ('imgsz', 'stride', 'reid') if a in self._niveis)
+        taxa = f"{self.ultima_taxa:.1f}" if self.ultima_taxa is not None else "-"
+        return (f"alvo {self.alvo:.1f} fps, última taxa {taxa} fps, "
+                f"{len(self.ajustes)} ajuste(s), final: {atuais}")
+
+
+def imgsz_controlavel(model, imgsz: int = IMGSZ_NIVEIS[0]):
+    """imgsz inicial do ajuste, ou None se o backend tem entrada fixa (IR OpenVINO/ONNX estáticos)."""
+    return imgsz if getattr(model, 'backend', 'pytorch') == 'pytorch' else None
@@ -0,0 +1,141 @@
+"""
+Detecção em tiles de alta resolução na faixa do fundo do campo.
+
+Na filmagem grande-angular os jogadores do lado oposto têm poucas dezenas de
+pixels e somem quando o frame inteiro é reduzido para o imgsz 640 do YOLO.
+Subir o imgsz para 1080 (docs/MELHORIAS.md) custa ~3x em todo frame. Aqui o
+frame inteiro continua em 640 e só a faixa do fundo (um intervalo de alturas
+configurável, em fração do frame) é recortada em tiles na resolução nativa,
+com sobreposição. Os tiles de todos os frames do lote vão numa única chamada
+ao YOLO, as caixas voltam para coordenadas do frame e são unidas às do frame
+inteiro com NMS por classe.
+
+Caixas que encostam numa borda interna do tile (jogador cortado) são
+descartadas: o tile vizinho (sobreposição) ou a passada do frame inteiro
+cobrem essa pessoa.
+
+    --fundo 0,0.45          → faixa do topo até 45% da altura, tiles de 640 px
+    --fundo 0.1,0.5 --fundo-tile 512
+"""
+
+import math
+
+import numpy as np
+import supervision as sv
+
+TAMANHO_TILE_PADRAO  = 640
+SOBREPOSICAO_PADRAO  = 0.2     # fração do tile compartilhada com o vizinho
+IOU_NMS_PADRAO       = 0.5
+MARGEM_BORDA         = 2       # px: caixa a menos disso de uma borda interna = cortada
+
+
+def _posicoes(inicio: int, fim: int, tamanho: int, passo: int) -> list:
+    """Inícios dos tiles em [inicio, fim), o último alinhado ao fim."""
+    if fim - inicio <= tamanho:
+        return [inicio]
+    n = math.ceil((fim - inicio - tamanho) / passo) + 1
+    return sorted({min(inicio + i * passo, fim - tamanho) for i in range(n)})
+
+
+class FaixaFundo:
+    """Faixa horizontal do frame (y_inicio..y_fim, frações da altura) detectada em tiles."""
+
+    def __init__(self, y_inicio: float = 0.0, y_fim: float = 0.4,
+                 tamanho: int = TAMANHO_TILE_PADRAO, sobreposicao: float = SOBREPOSICAO_PADRAO,
+                 iou_nms: float = IOU_NMS_PADRAO):
+        if not 0.0 <= y_inicio < y_fim <= 1.0:
+            raise ValueError(f"Faixa inválida: {y_inicio}..{y_fim} (use frações 0-1, início < fim)")
+        self.y_inicio     = y_inicio
+        self.y_fim        = y_fim
+        self.tamanho      = tamanho
+        self.sobreposicao = sobreposicao
+        self.iou_nms      = iou_nms
+        self._cache       = {}          # (shape, limite) → tiles
+        self.n_tiles      = 0           # tiles enviados ao YOLO (estatística)
+
+    def tiles(self, shape, limite=None) -> list:
+        """
+        Retângulos (x1, y1, x2, y2) dos tiles para um frame desse tamanho.
+        limite: retângulo do ROI — a faixa é recortada a ele.
+        """
+        chave = (shape[:2], limite)
+        if chave not in self._cache:
+            h, w = shape[:2]
+            lx1, ly1, lx2, ly2 = limite or (0, 0, w, h)
+            y1 = max(ly1, int(self.y_inicio * h))
+            y2 = min(ly2, int(round(self.y_fim * h)))
+            passo = max(1, int(self.tamanho * (1 - self.sobreposicao)))
+            tiles = []
+            if y2 > y1 and lx2 > lx1:
+                for ty in _posicoes(y1, y2, self.tamanho, passo):
+                    for tx in _posicoes(lx1, lx2, self.tamanho, passo):
+                        tiles.append((tx, ty, min(tx + self.tamanho, lx2), min(ty + self.tamanho, y2)))
+            self._cache[chave] = tiles
+        return self._cache[chave]
+
+    def _sem_cortadas(self, det: sv.Detections, tile, shape) -> sv.Detections:
+        """Remove caixas encostadas numa borda do tile que não seja borda do frame."""
+        if len(det) == 0:
+            return det
+        h, w = shape[:2]
+        x1, y1, x2, y2 = tile
+        b = det.xyxy
+        m = MARGEM_BORDA
+        cortada = np.zeros(len(det), dtype=bool)
+        if x1 > 0:
+            cortada |= b[:, 0] <= x1 + m
+        if y1 > 0:
+            cortada |= b[:, 1] <= y1 + m
+        if x2 < w:
+            cortada |= b[:, 2] >= x2 - m
+        if y2 < h:
+            cortada |= b[:, 3] >= y2 - m
+        return det[~cortada]
+
+    def completar(self, model, frames, deteccoes, classes, limites=None) -> list:
+        """
+        Une às detecções do frame inteiro (já em coordenadas do frame) as dos
+        tiles da faixa. Uma chamada ao YOLO para os tiles de todos os frames.
+        limites: retângulo do ROI de cada frame (ou None).
+        """
+        limites = limites if limites is not None else [None] * len(frames)
+        entradas, origem = [], []
+        for i, (frame, limite) in enumerate(zip(frames, limites)):
+            for tile in self.tiles(frame.shape, limite):
+                x1, y1, x2, y2 = tile
+                entradas.append(frame[y1:y2, x1:x2])
+                origem.append((i, tile))
+        if not entradas:
+            return deteccoes
+
+        self.n_tiles += len(entradas)
+        results = model.predict(entradas, classes=list(classes), verbose=False)
+        extras = [[] for _ in frames]
+        for r, (i, tile) in zip(results, origem):
+            det = sv.Detections.from_ultralytics(r)
+            if len(det) == 0:
+                continue
+            det.xyxy = det.xyxy + np.array([tile[0], tile[1], tile[0], tile[1]], dtype=det.xyxy.dtype)
+            det = self._sem_cortadas(det, tile, frames[i].shape)
+            if len(det):
+                extras[i].append(det)
+
+        unidas = []
+        for det, mais in zip(deteccoes, extras):
+            if not mais:
+                unidas.append(det)
+                continue
+            todas = sv.Detections.merge([det] + mais)
+            unidas.append(todas.with_nms(threshold=self.iou_nms))
+        return unidas
+
+
+def carregar_faixa(texto: str, tamanho: int = TAMANHO_TILE_PADRAO):
+    """'0,0.45' → FaixaFundo(0.0, 0.45); None/'' → None (modo desligado)."""
+    if not texto:
+        return None
+    try:
+        y_inicio, y_fim = (float(v) for v in texto.split(','))
+    except ValueError:
+        raise ValueError(f"--fundo espera 'início,fim' em frações da altura (ex: 0,0.45), recebeu {texto!r}")
+    return FaixaFundo(y_inicio, y_fim, tamanho=tamanho)
@@ -0,0 +1,302 @@
+"""
+Backends do detector YOLO (pessoas/bola).
+
+  - 'pytorch'        → yolo11n.pt no PyTorch CPU (padrão, comportamento antigo)
+  - 'openvino'       → IR FP32 (yolo11n_openvino_model/, já vem no repositório)
+  - 'openvino-fp16'  → IR com pesos FP16 (yolo11n_fp16_openvino_model/)
+  - 'openvino-int8'  → IR quantizado INT8 via NNCF (yolo11n_int8_openvino_model/)
+  - 'onnx'           → yolo11n.onnx no onnxruntime
+  - 'auto'           → o mais rápido medido neste host (detector_benchmark.json)
+
+Os exports são feitos uma vez (export do Ultralytics) e ficam em disco ao lado
+do .pt; o modelo carregado fica em cache no processo, então o Flask e os
+scripts não recompilam o IR a cada chamada.
+
+Escolha do backend: argumento → variável DETECTOR_BACKEND → 'pytorch'.
+
+Benchmark (mede todos os backends disponíveis e grava o resultado deste host):
+    python scripts/detector_backend.py --benchmark --video jogo.mp4 --frames 200
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+
+BACKENDS        = ('pytorch', 'openvino', 'openvino-fp16', 'openvino-int8', 'onnx')
+BACKEND_PADRAO  = 'pytorch'
+OPCOES_BACKEND  = BACKENDS + ('auto',)     # valores aceitos em --detector
+MODELO_PADRAO   = 'yolo11n.pt'
+RAIZ            = Path(__file__).resolve().parent.parent
+BENCHMARK_FILE  = RAIZ / 'detector_benchmark.json'
+DADOS_INT8      = 'coco8.yaml'     # dataset de calibração do NNCF (export int8)
+
+_cache      = {}
+_cache_lock = threading.Lock()
+
+
+def caminho_exportado(modelo: str, backend: str) -> Path:
+    """Onde fica o artefato do backend (mesmos nomes que o export do Ultralytics usa)."""
+    pt = Path(modelo)
+    if backend == 'pytorch':
+        return pt
+    if backend == 'openvino':
+        return pt.with_name(f"{pt.stem}_openvino_model")
+    if backend == 'openvino-fp16':
+        return pt.with_name(f"{pt.stem}_fp16_openvino_model")
+    if backend == 'openvino-int8':
+        return pt.with_name(f"{pt.stem}_int8_openvino_model")
+    if backend == 'onnx':
+        return pt.with_suffix('.onnx')
+    raise ValueError(f"Backend desconhecido: {backend} (use {', '.join(BACKENDS)})")
+
+
+def exportar(modelo: str, backend: str, imgsz: int = 640, dados_int8: str = DADOS_INT8) -> Path:
+    """Exporta o .pt para o backend, se o artefato ainda não existir em disco."""
+    destino = caminho_exportado(modelo, backend)
+    if backend == 'pytorch' or destino.exists():
+        return destino
+
+    from ultralytics import YOLO
+    print(f"[DETECTOR] Exportando {modelo} → {backend} ...", flush=True)
+    t0 = time.perf_counter()
+    pt = Path(modelo)
+    # O Ultralytics grava ao lado do .pt e o FP16 sai com o mesmo nome do FP32
+    # (o IR do repositório): exporta de uma cópia do .pt numa pasta temporária,
+    # com o nome do destino, e só então move o resultado.
+    sufixo = '_fp16' if backend == 'openvino-fp16' else ''
+    if not pt.exists():
+        YOLO(modelo)            # baixa o .pt oficial (yolo11n.pt) para poder copiá-lo
+    with tempfile.TemporaryDirectory(dir=destino.parent, prefix='.export_') as tmp:
+        copia = Path(tmp) / f"{pt.stem}{sufixo}.pt"
+        shutil.copy2(pt, copia)
+        yolo = YOLO(str(copia))
+        if backend == 'onnx':
+            gerado = yolo.export(format='onnx', imgsz=imgsz)
+        elif backend == 'openvino':
+            gerado = yolo.export(format='openvino', imgsz=imgsz)
+        elif backend == 'openvino-fp16':
+            gerado = yolo.export(format='openvino', imgsz=imgsz, half=True)
+        else:
+            gerado = yolo.export(format='openvino', imgsz=imgsz, int8=True, data=dados_int8)
+
+        gerado = Path(gerado)
+        if Path(tmp).resolve() not in gerado.resolve().parents:
+            raise RuntimeError(f"Export gravou fora da pasta temporária: {gerado}")
+        if destino.exists():
+            raise FileExistsError(f"{destino} já existe")
+        shutil.move(str(gerado), str(destino))
+    print(f"[DETECTOR] {destino} pronto ({time.perf_counter() - t0:.0f}s)", flush=True)
+    return destino
+
+
+def _lote_maximo(caminho: Path):
+    """Lote fixo do modelo exportado (None = PyTorch/dinâmico, aceita qualquer lote)."""
+    meta = caminho / 'metadata.yaml' if caminho.is_dir() else None
+    if meta is None or not meta.exists():
+        return None if caminho.suffix == '.pt' else 1
+    from ultralytics.utils import YAML
+    dados = YAML.load(meta)
+    if dados.get('args', {}).get('dynamic'):
+        return None
+    return int(dados.get('batch', 1))
+
+
+class DetectorYOLO:
+    """
+    YOLO do Ultralytics com o mesmo predict()/__call__, mais:
+      - listas maiores que o lote fixo do export viram várias chamadas
+        (o IR do repositório é batch=1 estático);
+      - um lock por modelo, porque o predictor não é thread-safe e a
+        instância é compartilhada (cache do processo).
+    """
+
+    def __init__(self, modelo: str, backend: str, caminho: Path):
+        from ultralytics import YOLO
+
+        self.backend = backend
+        self.caminho = caminho
+        self.modelo  = modelo
+        self._yolo   = YOLO(str(caminho), task='detect', verbose=False)
+        if backend == 'pytorch':
+            self._yolo.to('cpu')
+        self._lote   = _lote_maximo(caminho)
+        self._lock   = threading.Lock()
+
+    def predict(self, source, **kwargs):
+        with self._lock:
+            if isinstance(source, list) and self._lote and len(source) > self._lote:
+                resultados = []
+                for i in range(0, len(source), self._lote):
+                    resultados.extend(self._yolo.predict(source[i:i + self._lote], **kwargs))
+                return resultados
+            return self._yolo.predict(source, **kwargs)
+
+    __call__ = predict
+
+    def __getattr__(self, nome):
+        # names, track, etc. continuam vindo do YOLO original
+        if nome.startswith('_'):
+            raise AttributeError(nome)
+        return getattr(self._yolo, nome)
+
+    def __repr__(self):
+        return f"DetectorYOLO({self.backend}, {self.caminho})"
+
+
+def melhor_backend_registrado(host: str = None):
+    """Backend mais rápido medido neste host, ou None se nunca houve benchmark."""
+    if not BENCHMARK_FILE.exists():
+        return None
+    try:
+        with open(BENCHMARK_FILE, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return dados.get(host or socket.gethostname(), {}).get('melhor')
+
+
+def resolver_backend(backend: str = None) -> str:
+    backend = backend or os.environ.get('DETECTOR_BACKEND') or BACKEND_PADRAO
+    if backend == 'auto':
+        melhor = melhor_backend_registrado()
+        if melhor is None:
+            print("[DETECTOR] Sem benchmark para este host — usando pytorch "
+                  "(rode scripts/detector_backend.py --benchmark)", flush=True)
+            return BACKEND_PADRAO
+        return melhor
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconhecido: {backend} (use {', '.join(BACKENDS)} ou auto)")
+    return backend
+
+
+def carregar_detector(backend: str = None, modelo: str = MODELO_PADRAO, imgsz: int = 640) -> DetectorYOLO:
+    """Detector pronto para predict, exportando e carregando só na primeira vez."""
+    backend = resolver_backend(backend)
+    chave   = (backend, str(Path(modelo).resolve()), imgsz)
+    with _cache_lock:
+        if chave not in _cache:
+            caminho = exportar(modelo, backend, imgsz)
+            t0 = time.perf_counter()
+            _cache[chave] = DetectorYOLO(modelo, backend, caminho)
+            print(f"[DETECTOR] {backend} carregado de {caminho} "
+                  f"({(time.perf_counter() - t0) * 1000:.0f} ms)", flush=True)
+        return _cache[chave]
+
+
+# ─── Benchmark ────────────────────────────────────────────────────
+def _frames_benchmark(video: str, n: int) -> list:
+    if video:
+        cap = cv2.VideoCapture(video)
+        frames = []
+        while len(frames) < n:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+        if not frames:
+            raise ValueError(f"Não foi possível ler {video}")
+        return frames
+    from ultralytics.utils import ASSETS
+    return [cv2.imread(str(ASSETS / 'bus.jpg'))] * n
+
+
+def medir_backend(backend: str, frames: list, modelo: str = MODELO_PADRAO) -> dict:
+    detector = carregar_detector(backend, modelo)
+    detector.predict(frames[0], classes=[0], verbose=False)    # aquecimento/compilação
+    deteccoes = 0
+    t0 = time.perf_counter()
+    for frame in frames:
+        deteccoes += len(detector.predict(frame, classes=[0], verbose=False)[0].boxes)
+    tempo = time.perf_counter() - t0
+    return {
+        'backend':       backend,
+        'ms_por_frame':  round(tempo / len(frames) * 1000, 2),
+        'fps':           round(len(frames) / tempo, 2),
+        'pessoas_media': round(deteccoes / len(frames), 2),
+    }
+
+
+def benchmark(backends=BACKENDS, video: str = None, n_frames: int = 100,
+              modelo: str = MODELO_PADRAO, salvar: bool = True) -> dict:
+    """Mede cada backend disponível e registra o mais rápido para este host."""
+    frames = _frames_benchmark(video, n_frames)
+    resultados, falhas = [], {}
+    for backend in backends:
+        print(f"▶ {backend}...", flush=True)
+        try:
+            resultados.append(medir_backend(backend, frames, modelo))
+        except Exception as e:       # dependência ausente, export falhou, etc.
+            falhas[backend] = str(e)[:200]
+            print(f"  ⚠️  {backend} indisponível: {e}", flush=True)
+
+    if not resultados:
+        raise RuntimeError("Nenhum backend pôde ser medido")
+    melhor = min(resultados, key=lambda r: r['ms_por_frame'])['backend']
+    registro = {
+        'data':       datetime.now().isoformat(timespec='seconds'),
+        'processador': platform.processor() or platform.machine(),
+        'modelo':     modelo,
+        'frames':     len(frames),
+        'video':      video,
+        'resultados': resultados,
+        'falhas':     falhas,
+        'melhor':     melhor,
+    }
+    if salvar:
+        dados = {}
+        if BENCHMARK_FILE.exists():
+            try:
+                with open(BENCHMARK_FILE, 'r', encoding='utf-8') as f:
+                    dados = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                dados = {}
+        dados[socket.gethostname()] = registro
+        with open(BENCHMARK_FILE, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False, indent=2)
+    return registro
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backends do detector YOLO')
+    parser.add_argument('--benchmark', action='store_true', help='Mede os backends neste host')
+    parser.add_argument('--exportar', choices=BACKENDS, help='Só exporta o artefato do backend')
+    parser.add_argument('--video', default=None, help='Vídeo para o benchmark (padrão: imagem de exemplo)')
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--model', default=MODELO_PADRAO)
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    args = parser.parse_args()
+
+    if args.exportar:
+        print(exportar(args.model, args.exportar))
+        return
+    if not args.benchmark:
+        parser.print_help()
+        return
+
+    print("\n" + "="*70)
+    print(f"⏱️  BENCHMARK DO DETECTOR — {socket.gethostname()}")
+    print("="*70)
+    registro = benchmark(args.backends, args.video, args.frames, args.model)
+
+    print(f"\n{'Backend':<15} {'ms/frame':>9} {'FPS':>8} {'Pessoas/frame':>14}")
+    print("-" * 50)
+    for r in registro['resultados']:
+        marca = '  ← mais rápido' if r['backend'] == registro['melhor'] else ''
+        print(f"{r['backend']:<15} {r['ms_por_frame']:>9.1f} {r['fps']:>8.2f} {r['pessoas_media']:>14.2f}{marca}")
+    print("="*70)
+    print(f"✓ Resultado salvo em {BENCHMARK_FILE} (use --detector auto ou DETECTOR_BACKEND=auto)\n")
+
+
+if __name__ == '__main__':
+    main()
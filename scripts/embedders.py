@@ -0,0 +1,408 @@
+"""
+Registro dos extratores de embedding do ReID (um embedding, vários runtimes).
+
+O mesmo embedding existia em várias formas soltas (PyTorch em
+analisar_atleta._build_model, OpenVINO em acelerador.ReIDAccelerado) e os
+handlers do Flask fixavam "CPU PyTorch". Aqui:
+
+    embedder = get_embedder()                  # nome e backend padrão
+    embs = embedder.embeddings(crops)          # (N, D) L2-normalizado
+    emb  = embedder.embedding(crop)            # (D,)
+
+Nome (argumento → variável REID_EMBEDDER → 'resnet50') = espaço do embedding.
+Referências (embedding.json) só são comparáveis com o mesmo nome:
+  - 'resnet50'    → backbone ResNet50 ImageNet, 2048-d (o das referências atuais)
+
+Backend (argumento → variável REID_BACKEND → 'auto') = runtime:
+  - 'torch'        → PyTorch eager CPU
+  - 'torchscript'  → módulo traçado e congelado (scripts/<arquivo>.torchscript.pt)
+  - 'onnxruntime'  → ONNX com batch dinâmico no onnxruntime
+  - 'openvino'     → acelerador.ReIDAccelerado (lotes 8/16/32, fila assíncrona,
+                     INT8 com REID_PRECISAO=int8)
+  - 'auto'         → o mais rápido medido neste host (embedder_benchmark.json);
+                     sem medição, o micro-benchmark roda uma vez e fica gravado
+
+Todos os backends recebem o mesmo tensor (preprocessamento_reid) e o
+benchmark descarta os que divergem do PyTorch (cosseno < COSSENO_MIN). Só o
+vencedor fica carregado no processo — os demais candidatos são liberados.
+
+Benchmark manual:
+    python -m scripts.embedders --benchmark
+    python -m scripts.embedders --benchmark --backends torch onnxruntime
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from scripts.preprocessamento_reid import IMG_SIZE, preprocessar
+
+NOMES           = ('resnet50',)
+NOME_PADRAO     = 'resnet50'
+BACKENDS        = ('torch', 'torchscript', 'onnxruntime', 'openvino')
+OPCOES_BACKEND  = BACKENDS + ('auto',)
+SCRIPTS_DIR     = Path(__file__).resolve().parent
+RAIZ            = SCRIPTS_DIR.parent
+BENCHMARK_FILE  = RAIZ / 'embedder_benchmark.json'
+ARQUIVOS        = {'resnet50': 'reid_backbone'}
+
+LOTE_BENCHMARK  = 16      # crops por chamada (um frame com jogadores)
+CROPS_BENCHMARK = 32
+REPETICOES      = 3
+COSSENO_MIN     = 0.98    # concordância mínima com o PyTorch eager
+
+_cache      = {}
+_cache_lock = threading.Lock()
+
+
+# ─── Módulos PyTorch ──────────────────────────────────────────────
+def modulo_torch(nome: str = NOME_PADRAO):
+    """nn.Module (N, 3, H, W) → (N, D) em modo eval, na CPU."""
+    import torch.nn as nn
+
+    if nome == 'resnet50':
+        from torchvision import models
+        resnet = models.resnet50(weights=models.ResNet50_Weights.IMAGENET1K_V2)
+        modulo = nn.Sequential(*list(resnet.children())[:-1], nn.Flatten(1))
+    else:
+        raise ValueError(f"Embedder desconhecido: {nome} (use {', '.join(NOMES)})")
+    return modulo.eval().cpu()
+
+
+def _entrada_exemplo():
+    import torch
+    return torch.zeros(1, 3, IMG_SIZE[0], IMG_SIZE[1])
+
+
+# ─── Embedders ────────────────────────────────────────────────────
+class Embedder:
+    """Interface comum: embeddings(crops BGR) → matriz (N, D) L2-normalizada."""
+
+    def __init__(self, nome: str, backend: str):
+        self.nome    = nome
+        self.backend = backend
+        self._lock   = threading.Lock()   # instância compartilhada entre threads (pool_modelos)
+
+    def _inferir(self, entrada: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def embeddings(self, crops: list) -> np.ndarray:
+        if not len(crops):
+            return np.zeros((0, 0), dtype=np.float32)
+        entrada = preprocessar(crops)
+        with self._lock:
+            embs = self._inferir(entrada).reshape(len(crops), -1)
+        return embs / (np.linalg.norm(embs, axis=1, keepdims=True) + 1e-8)
+
+    def embedding(self, crop_bgr: np.ndarray) -> np.ndarray:
+        return self.embeddings([crop_bgr])[0]
+
+    def __repr__(self):
+        return f"Embedder({self.nome}, {self.backend})"
+
+
+class EmbedderTorch(Embedder):
+    """PyTorch eager ou TorchScript (os dois são chamados com um tensor)."""
+
+    def __init__(self, nome: str, backend: str, modulo):
+        super().__init__(nome, backend)
+        self._modulo = modulo
+
+    def _inferir(self, entrada):
+        import torch
+        with torch.no_grad():
+            return self._modulo(torch.from_numpy(entrada)).numpy()
+
+
+class EmbedderONNX(Embedder):
+    def __init__(self, nome: str, sessao):
+        super().__init__(nome, 'onnxruntime')
+        self._sessao  = sessao
+        self._entrada = sessao.get_inputs()[0].name
+
+    def _inferir(self, entrada):
+        return self._sessao.run(None, {self._entrada: entrada})[0]
+
+
+class EmbedderOpenVINO(Embedder):
+    """Delega ao ReIDAccelerado (que já pré-processa, agrupa em lotes e normaliza)."""
+
+    def __init__(self, nome: str, reid):
+        super().__init__(nome, 'openvino')
+        self._reid = reid
+
+    def embeddings(self, crops: list) -> np.ndarray:
+        return self._reid.embeddings(crops)
+
+
+# ─── Artefatos e carregamento ─────────────────────────────────────
+def _caminho_onnx(nome: str) -> Path:
+    if nome == 'resnet50':
+        from scripts.acelerador import ONNX_REID
+        return ONNX_REID        # o mesmo ONNX do OpenVINO
+    return SCRIPTS_DIR / f"{ARQUIVOS[nome]}.onnx"
+
+
+def _exportar_onnx(nome: str, destino: Path) -> None:
+    if nome == 'resnet50':
+        from scripts.acelerador import _exportar_reid_onnx
+        _exportar_reid_onnx()
+        return
+    import torch
+    print(f"[EMBEDDER] Exportando {nome} → ONNX ...", flush=True)
+    torch.onnx.export(
+        modulo_torch(nome), _entrada_exemplo(), str(destino),
+        opset_version=11,
+        input_names=['input'], output_names=['output'],
+        dynamic_axes={'input': {0: 'batch'}, 'output': {0: 'batch'}},
+    )
+
+
+def _carregar_onnxruntime(nome: str) -> Embedder:
+    import onnxruntime as ort
+
+    caminho = _caminho_onnx(nome)
+    opcoes = ort.SessionOptions()
+    opcoes.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if caminho.exists():
+        sessao = ort.InferenceSession(str(caminho), opcoes, providers=['CPUExecutionProvider'])
+        if isinstance(sessao.get_inputs()[0].shape[0], int):
+            # Export antigo com batch fixo: refaz com o eixo dinâmico
+            print(f"[EMBEDDER] {caminho.name} com batch fixo — exportando de novo", flush=True)
+            caminho.unlink()
+    if not caminho.exists():
+        _exportar_onnx(nome, caminho)
+    sessao = ort.InferenceSession(str(caminho), opcoes, providers=['CPUExecutionProvider'])
+    return EmbedderONNX(nome, sessao)
+
+
+def _carregar_torchscript(nome: str) -> Embedder:
+    import torch
+
+    caminho = SCRIPTS_DIR / f"{ARQUIVOS[nome]}.torchscript.pt"
+    if not caminho.exists():
+        print(f"[EMBEDDER] Traçando {nome} → TorchScript ...", flush=True)
+        with torch.no_grad():
+            tracado = torch.jit.freeze(torch.jit.trace(modulo_torch(nome), _entrada_exemplo()))
+        tracado.save(str(caminho))
+    return EmbedderTorch(nome, 'torchscript', torch.jit.load(str(caminho)).eval())
+
+
+def _carregar_openvino(nome: str) -> Embedder:
+    if nome != 'resnet50':
+        raise ValueError(f"Backend openvino só existe para resnet50 (pedido: {nome})")
+    # Instância própria (não o singleton get_reid): o cache deste módulo decide o que fica
+    from scripts.acelerador import ReIDAccelerado
+    return EmbedderOpenVINO(nome, ReIDAccelerado())
+
+
+def _carregar(nome: str, backend: str) -> Embedder:
+    """Carga sem cache (benchmark); o uso normal passa por carregar_embedder."""
+    if backend == 'torch':
+        return EmbedderTorch(nome, 'torch', modulo_torch(nome))
+    if backend == 'torchscript':
+        return _carregar_torchscript(nome)
+    if backend == 'onnxruntime':
+        return _carregar_onnxruntime(nome)
+    if backend == 'openvino':
+        return _carregar_openvino(nome)
+    raise ValueError(f"Backend desconhecido: {backend} (use {', '.join(BACKENDS)})")
+
+
+def carregar_embedder(nome: str, backend: str) -> Embedder:
+    """Embedder (nome, backend) exato, carregado só na primeira vez no processo."""
+    chave = (nome, backend)
+    with _cache_lock:
+        if chave not in _cache:
+            t0 = time.perf_counter()
+            _cache[chave] = _carregar(nome, backend)
+            print(f"[EMBEDDER] {nome} via {backend} carregado "
+                  f"({(time.perf_counter() - t0) * 1000:.0f} ms)", flush=True)
+        return _cache[chave]
+
+
+# ─── Benchmark ────────────────────────────────────────────────────
+def _crops_benchmark(n: int = CROPS_BENCHMARK) -> list:
+    """Fotos de atleta_refs/ (se houver), completadas com crops sintéticos de tamanhos variados."""
+    crops = []
+    pasta = RAIZ / 'atleta_refs'
+    if pasta.is_dir():
+        for p in sorted(pasta.rglob('*')):
+            if len(crops) >= n:
+                break
+            if p.suffix.lower() in ('.jpg', '.jpeg', '.png'):
+                img = cv2.imread(str(p))
+                if img is not None:
+                    crops.append(img)
+    rng = np.random.default_rng(0)
+    while len(crops) < n:
+        h = int(rng.integers(60, 300))
+        crops.append(rng.integers(0, 256, (h, max(20, h // 2), 3), dtype=np.uint8))
+    return crops
+
+
+def medir_embedder(embedder: Embedder, crops: list, lote: int = LOTE_BENCHMARK) -> float:
+    """ms por crop em chamadas de `lote` crops (após aquecimento)."""
+    grupos = [crops[i:i + lote] for i in range(0, len(crops), lote)]
+    embedder.embeddings(grupos[0])
+    t0 = time.perf_counter()
+    for _ in range(REPETICOES):
+        for grupo in grupos:
+            embedder.embeddings(grupo)
+    return (time.perf_counter() - t0) / (REPETICOES * len(crops)) * 1000
+
+
+def benchmark(nome: str = NOME_PADRAO, backends=BACKENDS, salvar: bool = True) -> dict:
+    """
+    Mede cada backend disponível para o embedder e registra o mais rápido neste
+    host. Os candidatos são carregados fora do cache; só o vencedor entra nele.
+    Todos são comparados com o PyTorch eager, calculado antes de qualquer
+    backend (esteja 'torch' em `backends` ou não); sem essa referência o
+    benchmark falha em vez de aceitar runtimes não verificados.
+    """
+    crops = _crops_benchmark()
+    resultados, falhas = [], {}
+    candidatos = {}
+
+    print(f"▶ {nome} / torch (referência)...", flush=True)
+    try:
+        torch_ref  = _carregar(nome, 'torch')
+        referencia = torch_ref.embeddings(crops)
+    except Exception as e:
+        raise RuntimeError(f"Sem a referência PyTorch de {nome} não há como verificar "
+                           f"os backends: {e}") from e
+
+    for backend in backends:
+        print(f"▶ {nome} / {backend}...", flush=True)
+        try:
+            embedder = torch_ref if backend == 'torch' else _carregar(nome, backend)
+            ms   = medir_embedder(embedder, crops)
+            embs = embedder.embeddings(crops)
+        except Exception as e:       # dependência ausente, export falhou, etc.
+            falhas[backend] = str(e)[:200]
+            print(f"  ⚠️  {backend} indisponível: {e}", flush=True)
+            continue
+        cosseno = float((embs * referencia).sum(axis=1).min())
+        if cosseno < COSSENO_MIN:
+            falhas[backend] = f"diverge do torch (cosseno mínimo {cosseno:.4f})"
+            print(f"  ⚠️  {backend} descartado: {falhas[backend]}", flush=True)
+            continue
+        resultados.append({
+            'backend':      backend,
+            'ms_por_crop':  round(ms, 3),
+            'cosseno_min':  round(cosseno, 5),
+        })
+        candidatos[backend] = embedder
+    embedder = torch_ref = None
+
+    if not resultados:
+        raise RuntimeError(f"Nenhum backend de {nome} pôde ser medido")
+    registro = {
+        'data':        datetime.now().isoformat(timespec='seconds'),
+        'processador': platform.processor() or platform.machine(),
+        'crops':       len(crops),
+        'lote':        LOTE_BENCHMARK,
+        'resultados':  resultados,
+        'falhas':      falhas,
+        'melhor':      min(resultados, key=lambda r: r['ms_por_crop'])['backend'],
+    }
+    with _cache_lock:
+        _cache.setdefault((nome, registro['melhor']), candidatos[registro['melhor']])
+    candidatos.clear()          # perdedores liberados: um backbone por processo
+
+    if salvar:
+        dados = _ler_benchmark()
+        dados.setdefault(socket.gethostname(), {})[nome] = registro
+        with open(BENCHMARK_FILE, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False, indent=2)
+    return registro
+
+
+def _ler_benchmark() -> dict:
+    if not BENCHMARK_FILE.exists():
+        return {}
+    try:
+        with open(BENCHMARK_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def melhor_backend_registrado(nome: str = NOME_PADRAO, host: str = None):
+    """Backend mais rápido medido neste host para o embedder, ou None."""
+    return _ler_benchmark().get(host or socket.gethostname(), {}).get(nome, {}).get('melhor')
+
+
+_benchmark_lock = threading.Lock()
+
+def resolver(nome: str = None, backend: str = None) -> tuple:
+    """(nome, backend) a usar: argumento → REID_EMBEDDER/REID_BACKEND → padrão; 'auto' mede uma vez."""
+    nome    = nome or os.environ.get('REID_EMBEDDER') or NOME_PADRAO
+    backend = backend or os.environ.get('REID_BACKEND') or 'auto'
+    if nome not in NOMES:
+        raise ValueError(f"Embedder desconhecido: {nome} (use {', '.join(NOMES)})")
+    if backend == 'auto':
+        with _benchmark_lock:
+            melhor = melhor_backend_registrado(nome)
+            if melhor is None:
+                print(f"[EMBEDDER] Sem benchmark de {nome} neste host — medindo os backends (uma vez)",
+                      flush=True)
+                melhor = benchmark(nome)['melhor']
+        return nome, melhor
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconhecido: {backend} (use {', '.join(BACKENDS)} ou auto)")
+    return nome, backend
+
+
+def get_embedder(nome: str = None, backend: str = None) -> Embedder:
+    """
+    Embedder pronto (cache do processo). Com backend 'auto', se o vencedor do
+    benchmark não carregar mais (dependência removida), cai para o PyTorch.
+    """
+    automatico = (backend or os.environ.get('REID_BACKEND') or 'auto') == 'auto'
+    nome, backend = resolver(nome, backend)
+    try:
+        return carregar_embedder(nome, backend)
+    except Exception as e:
+        if not automatico or backend == 'torch':
+            raise
+        print(f"[EMBEDDER] {backend} falhou ({e}), usando torch", flush=True)
+        return carregar_embedder(nome, 'torch')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Registro dos extratores de embedding do ReID')
+    parser.add_argument('--benchmark', action='store_true', help='Mede os backends neste host')
+    parser.add_argument('--nome', default=NOME_PADRAO, choices=NOMES)
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    args = parser.parse_args()
+
+    if not args.benchmark:
+        parser.print_help()
+        return
+
+    print("\n" + "="*70)
+    print(f"⏱️  BENCHMARK DO EMBEDDER {args.nome} — {socket.gethostname()}")
+    print("="*70)
+    registro = benchmark(args.nome, args.backends)
+
+    print(f"\n{'Backend':<15} {'ms/crop':>9} {'Cosseno mín.':>13}")
+    print("-" * 40)
+    for r in registro['resultados']:
+        marca = '  ← mais rápido' if r['backend'] == registro['melhor'] else ''
+        print(f"{r['backend']:<15} {r['ms_por_crop']:>9.2f} {r['cosseno_min']:>13.5f}{marca}")
+    print("="*70)
+    print(f"✓ Resultado salvo em {BENCHMARK_FILE} (REID_BACKEND=auto usa o mais rápido)\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -50,8 +50,8 @@ def exportar_dataset_reid():
             descartados += 1
             continue
         
-        # Buscar imagens desse ID
-        imgs = list(IMGS_DIR.glob(f'*_id_{id_num}.jpg'))
+        # Buscar imagens desse ID (melhor crop + demais do top-K: *_id_12_2.jpg, ...)
+        imgs = list(IMGS_DIR.glob(f'*_id_{id_num}.jpg')) + list(IMGS_DIR.glob(f'*_id_{id_num}_*.jpg'))
         if imgs:
             jogadores_imgs[nome].extend(imgs)
     
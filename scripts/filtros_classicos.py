@@ -62,6 +62,24 @@ def corpo_visivel(img: np.ndarray) -> float:
     return float(np.mean(sat > 30) )   # pixels com S > 30/255
 
 
+def score_composto(b: float, e: float, c: float) -> float:
+    """Score ponderado 0–100 a partir de blur, densidade de bordas e corpo visível."""
+    return (
+        min(b / 300.0, 1.0) * 50 +   # blur (peso 50)
+        min(e / 0.05,  1.0) * 30 +   # bordas (peso 30)
+        min(c / 0.30,  1.0) * 20     # corpo (peso 20)
+    ) * 100 / 100
+
+
+def score_crop(img: np.ndarray, tamanho: tuple = (64, 128)) -> float:
+    """
+    Score composto de um crop em memória, calculado numa versão reduzida
+    (largura × altura) — barato o bastante para rodar a cada frame na captura.
+    """
+    img_s = cv2.resize(img, tamanho, interpolation=cv2.INTER_AREA)
+    return score_composto(blur_score(img_s), edge_density(img_s), corpo_visivel(img_s))
+
+
 def avaliar_qualidade(img_path: Path) -> dict:
     """
     Retorna um dicionário com scores e veredito de qualidade.
@@ -89,11 +107,7 @@ def avaliar_qualidade(img_path: Path) -> dict:
     c  = corpo_visivel(img_s)
 
     # Score composto ponderado (0–100)
-    score = (
-        min(b / 300.0, 1.0) * 50 +   # blur (peso 50)
-        min(e / 0.05,  1.0) * 30 +   # bordas (peso 30)
-        min(c / 0.30,  1.0) * 20     # corpo (peso 20)
-    ) * 100 / 100
+    score = score_composto(b, e, c)
 
     # Veredito
     ok = True
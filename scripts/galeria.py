@@ -0,0 +1,96 @@
+"""
+Galeria de embeddings para o reconhecimento (ReID e histogramas por time).
+
+Antes cada crop era comparado jogador a jogador num loop Python
+(scipy.spatial.distance.cosine ou np.dot por item do dicionário). Aqui a
+galeria é uma única matriz (P, D) float32 já L2-normalizada, com P protótipos
+— um jogador pode ter vários (um por ID classificado, por câmera, por
+temporada). Casar um frame inteiro é um matmul (N, D) @ (D, P), seguido do
+máximo por jogador e de um top-k parcial (argpartition):
+
+    galeria = Galeria.de_dicionario({'Fulano': emb, 'Ciclano': [emb1, emb2]})
+    indices, scores = galeria.top_k(embs_do_frame, k=3)   # (N, 3) cada
+    galeria.jogadores[indices[0, 0]]                       # melhor do 1º crop
+
+Similaridade = cosseno (igual a 1 - scipy cosine nos vetores originais).
+"""
+
+import numpy as np
+
+
+def normalizar(matriz) -> np.ndarray:
+    """Linhas L2-normalizadas em float32 (vetor 1D vira uma linha)."""
+    matriz = np.atleast_2d(np.asarray(matriz, dtype=np.float32))
+    return matriz / (np.linalg.norm(matriz, axis=1, keepdims=True) + 1e-8)
+
+
+class Galeria:
+    """Protótipos (P, D) normalizados, agrupados por jogador."""
+
+    def __init__(self, jogadores, prototipos, dono):
+        """
+        jogadores:  nomes únicos, na ordem dos índices devolvidos
+        prototipos: matriz (P, D)
+        dono:       (P,) índice em `jogadores` de cada protótipo
+        """
+        dono  = np.asarray(dono, dtype=np.int64)
+        ordem = np.argsort(dono, kind='stable')        # protótipos contíguos por jogador
+        self.jogadores  = list(jogadores)
+        self.prototipos = normalizar(prototipos)[ordem] if len(dono) else np.zeros((0, 0), np.float32)
+        self.dono       = dono[ordem]
+        self._inicios   = np.searchsorted(self.dono, np.arange(len(self.jogadores)))
+        if len(self.jogadores) and not np.all(np.bincount(self.dono, minlength=len(self.jogadores))):
+            raise ValueError("Todo jogador da galeria precisa de ao menos um protótipo")
+
+    @classmethod
+    def de_dicionario(cls, embeddings: dict) -> 'Galeria':
+        """nome → vetor (D,) ou protótipos (K, D) / lista de vetores."""
+        jogadores, blocos, dono = [], [], []
+        for nome, embs in embeddings.items():
+            embs = np.atleast_2d(np.asarray(embs, dtype=np.float32))
+            if not len(embs):
+                continue
+            dono.extend([len(jogadores)] * len(embs))
+            jogadores.append(nome)
+            blocos.append(embs)
+        prototipos = np.concatenate(blocos) if blocos else np.zeros((0, 0), np.float32)
+        return cls(jogadores, prototipos, dono)
+
+    @classmethod
+    def de_linhas(cls, nomes, matriz) -> 'Galeria':
+        """Um nome por linha da matriz (formato de banco_embeddings.carregar)."""
+        indice = {}
+        dono = [indice.setdefault(nome, len(indice)) for nome in nomes]
+        return cls(list(indice), matriz, dono)
+
+    def __len__(self) -> int:
+        return len(self.jogadores)
+
+    @property
+    def dimensao(self) -> int:
+        return self.prototipos.shape[1]
+
+    def similaridades(self, embs) -> np.ndarray:
+        """(N, D) → (N, J): cosseno com o protótipo mais próximo de cada jogador."""
+        sims = normalizar(embs) @ self.prototipos.T
+        if len(self.prototipos) == len(self.jogadores):
+            return sims
+        return np.maximum.reduceat(sims, self._inicios, axis=1)
+
+    def top_k(self, embs, k: int = 1):
+        """(N, D) → (indices, scores), ambos (N, k), do mais ao menos similar."""
+        sims = self.similaridades(embs)
+        k = min(k, sims.shape[1])
+        if k < sims.shape[1]:
+            cand = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        else:
+            cand = np.broadcast_to(np.arange(k), (len(sims), k))
+        scores = np.take_along_axis(sims, cand, axis=1)
+        ordem  = np.argsort(-scores, axis=1)
+        return np.take_along_axis(cand, ordem, axis=1), np.take_along_axis(scores, ordem, axis=1)
+
+    def buscar(self, embs, k: int = 1) -> list:
+        """Por crop, lista [(nome, score)] dos k jogadores mais similares."""
+        indices, scores = self.top_k(embs, k)
+        return [[(self.jogadores[i], float(s)) for i, s in zip(linha_i, linha_s)]
+                for linha_i, linha_s in zip(indices, scores)]
@@ -0,0 +1,85 @@
+"""
+Gate de movimento: decide, frame a frame, se vale rodar o YOLO.
+
+Com a câmera parada e jogadores andando devagar, frames consecutivos são
+quase iguais. O gate compara uma versão reduzida em cinza do frame atual com
+a do último frame que passou pelo detector:
+
+  - diferença média ≥ limiar       → roda o detector
+  - `stride` frames sem detector   → roda o detector (limita a deriva do Kalman)
+  - caso contrário                 → usa rastreador.prever()
+
+O stride se adapta à atividade da cena: cresce (até stride_max) enquanto as
+detecções encontram a cena calma e volta a 1 quando há movimento.
+
+Uso:
+    gate = GateMovimento(stride_max=4, limiar=6.0)
+    if gate.avaliar(frame):
+        detections = rastreador.atualizar(detectar(model, frame), frame)
+    else:
+        detections = rastreador.prever()
+"""
+
+import cv2
+import numpy as np
+
+LARGURA_GATE   = 96      # largura da imagem reduzida usada na comparação
+LIMIAR_PADRAO  = 6.0     # diferença média de intensidade (0-255)
+STRIDE_PADRAO  = 4
+
+
+class GateMovimento:
+    """Gate por câmera: uma instância para cada fonte de vídeo."""
+
+    def __init__(self, stride_max: int = STRIDE_PADRAO, limiar: float = LIMIAR_PADRAO,
+                 largura: int = LARGURA_GATE):
+        self.stride_max = max(1, stride_max)
+        self.limiar     = limiar
+        self.largura    = largura
+        self.stride     = 1
+        self._referencia = None     # miniatura do último frame detectado
+        self._desde      = 0        # frames desde a última detecção
+        self.frames      = 0
+        self.deteccoes   = 0
+        self.ultimo_score = 0.0
+
+    def _miniatura(self, frame) -> np.ndarray:
+        h, w = frame.shape[:2]
+        altura = max(1, int(h * self.largura / w))
+        pequeno = cv2.resize(frame, (self.largura, altura), interpolation=cv2.INTER_AREA)
+        cinza = cv2.cvtColor(pequeno, cv2.COLOR_BGR2GRAY) if pequeno.ndim == 3 else pequeno
+        return cv2.GaussianBlur(cinza, (3, 3), 0)
+
+    def avaliar(self, frame) -> bool:
+        """True se o frame deve passar pelo detector."""
+        self.frames += 1
+        mini = self._miniatura(frame)
+
+        if self._referencia is None or self._referencia.shape != mini.shape:
+            score = float('inf')
+        else:
+            score = float(cv2.absdiff(mini, self._referencia).mean())
+        self.ultimo_score = score
+
+        self._desde += 1
+        if score < self.limiar and self._desde < self.stride:
+            return False
+
+        # Detecção: ajusta o stride pela atividade vista desde a última
+        if score < self.limiar / 2:
+            self.stride = min(self.stride + 1, self.stride_max)
+        elif score >= self.limiar:
+            self.stride = 1
+        self._referencia = mini
+        self._desde      = 0
+        self.deteccoes  += 1
+        return True
+
+    @property
+    def reducao(self) -> float:
+        """Frames por chamada do detector (1.0 = sem economia)."""
+        return self.frames / self.deteccoes if self.deteccoes else 0.0
+
+    def resumo(self) -> str:
+        return (f"{self.deteccoes}/{self.frames} frames detectados "
+                f"({self.reducao:.1f}x menos chamadas ao YOLO)")
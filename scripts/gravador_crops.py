@@ -0,0 +1,114 @@
+"""
+Gravação assíncrona dos cards (crops) dos jogadores.
+
+  - Índice em memória dos arquivos já salvos, semeado por um único scan
+    da pasta de saída (sem os.path.exists por detecção por frame).
+  - Encode JPEG + escrita num pool de threads com fila limitada
+    (cv2.imwrite libera o GIL). Fila cheia → o crop é descartado, a não
+    ser com esperar=True (usado pelo SelecionadorCrops, cujo top-K de um
+    track encerrado não tem segunda chance).
+"""
+
+import os
+import queue
+import threading
+from pathlib import Path
+
+import cv2
+
+
+class GravadorCrops:
+    """Pool de gravação de crops com índice de arquivos já salvos."""
+
+    def __init__(self, pasta, n_workers: int = 2, tamanho_fila: int = 64):
+        self.pasta = Path(pasta)
+        self.pasta.mkdir(parents=True, exist_ok=True)
+        # Um único scan no início — daqui em diante o índice vive em memória
+        with os.scandir(self.pasta) as it:
+            self._salvos = {e.name for e in it if e.is_file()}
+
+        self._pendentes = set()     # enfileirados e ainda não gravados
+        self._fila  = queue.Queue(maxsize=max(1, tamanho_fila))
+        self._lock  = threading.Lock()
+        self.gravados    = 0
+        self.descartados = 0
+        self.erros       = 0
+        self._threads = [
+            threading.Thread(target=self._trabalhar, daemon=True)
+            for _ in range(max(1, n_workers))
+        ]
+        for t in self._threads:
+            t.start()
+
+    @property
+    def n_existentes(self) -> int:
+        return len(self._salvos)
+
+    def ja_salvo(self, nome: str) -> bool:
+        return nome in self._salvos
+
+    def nomes_gravados(self) -> set:
+        """Cards já no disco (sem os que ainda estão na fila) — usado no checkpoint."""
+        with self._lock:
+            return self._salvos - self._pendentes
+
+    def incluir_salvos(self, nomes) -> None:
+        """Marca como já salvos (ex.: cards registrados num checkpoint)."""
+        self._salvos.update(nomes)
+
+    def salvar(self, nome: str, crop, esperar: bool = False, copiar: bool = True) -> bool:
+        """
+        Enfileira o crop para gravação em background.
+        Retorna False se já existe ou se a fila estava cheia (descartado).
+        esperar=True: bloqueia até haver vaga (crops que não terão outra chance).
+        copiar=False: o chamador entrega um array próprio, que o gravador pode guardar.
+        """
+        # Registra antes de enfileirar: um worker pode gravar (ou falhar) e
+        # remover o nome dos conjuntos antes de put() retornar
+        with self._lock:
+            if nome in self._salvos:
+                return False
+            self._salvos.add(nome)
+            self._pendentes.add(nome)
+        try:
+            # Cópia: o crop é uma view do frame, que pode ser reutilizado pelo leitor
+            self._fila.put((nome, crop.copy() if copiar else crop), block=esperar)
+        except queue.Full:
+            with self._lock:
+                self._salvos.discard(nome)
+                self._pendentes.discard(nome)
+                self.descartados += 1
+            return False
+        return True
+
+    def _trabalhar(self):
+        while True:
+            item = self._fila.get()
+            if item is None:
+                break
+            nome, crop = item
+            try:
+                ok = cv2.imwrite(str(self.pasta / nome), crop)
+            except Exception:
+                ok = False
+            with self._lock:
+                self._pendentes.discard(nome)
+                if ok:
+                    self.gravados += 1
+                else:
+                    self.erros += 1
+                    self._salvos.discard(nome)   # permite nova tentativa
+
+    def encerrar(self) -> dict:
+        """Grava o que ainda está na fila, encerra as threads e devolve as estatísticas."""
+        pendentes = self._fila.qsize()
+        for _ in self._threads:
+            self._fila.put(None)
+        for t in self._threads:
+            t.join()
+        return {
+            'gravados':    self.gravados,
+            'descartados': self.descartados,
+            'erros':       self.erros,
+            'pendentes_no_encerramento': pendentes,
+        }
@@ -0,0 +1,107 @@
+"""
+Melhores K crops por track para os cards da captura.
+
+Antes o card de um track era o primeiro crop acima da confiança mínima — se
+esse frame estivesse borrado ou ocluído, era a única imagem do jogador para
+o treino. Agora cada track mantém um top-K (heap) dos crops com maior score
+de qualidade (filtros_classicos.score_crop: Laplacian, Canny e saturação numa
+versão reduzida do crop). Os K melhores vão para o disco quando o track some
+por `expira` frames ou quando a captura termina/para:
+
+    ESQ_id_12.jpg     ← melhor crop (mesmo nome de sempre)
+    ESQ_id_12_2.jpg   ← 2º melhor
+    ESQ_id_12_3.jpg   ← 3º melhor
+
+Só o crop que entra no top-K é copiado; os demais são descartados logo após o
+score. O filtro de rosto (se ativo) também só roda nesses candidatos.
+"""
+
+import heapq
+import itertools
+import re
+
+from filtros_classicos import score_crop
+
+K_PADRAO      = 3
+EXPIRA_FRAMES = 30    # frames sem ver o track até gravar (lost_track_buffer padrão do ByteTrack)
+
+PADRAO_CARD = re.compile(r"^(?P<camera>.+?)_id_(?P<id>\d+)(?:_(?P<rank>\d+))?\.jpg$")
+
+
+def nome_card(camera, track_id, rank: int = 1) -> str:
+    """Nome do arquivo do card: rank 1 sem sufixo, os demais com _<rank>."""
+    if rank == 1:
+        return f"{camera}_id_{track_id}.jpg"
+    return f"{camera}_id_{track_id}_{rank}.jpg"
+
+
+def ler_nome_card(nome: str):
+    """'ESQ_id_12_2.jpg' → ('ESQ', 12, 2); None se não for um card."""
+    m = PADRAO_CARD.match(nome)
+    if not m:
+        return None
+    return m.group('camera'), int(m.group('id')), int(m.group('rank') or 1)
+
+
+class SelecionadorCrops:
+    """Top-K de crops por track de uma câmera, gravados pelo GravadorCrops quando o track termina."""
+
+    def __init__(self, camera, gravador, k: int = K_PADRAO,
+                 expira: int = EXPIRA_FRAMES, aceitar=None):
+        self.camera   = camera
+        self.gravador = gravador
+        self.k        = max(1, k)
+        self.expira   = expira
+        self.aceitar  = aceitar or (lambda crop: True)
+        self._tracks  = {}                  # track_id → {'heap': [(score, n, crop)], 'visto': frame}
+        self._desempate = itertools.count()
+        self._frame   = 0
+        self.scores   = {}                  # card enfileirado → score (junção das fatias)
+        self.tracks_gravados = 0
+
+    def observar(self, track_id, crop) -> None:
+        """Candidato do track no frame atual (crop é uma view — só é copiado se entrar no top-K)."""
+        track_id = int(track_id)
+        # Card de uma execução anterior (ou do checkpoint): o track não é mais coletado
+        if self.gravador.ja_salvo(nome_card(self.camera, track_id)):
+            return
+        track = self._tracks.setdefault(track_id, {'heap': [], 'visto': self._frame})
+        track['visto'] = self._frame
+
+        heap = track['heap']
+        score = score_crop(crop)
+        if len(heap) >= self.k and score <= heap[0][0]:
+            return
+        if not self.aceitar(crop):
+            return
+        item = (score, next(self._desempate), crop.copy())
+        if len(heap) < self.k:
+            heapq.heappush(heap, item)
+        else:
+            heapq.heapreplace(heap, item)
+
+    def avancar(self) -> None:
+        """Fim de um frame: grava os tracks que não aparecem há mais de `expira` frames."""
+        self._frame += 1
+        expirados = [t for t, d in self._tracks.items() if self._frame - d['visto'] > self.expira]
+        for track_id in expirados:
+            self._gravar(track_id)
+
+    def finalizar(self) -> None:
+        """Fim da captura (ou parada): grava o top-K de todos os tracks ainda abertos."""
+        for track_id in list(self._tracks):
+            self._gravar(track_id)
+
+    def _gravar(self, track_id) -> None:
+        melhores = sorted(self._tracks.pop(track_id)['heap'], reverse=True)
+        if not melhores:
+            return
+        for rank, (score, _, crop) in enumerate(melhores, 1):
+            nome = nome_card(self.camera, track_id, rank)
+            # Espera vaga na fila: o crop não existe mais em nenhum frame futuro;
+            # já é a cópia feita em observar(), então vai para a fila sem outra
+            if self.gravador.salvar(nome, crop, esperar=True, copiar=False):
+                self.scores[nome] = round(float(score), 2)
+        self.tracks_gravados += 1
+        print(f"✓ Salvando {len(melhores)} crop(s): "
+              f"{self.gravador.pasta / nome_card(self.camera, track_id)} (score {melhores[0][0]:.0f})")
@@ -0,0 +1,77 @@
+"""
+Opções de linha de comando da captura (script.py e captura_multiprocesso.py).
+"""
+
+import argparse
+
+from deteccao_fundo import TAMANHO_TILE_PADRAO
+from detector_backend import OPCOES_BACKEND
+from gate_movimento import LIMIAR_PADRAO, STRIDE_PADRAO
+from melhores_crops import K_PADRAO
+from processamento_paralelo import SOBREPOSICAO_PADRAO
+from rastreamento import MODOS_COM_ID, MODO_PADRAO
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--video-esq',   default=None, help='Caminho ou URL do vídeo câmera ESQ')
+    parser.add_argument('--video-dir',   default=None, help='Caminho ou URL do vídeo câmera DIR')
+    parser.add_argument('--model',       default=None, help='Modelo YOLO (ex: yolo11n.pt)')
+    parser.add_argument('--confidence',  type=float, default=None, help='Confiança mínima 0-1')
+    parser.add_argument('--output-dir',  default=None, help='Pasta de saída das imagens')
+    parser.add_argument('--headless', action='store_true')
+    parser.add_argument('--rostos',      action='store_true',
+                        help='Salva só os cards com rosto detectado (Haar Cascade)')
+    parser.add_argument('--top-k',       type=int, default=K_PADRAO,
+                        help='Melhores crops salvos por track (nitidez, bordas e corpo visível)')
+    parser.add_argument('--rastreador',  default=MODO_PADRAO, choices=MODOS_COM_ID,
+                        help='Backend de rastreamento (um único tracker por câmera)')
+    parser.add_argument('--prefetch',    type=int, default=4,
+                        help='Frames decodificados à frente por câmera (0 = desligado)')
+    parser.add_argument('--output-video', default=None,
+                        help='Grava o vídeo anotado (ESQ | DIR lado a lado) neste arquivo')
+    parser.add_argument('--preview',     default=None,
+                        help='Salva o frame anotado mais recente neste JPEG (preview web)')
+    parser.add_argument('--preview-fps', type=float, default=2.0,
+                        help='Máximo de atualizações por segundo do preview')
+    parser.add_argument('--batch',       type=int, default=0,
+                        help='Frames consecutivos por câmera numa única inferência (0 = desligado)')
+    parser.add_argument('--stream-width', type=int, default=None,
+                        help='Streams: largura de saída do ffmpeg (mantém o aspecto)')
+    parser.add_argument('--stream-fps',  type=float, default=None,
+                        help='Streams: fps de saída do ffmpeg (descarta frames antes do pipe)')
+    parser.add_argument('--live',        action='store_true',
+                        help='Streams: processa sempre o frame mais recente (descarta atrasados)')
+    parser.add_argument('--live-buffer', type=int, default=1,
+                        help='Streams ao vivo: frames mais recentes mantidos por câmera')
+    parser.add_argument('--gate',        action='store_true',
+                        help='Roda o YOLO só com movimento ou a cada N frames (resto via Kalman)')
+    parser.add_argument('--gate-stride', type=int, default=STRIDE_PADRAO,
+                        help='Máximo de frames seguidos sem detector no modo --gate')
+    parser.add_argument('--gate-limiar', type=float, default=LIMIAR_PADRAO,
+                        help='Diferença média (0-255) que força uma detecção no modo --gate')
+    parser.add_argument('--detector',    default=None, choices=OPCOES_BACKEND,
+                        help='Backend do YOLO (padrão: DETECTOR_BACKEND ou pytorch; auto = benchmark do host)')
+    parser.add_argument('--fundo',       default=None,
+                        help='Faixa do fundo do campo em frações da altura (ex: 0,0.45) detectada também em tiles de alta resolução')
+    parser.add_argument('--fundo-tile',  type=int, default=TAMANHO_TILE_PADRAO,
+                        help='Lado dos tiles da faixa do fundo, em pixels do frame original')
+    parser.add_argument('--alvo',        default=None,
+                        help='Taxa a sustentar ajustando imgsz e stride: tempo-real, 2x (máx. 2x a duração) ou fps')
+    parser.add_argument('--roi',         default=None,
+                        help='JSON com o polígono do ROI de cada câmera (ver scripts/roi.py)')
+    parser.add_argument('--resume',      action='store_true',
+                        help='Retoma do último checkpoint (frame, rastreadores e cards salvos)')
+    parser.add_argument('--checkpoint',  default=None,
+                        help='Arquivo de checkpoint (padrão: <output-dir>/.checkpoint_captura.pkl)')
+    parser.add_argument('--checkpoint-every', type=int, default=300,
+                        help='Grava checkpoint a cada N frames (0 = só na parada)')
+    parser.add_argument('--workers',     action='store_true',
+                        help='Uma câmera por processo (modelo e threads próprios por câmera)')
+    parser.add_argument('--threads-por-worker', type=int, default=None,
+                        help='Threads de inferência por processo no modo --workers/--fatias (padrão: núcleos/processos)')
+    parser.add_argument('--fatias',      type=int, default=0,
+                        help='Vídeos locais: divide cada um em N intervalos processados em paralelo')
+    parser.add_argument('--sobreposicao', type=int, default=SOBREPOSICAO_PADRAO,
+                        help='Frames compartilhados entre fatias vizinhas para costurar os IDs')
+    return parser
@@ -0,0 +1,174 @@
+"""
+Pipeline de uma câmera da captura: detecção → rastreamento → cards → anotação.
+
+Usado por script.py (as duas câmeras no mesmo processo, com detecção em lote
+compartilhada) e por captura_multiprocesso.py (uma câmera por processo).
+"""
+
+import cv2
+import supervision as sv
+
+from melhores_crops import K_PADRAO, SelecionadorCrops
+
+CLASSES_DETECCAO = [0, 32]   # Pessoas e bola
+
+_box_annotator   = None
+_label_annotator = None
+
+
+def detectar_lote(model, frames, rois=None, fundo=None, imgsz=None):
+    """
+    Roda o YOLO uma única vez sobre uma lista de frames.
+    Usa predict — a associação de IDs fica com o rastreador de cada câmera.
+    rois: ROICamera de cada frame (ou None); com ROI, só o recorte vai para o YOLO.
+    fundo: FaixaFundo (deteccao_fundo.py) — tiles em resolução nativa na faixa
+    do fundo do campo, numa segunda chamada para o lote todo, unidos por NMS.
+    imgsz: tamanho de entrada do YOLO (controle de qualidade; None = o do modelo).
+    """
+    rois = rois if rois is not None else [None] * len(frames)
+    entradas = [roi.recortar(f) if roi else f for f, roi in zip(frames, rois)]
+    extra = {'imgsz': imgsz} if imgsz else {}
+    results = model.predict(
+        entradas,
+        classes=CLASSES_DETECCAO,
+        verbose=False,
+        **extra
+    )
+    detections = [sv.Detections.from_ultralytics(r) for r in results]
+    detections = [roi.mapear(d) if roi else d for d, roi in zip(detections, rois)]
+    if fundo is not None:
+        limites = [roi.retangulo(f.shape) if roi else None for f, roi in zip(frames, rois)]
+        detections = fundo.completar(model, frames, detections, CLASSES_DETECCAO, limites)
+    return [roi.filtrar(d) if roi else d for d, roi in zip(detections, rois)]
+
+
+def area_util(frame, roi=None):
+    """Recorte do ROI (o frame inteiro se não houver ROI)."""
+    return roi.recortar(frame) if roi else frame
+
+
+def anotar_frame(frame, detections, roi=None):
+    """Desenha caixas, IDs e ROI numa cópia do frame."""
+    global _box_annotator, _label_annotator
+    if _box_annotator is None:
+        # Anotadores com posição otimizada (ID acima da caixa)
+        _label_annotator = sv.LabelAnnotator(
+            text_position=sv.Position.TOP_CENTER,
+            text_scale=0.5,
+            text_thickness=1
+        )
+        _box_annotator = sv.BoxAnnotator(thickness=2)
+
+    labels = [
+        f"ID: {track_id} ({conf:.0%})"
+        for track_id, conf in zip(detections.tracker_id, detections.confidence)
+    ]
+
+    annotated_frame = _box_annotator.annotate(scene=frame.copy(), detections=detections)
+    annotated_frame = _label_annotator.annotate(scene=annotated_frame, detections=detections, labels=labels)
+
+    # Desenhar ROI se ativo
+    if roi is not None:
+        roi.desenhar(annotated_frame)
+
+    return annotated_frame
+
+
+class FiltroRosto:
+    """Haar Cascade: salva o card só se houver ao menos um rosto (ativo=False → sempre aceita)."""
+
+    def __init__(self, ativo: bool = False):
+        self.ativo = ativo
+        self._cascade = None
+        if ativo:
+            self._cascade = cv2.CascadeClassifier(
+                cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+
+    def __call__(self, image) -> bool:
+        if not self.ativo:
+            return True
+        if image is None or image.size == 0:
+            return False
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        faces = self._cascade.detectMultiScale(
+            gray,
+            scaleFactor=1.1,
+            minNeighbors=3,
+            minSize=(20, 20)
+        )
+        return len(faces) > 0
+
+
+class PipelineCamera:
+    """
+    Estado e processamento de uma câmera (rastreador, ROI, gate, faixa de tiles
+    do fundo e gravação dos cards).
+    Cards: top_k melhores crops de cada track (ver melhores_crops.py) — chame
+    finalizar() no fim da captura para gravar os tracks ainda abertos.
+    """
+
+    def __init__(self, nome, model, rastreador, gravador, confianca,
+                 roi=None, gate=None, filtro_rosto=None, top_k=K_PADRAO, fundo=None,
+                 controle=None):
+        self.nome       = nome
+        self.model      = model
+        self.rastreador = rastreador
+        self.gravador   = gravador
+        self.confianca  = confianca
+        self.roi        = roi
+        self.gate       = gate
+        self.fundo      = fundo
+        self.controle   = controle  # ControladorQualidade (mede o detector e define o imgsz)
+        self.tem_rosto  = filtro_rosto or FiltroRosto(False)
+        self.deteccoes  = None     # últimas detecções rastreadas (ou previstas)
+        self.selecionador = SelecionadorCrops(nome, gravador, top_k, aceitar=self.tem_rosto)
+
+    def precisa_detectar(self, frame) -> bool:
+        """Gate de movimento (só o movimento dentro do ROI conta)."""
+        return self.gate is None or self.gate.avaliar(area_util(frame, self.roi))
+
+    def processar(self, frame, detections=None, anotar=True, prever=False, salvar=True):
+        """
+        Detecta/rastreia, salva os cards e devolve o frame anotado (ou None se anotar=False).
+        prever=True: frame pulado pelo gate — caixas previstas pelo tracker, sem salvar cards.
+        salvar=False: só rastreia (aquecimento de uma fatia, ver processamento_paralelo.py).
+        """
+        if prever:
+            detections = self.deteccoes = self.rastreador.prever()
+            self.selecionador.avancar()
+            if not anotar:
+                return None
+            return anotar_frame(frame, detections, self.roi)
+
+        if detections is None:
+            # Detecção simples e rápida (já recortada/filtrada pelo ROI da câmera)
+            if self.controle is None:
+                detections = detectar_lote(self.model, [frame], [self.roi], self.fundo)[0]
+            else:
+                with self.controle.medir('detector'):
+                    detections = detectar_lote(self.model, [frame], [self.roi], self.fundo,
+                                               self.controle.imgsz)[0]
+
+        detections = self.deteccoes = self.rastreador.atualizar(detections, frame)
+
+        # Candidatos a card (top-K por track) com filtro de confiança; o de rosto roda no selecionador
+        for i in range(len(detections) if salvar else 0):
+            if detections.class_id[i] != 0:  # Só pessoas
+                continue
+            # FILTRO DE CONFIANÇA: Só salva se tiver certeza >= threshold
+            if detections.confidence[i] <= self.confianca:
+                continue
+            x1, y1, x2, y2 = detections.xyxy[i].astype(int)
+            crop = frame[max(0, y1):y2, max(0, x1):x2]
+            if crop.size > 0:
+                self.selecionador.observar(detections.tracker_id[i], crop)
+        self.selecionador.avancar()
+
+        # Em headless sem consumidor não há por que copiar e desenhar o frame
+        if not anotar:
+            return None
+        return anotar_frame(frame, detections, self.roi)
+
+    def finalizar(self) -> None:
+        """Fim da captura ou parada: grava o top-K dos tracks que ainda estão abertos."""
+        self.selecionador.finalizar()
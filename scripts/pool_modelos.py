@@ -0,0 +1,155 @@
+"""
+Pool de modelos do processo (Flask): detector YOLO e embedder do ReID.
+
+Cada handler de /api/atleta/* e cada thread de captura/análise montava o
+próprio YOLO e o próprio ResNet50 — segundos de carga por requisição e um
+ResNet50 (~100 MB) duplicado por job simultâneo. Aqui cada modelo é carregado
+uma única vez (detector_backend.carregar_detector / embedders.get_embedder,
+que já mantêm cache por processo), aquecido com uma inferência vazia e
+compartilhado entre as threads:
+
+  - carga preguiçosa: o primeiro obter_*() carrega; os seguintes só devolvem
+  - aquecer(): carrega e aquece tudo numa thread em segundo plano (startup)
+  - thread-safety: o DetectorYOLO e o Embedder têm lock próprio (um lock por
+    modelo); as cargas são serializadas para medir a memória de cada uma
+  - status(): estado, tempos de carga/aquecimento, memória (RSS antes/depois
+    da carga) e número de usos — exposto em /api/modelos/status
+"""
+
+import threading
+import time
+
+import numpy as np
+
+_modelos = {}                       # chave → {'modelo': ..., estado e métricas}
+_carga_lock = threading.Lock()      # uma carga por vez (delta de RSS por modelo)
+_aquecimento = {'estado': 'parado'}
+
+
+def _rss_mb():
+    """Memória residente atual do processo em MB (psutil ou /proc; None se indisponível)."""
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().rss / 2**20, 1)
+    except ImportError:
+        pass
+    try:
+        import resource
+        with open('/proc/self/statm') as f:
+            return round(int(f.read().split()[1]) * resource.getpagesize() / 2**20, 1)
+    except (ImportError, OSError):   # sem psutil fora do Linux: ru_maxrss é pico, não serve
+        return None
+
+
+def _carregar_detector():
+    from scripts.detector_backend import carregar_detector
+    return carregar_detector()
+
+
+def _aquecer_detector(detector):
+    detector.predict(np.zeros((640, 640, 3), dtype=np.uint8), classes=[0], verbose=False)
+
+
+def _carregar_embedder():
+    from scripts.embedders import get_embedder
+    return get_embedder()
+
+
+def _aquecer_embedder(embedder):
+    from scripts.preprocessamento_reid import IMG_SIZE
+    embedder.embeddings([np.zeros((*IMG_SIZE, 3), dtype=np.uint8)])
+
+
+MODELOS = {
+    'detector': (_carregar_detector, _aquecer_detector),
+    'embedder': (_carregar_embedder, _aquecer_embedder),
+}
+
+
+def _obter(chave: str, uso: bool = True):
+    info = _modelos.get(chave)
+    if info is None or info['estado'] != 'pronto':
+        with _carga_lock:
+            info = _modelos.get(chave)
+            if info is None or info['estado'] != 'pronto':
+                info = _carregar(chave)
+    if uso:
+        info['usos'] += 1
+    return info['modelo']
+
+
+def _carregar(chave: str) -> dict:
+    """Carrega e aquece um modelo (chamado com _carga_lock)."""
+    carregar, aquecer = MODELOS[chave]
+    info = {'estado': 'carregando', 'modelo': None, 'usos': 0}
+    _modelos[chave] = info
+    rss0 = _rss_mb()
+    try:
+        t0 = time.perf_counter()
+        modelo = carregar()
+        t1 = time.perf_counter()
+        aquecer(modelo)
+        t2 = time.perf_counter()
+    except Exception as e:
+        info.update({'estado': 'erro', 'erro': str(e)[:200]})
+        raise
+    rss1 = _rss_mb()
+    info.update({
+        'estado':         'pronto',
+        'modelo':         modelo,
+        'descricao':      repr(modelo),
+        'carga_ms':       round((t1 - t0) * 1000),
+        'aquecimento_ms': round((t2 - t1) * 1000),
+        'memoria_mb':     round(rss1 - rss0, 1) if rss0 is not None and rss1 is not None else None,
+    })
+    print(f"[POOL] {chave} pronto: {info['descricao']} (carga {info['carga_ms']} ms, "
+          f"aquecimento {info['aquecimento_ms']} ms, +{info['memoria_mb']} MB)", flush=True)
+    return info
+
+
+def obter_detector():
+    """DetectorYOLO compartilhado (backend de DETECTOR_BACKEND)."""
+    return _obter('detector')
+
+
+def obter_embedder():
+    """Embedder do ReID compartilhado (REID_EMBEDDER / REID_BACKEND, ver embedders.py)."""
+    return _obter('embedder')
+
+
+def aquecer(em_segundo_plano: bool = True):
+    """Carrega e aquece todos os modelos (no startup do Flask, sem bloquear)."""
+    def _run():
+        _aquecimento.update({'estado': 'rodando', 'inicio': time.strftime('%H:%M:%S')})
+        t0 = time.perf_counter()
+        for chave in MODELOS:
+            try:
+                _obter(chave, uso=False)
+            except Exception as e:
+                print(f"[POOL] ⚠️  {chave} não carregou: {e}", flush=True)
+        _aquecimento.update({'estado': 'concluido', 'duracao_s': round(time.perf_counter() - t0, 1)})
+
+    if not em_segundo_plano:
+        _run()
+        return None
+    thread = threading.Thread(target=_run, daemon=True, name='aquecer-modelos')
+    thread.start()
+    return thread
+
+
+def status() -> dict:
+    """Estado de cada modelo e memória do processo (JSON-serializável)."""
+    modelos = {}
+    for chave in MODELOS:
+        info = _modelos.get(chave)
+        if info is None:
+            modelos[chave] = {'estado': 'nao_carregado'}
+        else:
+            modelos[chave] = {k: v for k, v in info.items() if k != 'modelo'}
+    carregados = [m['memoria_mb'] for m in modelos.values() if m.get('memoria_mb') is not None]
+    return {
+        'modelos':        modelos,
+        'aquecimento':    dict(_aquecimento),
+        'memoria_modelos_mb': round(sum(carregados), 1),
+        'rss_mb':         _rss_mb(),
+    }
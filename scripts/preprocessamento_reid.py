@@ -0,0 +1,123 @@
+"""
+Pré-processamento dos crops para o ReID em NumPy/cv2.
+
+Substitui, nos três extratores (acelerador.ReIDAccelerado,
+analisar_atleta._embeddings e reconhecer_com_reid.ReconhecedorReID), a cadeia
+cv2.cvtColor → Image.fromarray → Resize/ToTensor/Normalize → unsqueeze(0),
+que alocava várias cópias por crop. Aqui cada crop é redimensionado com
+cv2.resize direto num buffer uint8 do lote e a troca BGR→RGB, a escala 1/255
+e a normalização mean/std viram um único passo vetorizado (multiply-add por
+canal) que escreve no buffer float32 NCHW de saída — que pode ser
+pré-alocado pelo chamador (entrada do OpenVINO).
+
+Interpolação: INTER_LINEAR para ampliar (igual ao bilinear do PIL, diferença
+de arredondamento ≤ 1 nível de cinza) e INTER_AREA para reduzir (o bilinear do
+PIL tem antialias na redução; INTER_LINEAR do cv2 não). Para conferir contra o
+transform antigo:
+
+    python scripts/preprocessamento_reid.py --validar jogadores_terca
+"""
+
+import cv2
+import numpy as np
+
+IMG_SIZE = (256, 128)                                  # Altura × Largura padrão ReID
+MEAN     = np.array([0.485, 0.456, 0.406], dtype=np.float32)   # RGB (ImageNet)
+STD      = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+# Canal c da saída (RGB) = crop[..., 2 - c] * ESCALA[c] - DESLOCAMENTO[c]
+_ESCALA       = (1.0 / (255.0 * STD)).reshape(1, 3, 1, 1)
+_DESLOCAMENTO = (MEAN / STD).reshape(1, 3, 1, 1)
+
+TOLERANCIA_VALIDACAO = 0.35   # |diferença| máxima aceitável (unidades normalizadas)
+
+
+def preprocessar(crops, saida: np.ndarray = None, tamanho=IMG_SIZE) -> np.ndarray:
+    """
+    Crops BGR (uint8) → tensor float32 (N, 3, H, W) normalizado, em RGB.
+    saida: buffer (L, 3, H, W) com L ≥ N, reaproveitado entre chamadas; as
+    posições além dos N crops ficam zeradas (padding do lote).
+    """
+    h, w = tamanho
+    n = len(crops)
+    if saida is None:
+        saida = np.empty((n, 3, h, w), dtype=np.float32)
+    redim = np.empty((n, h, w, 3), dtype=np.uint8)
+    for j, crop in enumerate(crops):
+        reduzir = crop.shape[0] > h or crop.shape[1] > w
+        cv2.resize(crop, (w, h), dst=redim[j],
+                   interpolation=cv2.INTER_AREA if reduzir else cv2.INTER_LINEAR)
+    # BGR → RGB (view invertida) e NHWC → NCHW (view transposta); multiply-add direto na saída
+    np.multiply(redim[..., ::-1].transpose(0, 3, 1, 2), _ESCALA, out=saida[:n])
+    saida[:n] -= _DESLOCAMENTO
+    saida[n:] = 0
+    return saida
+
+
+# ─── Validação contra o transform antigo (PIL + torchvision) ──────
+def transform_torchvision(tamanho=IMG_SIZE):
+    from torchvision import transforms
+    return transforms.Compose([
+        transforms.Resize(tamanho),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=MEAN.tolist(), std=STD.tolist()),
+    ])
+
+
+def comparar_com_torchvision(crops, tamanho=IMG_SIZE) -> dict:
+    """Diferença entre preprocessar() e o transform PIL/torchvision nos mesmos crops."""
+    from PIL import Image
+
+    transform = transform_torchvision(tamanho)
+    novo = preprocessar(crops, tamanho=tamanho)
+    antigo = np.stack([
+        transform(Image.fromarray(cv2.cvtColor(c, cv2.COLOR_BGR2RGB))).numpy() for c in crops
+    ])
+    dif = np.abs(novo - antigo).reshape(len(crops), -1)
+    a = antigo.reshape(len(crops), -1)
+    b = novo.reshape(len(crops), -1)
+    cos = (a * b).sum(1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1) + 1e-8)
+    return {
+        'crops':         len(crops),
+        'dif_max':       round(float(dif.max()), 4),
+        'dif_media':     round(float(dif.mean()), 5),
+        'cosseno_min':   round(float(cos.min()), 6),
+        'ok':            bool(dif.max() <= TOLERANCIA_VALIDACAO),
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+    from pathlib import Path
+
+    parser = argparse.ArgumentParser(description='Confere o pré-processamento do ReID contra PIL + torchvision')
+    parser.add_argument('--validar', metavar='PASTA', default='jogadores_terca',
+                        help='Pasta com crops .jpg (busca recursiva)')
+    parser.add_argument('--max', type=int, default=200, help='Máximo de crops usados')
+    args = parser.parse_args()
+
+    caminhos = sorted(Path(args.validar).rglob('*.jpg'))[:args.max]
+    crops = [c for c in (cv2.imread(str(p)) for p in caminhos) if c is not None]
+    if not crops:
+        raise SystemExit(f"❌ Nenhum crop .jpg em {args.validar}")
+
+    resultado = comparar_com_torchvision(crops)
+    print(f"\n🔬 {resultado['crops']} crops de {args.validar}")
+    print(f"   Diferença máxima: {resultado['dif_max']} | média: {resultado['dif_media']} "
+          f"| cosseno mínimo: {resultado['cosseno_min']}")
+
+    from PIL import Image
+    transform = transform_torchvision()
+    t0 = time.perf_counter()
+    for c in crops:
+        transform(Image.fromarray(cv2.cvtColor(c, cv2.COLOR_BGR2RGB))).unsqueeze(0)
+    t_antigo = time.perf_counter() - t0
+    buffer = np.empty((len(crops), 3, *IMG_SIZE), dtype=np.float32)
+    t0 = time.perf_counter()
+    preprocessar(crops, buffer)
+    t_novo = time.perf_counter() - t0
+    print(f"   PIL + torchvision: {t_antigo / len(crops) * 1000:.2f} ms/crop | "
+          f"cv2 + NumPy: {t_novo / len(crops) * 1000:.2f} ms/crop ({t_antigo / max(t_novo, 1e-9):.1f}x)")
+    print(f"   {'✅ Dentro da tolerância' if resultado['ok'] else '⚠️  Acima da tolerância'} "
+          f"({TOLERANCIA_VALIDACAO})\n")
@@ -0,0 +1,298 @@
+"""
+Processamento fatiado de um vídeo longo (arquivo local) em paralelo.
+
+O vídeo é dividido em N intervalos de frames. Cada fatia é processada num
+processo do pool a partir de `sobreposicao` frames antes do seu início: esses
+frames só aquecem o rastreador e servem para costurar os IDs com a fatia
+anterior, que processou os mesmos frames no fim do seu intervalo. Saídas
+(cards, posições) vêm apenas do intervalo próprio de cada fatia, então o
+resultado final cobre cada frame uma única vez.
+
+Costura: na janela de sobreposição, cada track da fatia k+1 é comparado com
+os tracks da fatia k presentes nos mesmos frames — IoU médio das caixas nos
+frames em comum + similaridade do histograma HSV dos crops. Os pares são
+aceitos do maior para o menor score (guloso); tracks sem par recebem IDs
+globais novos. A fatia 0 mantém os próprios IDs.
+
+Uso pelos scripts (a função de fatia precisa ser importável, ou seja, de
+nível de módulo):
+
+    fatias = dividir_video(video, n_fatias, sobreposicao)
+    resultados = executar_fatias(minha_funcao_de_fatia, [(video, f, ...) for f in fatias], n_fatias)
+    mapas = costurar_fatias([r['registro'] for r in resultados])   # RegistroJanelas.resultado()
+
+Dentro da fatia, deve_parar() e reportar_progresso() falam com o processo principal.
+"""
+
+import os
+import queue
+import signal
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+SOBREPOSICAO_PADRAO = 50     # frames (~2s a 25 fps)
+IOU_MINIMO          = 0.3    # IoU médio mínimo para aceitar um par na costura
+PESO_IOU            = 0.7    # score = PESO_IOU * IoU + (1 - PESO_IOU) * aparência
+FRAMES_COMUNS_MIN   = 3      # frames com os dois tracks presentes para comparar
+
+_fila_progresso = None       # fila e evento de parada do pool (definidos no initializer de cada worker)
+_evento_parar   = None
+_tarefa_atual   = None
+
+
+class Fatia(NamedTuple):
+    """Intervalo [inicio, fim) de frames de uma fatia; a leitura começa em `leitura`."""
+    indice:  int
+    inicio:  int
+    fim:     int
+    leitura: int
+
+    @property
+    def janela_inicio(self):
+        """Frames de aquecimento, compartilhados com o fim da fatia anterior."""
+        return range(self.leitura, self.inicio)
+
+    def janela_fim(self, sobreposicao):
+        return range(max(self.inicio, self.fim - sobreposicao), self.fim)
+
+
+def total_frames_video(caminho) -> int:
+    cap = cv2.VideoCapture(str(caminho))
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return total
+
+
+def dividir_intervalos(total_frames: int, n_fatias: int,
+                       sobreposicao: int = SOBREPOSICAO_PADRAO) -> list:
+    """N intervalos contíguos de tamanho parecido; cada um lê `sobreposicao` frames antes."""
+    n_fatias = max(1, min(n_fatias, total_frames))
+    limites = np.linspace(0, total_frames, n_fatias + 1).astype(int)
+    return [
+        Fatia(i, int(limites[i]), int(limites[i + 1]), max(0, int(limites[i]) - sobreposicao))
+        for i in range(n_fatias)
+    ]
+
+
+def dividir_video(caminho, n_fatias: int, sobreposicao: int = SOBREPOSICAO_PADRAO) -> list:
+    total = total_frames_video(caminho)
+    if total <= 0:
+        raise ValueError(f"Não foi possível contar os frames de {caminho} (stream?)")
+    return dividir_intervalos(total, n_fatias, sobreposicao)
+
+
+def abrir_na_fatia(caminho, fatia: Fatia):
+    """VideoCapture já posicionado no primeiro frame a ler da fatia."""
+    cap = cv2.VideoCapture(str(caminho))
+    if fatia.leitura and cap.isOpened():
+        cap.set(cv2.CAP_PROP_POS_FRAMES, fatia.leitura)
+    return cap
+
+
+# ─── Pool ─────────────────────────────────────────────────────────
+def _iniciar_worker(fila, evento, threads):
+    global _fila_progresso, _evento_parar
+    # Ctrl+C chega ao grupo todo: quem decide parar é o principal (via deve_parar)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _fila_progresso = fila
+    _evento_parar   = evento
+    if threads:
+        os.environ['OMP_NUM_THREADS'] = str(threads)
+        cv2.setNumThreads(threads)
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+
+def deve_parar() -> bool:
+    """Chamado de dentro da fatia: o principal pediu parada (.stop_script, SIGTERM, Ctrl+C)."""
+    return _evento_parar is not None and _evento_parar.is_set()
+
+
+def reportar_progresso(frames: int) -> None:
+    """Chamado de dentro da fatia: frames já processados (chega ao callback do principal)."""
+    if _fila_progresso is None:
+        return
+    try:
+        _fila_progresso.put_nowait((_tarefa_atual, frames))
+    except queue.Full:
+        pass
+
+
+def _executar_tarefa(funcao, indice, tarefa):
+    global _tarefa_atual
+    _tarefa_atual = indice
+    return funcao(*tarefa)
+
+
+def executar_fatias(funcao, tarefas: list, n_workers: int, progresso=None,
+                    threads: int = None, parar=None) -> list:
+    """
+    Roda funcao(*tarefa) para cada tarefa num ProcessPoolExecutor (spawn) e
+    devolve os resultados na ordem das tarefas.
+    progresso(indice, frames): chamado no processo principal conforme as tarefas reportam
+    (indice = posição da tarefa na lista).
+    threads: threads de inferência por worker (padrão: núcleos / n_workers).
+    parar(): consultado no principal; quando True, as fatias veem deve_parar() e encerram.
+    """
+    n_workers = max(1, min(n_workers, len(tarefas)))
+    threads = threads or max(1, (os.cpu_count() or n_workers) // n_workers)
+    ctx    = get_context('spawn')
+    fila   = ctx.Queue(maxsize=1024)
+    evento = ctx.Event()
+
+    def _drenar():
+        while True:
+            try:
+                indice, frames = fila.get_nowait()
+            except queue.Empty:
+                return
+            if progresso is not None:
+                progresso(indice, frames)
+
+    resultados = [None] * len(tarefas)
+    with ProcessPoolExecutor(n_workers, mp_context=ctx,
+                             initializer=_iniciar_worker, initargs=(fila, evento, threads)) as pool:
+        futuros = {pool.submit(_executar_tarefa, funcao, i, tarefa): i for i, tarefa in enumerate(tarefas)}
+        pendentes = set(futuros)
+        while pendentes:
+            feitos, pendentes = wait(pendentes, timeout=0.5, return_when=FIRST_COMPLETED)
+            for f in feitos:
+                resultados[futuros[f]] = f.result()
+            _drenar()
+            if parar is not None and parar():
+                evento.set()
+        _drenar()
+    return resultados
+
+
+# ─── Registro das janelas de sobreposição (dentro de cada fatia) ──
+def histograma_aparencia(crop) -> np.ndarray:
+    """Histograma HSV (H×S) normalizado do crop — assinatura de cor barata do uniforme."""
+    hsv  = cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)
+    hist = cv2.calcHist([hsv], [0, 1], None, [16, 8], [0, 180, 0, 256]).flatten()
+    return hist / (hist.sum() + 1e-8)
+
+
+class RegistroJanelas:
+    """
+    Caixas e aparência dos tracks nas duas janelas de sobreposição de uma fatia
+    (aquecimento no início e últimos frames do intervalo). Resultado picklável.
+    """
+
+    def __init__(self, fatia: Fatia, sobreposicao: int):
+        self.fatia   = fatia
+        self._inicio = fatia.janela_inicio
+        self._fim    = fatia.janela_fim(sobreposicao)
+        self.janelas = {'inicio': {'caixas': {}, 'hist': {}}, 'fim': {'caixas': {}, 'hist': {}}}
+        self.ids     = set()
+
+    def registrar(self, frame_idx: int, detections, frame) -> None:
+        """frame_idx: índice (base 0) do frame no vídeo; detections com tracker_id."""
+        if detections.tracker_id is None:
+            return
+        if frame_idx >= self.fatia.inicio:
+            self.ids.update(int(t) for t in detections.tracker_id)
+        if frame_idx in self._inicio:
+            janela = self.janelas['inicio']
+        elif frame_idx in self._fim:
+            janela = self.janelas['fim']
+        else:
+            return
+        h, w = frame.shape[:2]
+        caixas = {}
+        for xyxy, track_id in zip(detections.xyxy, detections.tracker_id):
+            track_id = int(track_id)
+            caixas[track_id] = xyxy.astype(np.float32)
+            x1, y1, x2, y2 = xyxy.astype(int)
+            crop = frame[max(0, y1):min(h, y2), max(0, x1):min(w, x2)]
+            if crop.size:
+                hist = histograma_aparencia(crop)
+                acumulado = janela['hist'].get(track_id)
+                janela['hist'][track_id] = hist if acumulado is None else acumulado + hist
+        janela['caixas'][frame_idx] = caixas
+
+    def resultado(self) -> dict:
+        return {'janelas': self.janelas, 'ids': sorted(self.ids)}
+
+
+# ─── Costura dos IDs entre fatias ─────────────────────────────────
+def _iou(a, b) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    uniao = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return float(inter / uniao) if uniao > 0 else 0.0
+
+
+def _similaridade_hist(ha, hb) -> float:
+    if ha is None or hb is None:
+        return 0.0
+    corr = cv2.compareHist(ha.astype(np.float32), hb.astype(np.float32), cv2.HISTCMP_CORREL)
+    return float(max(0.0, corr))
+
+
+def parear_tracks(fim_anterior: dict, inicio_atual: dict) -> dict:
+    """
+    Pares {id_atual: id_anterior} entre o fim da fatia k e o aquecimento da
+    fatia k+1 (mesmos frames), por IoU médio + aparência, guloso por score.
+    """
+    frames = sorted(set(fim_anterior['caixas']) & set(inicio_atual['caixas']))
+    somas, contagens = {}, {}
+    for f in frames:
+        anteriores = fim_anterior['caixas'][f]
+        for id_b, caixa_b in inicio_atual['caixas'][f].items():
+            for id_a, caixa_a in anteriores.items():
+                chave = (id_a, id_b)
+                somas[chave]     = somas.get(chave, 0.0) + _iou(caixa_a, caixa_b)
+                contagens[chave] = contagens.get(chave, 0) + 1
+
+    candidatos = []
+    for (id_a, id_b), soma in somas.items():
+        if contagens[(id_a, id_b)] < min(FRAMES_COMUNS_MIN, len(frames)):
+            continue
+        iou = soma / contagens[(id_a, id_b)]
+        if iou < IOU_MINIMO:
+            continue
+        aparencia = _similaridade_hist(fim_anterior['hist'].get(id_a), inicio_atual['hist'].get(id_b))
+        candidatos.append((PESO_IOU * iou + (1 - PESO_IOU) * aparencia, id_a, id_b))
+
+    pares, usados = {}, set()
+    for _, id_a, id_b in sorted(candidatos, reverse=True):
+        if id_b in pares or id_a in usados:
+            continue
+        pares[id_b] = id_a
+        usados.add(id_a)
+    return pares
+
+
+def costurar_fatias(resultados: list) -> list:
+    """
+    resultados: RegistroJanelas.resultado() de cada fatia, em ordem.
+    Retorna, por fatia, o mapa {id_local: id_global}.
+    """
+    mapas = []
+    proximo_id = 1
+    for k, res in enumerate(resultados):
+        if k == 0:
+            mapa = {i: i for i in res['ids']}
+        else:
+            pares = parear_tracks(resultados[k - 1]['janelas']['fim'], res['janelas']['inicio'])
+            anterior = mapas[k - 1]
+            mapa = {}
+            for i in res['ids']:
+                if i in pares and pares[i] in anterior:
+                    mapa[i] = anterior[pares[i]]
+                else:
+                    mapa[i] = proximo_id
+                    proximo_id += 1
+        if mapa:
+            proximo_id = max(proximo_id, max(mapa.values()) + 1)
+        mapas.append(mapa)
+    return mapas
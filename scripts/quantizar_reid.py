@@ -0,0 +1,225 @@
+"""
+Quantização INT8 do backbone de ReID (reid_backbone.onnx → reid_backbone_int8.xml).
+
+O ResNet50 FP32 (2048-d) é o modelo mais pesado de cada análise de atleta. A
+quantização pós-treino do NNCF calibra as faixas de ativação com crops reais
+(atleta_refs/ e jogadores_terca/, pré-processados exatamente como na
+inferência) e grava um IR OpenVINO que o ReIDAccelerado carrega com
+precisao='int8' (ou REID_PRECISAO=int8). Em CPUs com VNNI/AMX o ganho
+esperado é de 2–4x no ReID.
+
+Depois da quantização, o relatório compara INT8 com FP32 no mesmo host:
+  - latência por crop (lote 1 e lote 32)
+  - deriva de similaridade: cosseno entre o embedding FP32 e o INT8 do mesmo
+    crop (crops fora da calibração)
+  - calibrar_threshold de cada atleta em atleta_refs/ com os dois modelos
+    (referência gerada pelo próprio modelo): melhor F1 e threshold
+O resultado fica em reid_quantizacao.json (por host), ao lado do
+detector_benchmark.json.
+
+Uso (da raiz do projeto):
+    python -m scripts.quantizar_reid
+    python -m scripts.quantizar_reid --pastas atleta_refs jogadores_terca --max 300
+    python -m scripts.quantizar_reid --so-relatorio      # IR já gerado, só compara
+"""
+
+import argparse
+import json
+import platform
+import socket
+import time
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from scripts.acelerador import REID_INT8, ReIDAccelerado, garantir_onnx
+from scripts.preprocessamento_reid import preprocessar
+
+RAIZ            = Path(__file__).resolve().parent.parent
+RELATORIO_FILE  = RAIZ / 'reid_quantizacao.json'
+PASTAS_PADRAO   = ('atleta_refs', 'jogadores_terca')
+MAX_CROPS       = 300
+EXTENSOES       = ('.jpg', '.jpeg', '.png')
+REPETICOES      = 5       # passadas na medição de latência
+
+
+def coletar_crops(pastas, maximo: int = MAX_CROPS) -> list:
+    """Crops BGR das pastas (busca recursiva), amostrados uniformemente até `maximo`."""
+    caminhos = []
+    for pasta in pastas:
+        pasta = Path(pasta)
+        if not pasta.is_dir():
+            print(f"⚠️  Pasta não encontrada: {pasta}")
+            continue
+        caminhos += sorted(p for p in pasta.rglob('*') if p.suffix.lower() in EXTENSOES)
+    if len(caminhos) > maximo:
+        caminhos = [caminhos[i] for i in np.linspace(0, len(caminhos) - 1, maximo).astype(int)]
+    return [c for c in (cv2.imread(str(p)) for p in caminhos) if c is not None]
+
+
+def separar(crops: list) -> tuple:
+    """1 em cada 4 crops fica fora da calibração (medição de deriva)."""
+    if len(crops) < 8:
+        return crops, crops
+    calibracao = [c for i, c in enumerate(crops) if i % 4 != 1]
+    return calibracao, crops[1::4]
+
+
+def quantizar(crops: list, destino: Path = REID_INT8) -> Path:
+    """Quantização pós-treino (NNCF) do ONNX FP32 calibrada nos crops; grava o IR."""
+    try:
+        import nncf
+    except ImportError:
+        raise SystemExit("❌ NNCF não instalado — pip install nncf")
+    import openvino as ov
+
+    core   = ov.Core()
+    modelo = core.read_model(str(garantir_onnx(core)))
+    dados  = nncf.Dataset(crops, lambda crop: preprocessar([crop]))
+    print(f"⚙️  Calibrando INT8 com {len(crops)} crops...", flush=True)
+    t0 = time.perf_counter()
+    quantizado = nncf.quantize(modelo, dados, preset=nncf.QuantizationPreset.PERFORMANCE,
+                               subset_size=len(crops))
+    ov.save_model(quantizado, str(destino))
+    print(f"✓ IR INT8 salvo em {destino} ({time.perf_counter() - t0:.0f} s)", flush=True)
+    return destino
+
+
+def medir_latencia(reid: ReIDAccelerado, crops: list, lote: int) -> float:
+    """ms por crop com lotes de `lote` crops (após aquecimento/compilação)."""
+    grupos = [crops[i:i + lote] for i in range(0, len(crops), lote)]
+    reid.embeddings(grupos[0])
+    t0 = time.perf_counter()
+    for _ in range(REPETICOES):
+        for grupo in grupos:
+            reid.embeddings(grupo)
+    return (time.perf_counter() - t0) / (REPETICOES * len(crops)) * 1000
+
+
+def _referencia(reid: ReIDAccelerado, pasta: Path):
+    """Embedding médio das fotos do atleta com este modelo (como gerar_embedding_referencia)."""
+    fotos = sorted(p for p in pasta.iterdir() if p.suffix.lower() in EXTENSOES)
+    imgs = [img for img in (cv2.imread(str(p)) for p in fotos) if img is not None]
+    if len(imgs) < 3:
+        return None
+    ref = reid.embeddings(imgs).mean(axis=0)
+    return ref / (np.linalg.norm(ref) + 1e-8)
+
+
+def comparar_f1(modelos: dict, atleta_refs_dir) -> list:
+    """calibrar_threshold de cada atleta com cada modelo."""
+    from scripts.analisar_atleta import calibrar_threshold
+
+    atleta_refs_dir = Path(atleta_refs_dir)
+    if not atleta_refs_dir.is_dir():
+        return []
+    linhas = []
+    for pasta in sorted(p for p in atleta_refs_dir.iterdir() if p.is_dir()):
+        linha = {'atleta': pasta.name}
+        for precisao, reid in modelos.items():
+            ref = _referencia(reid, pasta)
+            if ref is None:
+                break
+            r = calibrar_threshold(pasta.name, atleta_refs_dir, embeddings_fn=reid.embeddings, ref_emb=ref)
+            linha[precisao] = {'best_f1': r['best_f1'], 'best_threshold': r['best_threshold'],
+                               'sim_medio_pos': r['sim_medio_pos'], 'sim_medio_neg': r['sim_medio_neg']}
+        else:
+            linha['delta_f1'] = round(linha['int8']['best_f1'] - linha['fp32']['best_f1'], 4)
+            linhas.append(linha)
+    return linhas
+
+
+def relatorio(crops_avaliacao: list, atleta_refs_dir='atleta_refs', n_calibracao: int = None,
+              salvar: bool = True) -> dict:
+    """Latência, deriva de similaridade e F1 do INT8 contra o FP32 neste host."""
+    modelos = {'fp32': ReIDAccelerado('fp32'), 'int8': ReIDAccelerado('int8')}
+
+    latencia = {}
+    for lote in (1, 32):
+        ms = {p: round(medir_latencia(r, crops_avaliacao, lote), 3) for p, r in modelos.items()}
+        ms['ganho'] = round(ms['fp32'] / max(ms['int8'], 1e-9), 2)
+        latencia[f'lote_{lote}'] = ms
+
+    e32 = modelos['fp32'].embeddings(crops_avaliacao)
+    e8  = modelos['int8'].embeddings(crops_avaliacao)
+    cos = (e32 * e8).sum(axis=1)
+    deriva = {
+        'crops':              len(crops_avaliacao),
+        'cosseno_medio':      round(float(cos.mean()), 5),
+        'cosseno_min':        round(float(cos.min()), 5),
+        'diferenca_media':    round(float(1 - cos.mean()), 5),
+    }
+
+    registro = {
+        'data':        datetime.now().isoformat(timespec='seconds'),
+        'processador': platform.processor() or platform.machine(),
+        'modelo_int8': str(REID_INT8.name),
+        'calibracao':  n_calibracao,
+        'latencia_ms_por_crop': latencia,
+        'deriva':      deriva,
+        'f1':          comparar_f1(modelos, atleta_refs_dir),
+    }
+    if salvar:
+        dados = {}
+        if RELATORIO_FILE.exists():
+            try:
+                dados = json.loads(RELATORIO_FILE.read_text(encoding='utf-8'))
+            except (OSError, json.JSONDecodeError):
+                dados = {}
+        dados[socket.gethostname()] = registro
+        RELATORIO_FILE.write_text(json.dumps(dados, ensure_ascii=False, indent=2), encoding='utf-8')
+    return registro
+
+
+def imprimir(registro: dict) -> None:
+    print(f"\n{'Latência (ms/crop)':<20} {'FP32':>9} {'INT8':>9} {'Ganho':>7}")
+    print("-" * 48)
+    for lote, ms in registro['latencia_ms_por_crop'].items():
+        print(f"{lote:<20} {ms['fp32']:>9.2f} {ms['int8']:>9.2f} {ms['ganho']:>6.2f}x")
+
+    d = registro['deriva']
+    print(f"\n🔬 Deriva em {d['crops']} crops fora da calibração: cosseno médio {d['cosseno_medio']} "
+          f"(diferença {d['diferenca_media']}) | mínimo {d['cosseno_min']}")
+
+    if registro['f1']:
+        print(f"\n{'Atleta':<20} {'F1 FP32':>8} {'F1 INT8':>8} {'Δ F1':>8} {'Thr FP32':>9} {'Thr INT8':>9}")
+        print("-" * 66)
+        for l in registro['f1']:
+            print(f"{l['atleta']:<20} {l['fp32']['best_f1']:>8.4f} {l['int8']['best_f1']:>8.4f} "
+                  f"{l['delta_f1']:>+8.4f} {l['fp32']['best_threshold']:>9.2f} {l['int8']['best_threshold']:>9.2f}")
+    else:
+        print("\n⚠️  Sem atletas com ≥ 3 fotos para comparar o F1")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Quantização INT8 do backbone de ReID (NNCF)')
+    parser.add_argument('--pastas', nargs='+', default=list(PASTAS_PADRAO),
+                        help='Pastas com crops para calibração (busca recursiva)')
+    parser.add_argument('--max', type=int, default=MAX_CROPS, help='Máximo de crops usados')
+    parser.add_argument('--atleta-refs', default='atleta_refs', help='Pasta dos atletas (comparação de F1)')
+    parser.add_argument('--so-relatorio', action='store_true', help='Não quantiza; só compara o IR existente')
+    args = parser.parse_args()
+
+    crops = coletar_crops(args.pastas, args.max)
+    if not crops:
+        raise SystemExit(f"❌ Nenhum crop em {', '.join(args.pastas)}")
+    calibracao, avaliacao = separar(crops)
+
+    print("\n" + "="*70)
+    print(f"⚙️  QUANTIZAÇÃO INT8 DO REID — {socket.gethostname()}")
+    print("="*70)
+    if not args.so_relatorio:
+        quantizar(calibracao)
+    elif not REID_INT8.exists():
+        raise SystemExit(f"❌ {REID_INT8} não existe — rode sem --so-relatorio")
+
+    registro = relatorio(avaliacao, args.atleta_refs, None if args.so_relatorio else len(calibracao))
+    imprimir(registro)
+    print("="*70)
+    print(f"✓ Relatório salvo em {RELATORIO_FILE} (use REID_PRECISAO=int8 para carregar o IR)\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""
+Backends de rastreamento (associação de IDs entre frames).
+
+Antes cada loop rodava DOIS trackers por frame: model.track(persist=True)
+(tracker interno do Ultralytics) e em seguida sv.ByteTrack sobre o resultado.
+Agora a detecção é sempre model.predict e um único backend associa os IDs:
+
+  - 'bytetrack'   → sv.ByteTrack (supervision) — padrão, mesmos IDs de antes
+  - 'ultralytics' → BYTETracker/BoT-SORT do Ultralytics configurado por custom_tracker.yaml
+  - 'nenhum'      → só detecção, sem tracker_id (baseline de FPS no benchmark)
+
+Cada câmera deve ter o seu próprio rastreador (criar_rastreador por câmera).
+
+Frames sem detector (gate_movimento.py): prever() devolve as caixas dos
+tracks ativos extrapoladas pelo Kalman, sem alterar o estado do tracker —
+cada chamada avança um frame a partir da última atualizar().
+"""
+
+from pathlib import Path
+
+import numpy as np
+import supervision as sv
+
+MODOS         = ('bytetrack', 'ultralytics', 'nenhum')
+MODOS_COM_ID  = ('bytetrack', 'ultralytics')   # os que geram tracker_id
+MODO_PADRAO   = 'bytetrack'
+TRACKER_CFG   = Path(__file__).resolve().parent.parent / 'custom_tracker.yaml'
+
+
+def _detections_vazias() -> sv.Detections:
+    return sv.Detections(
+        xyxy=np.zeros((0, 4), dtype=np.float32),
+        confidence=np.zeros(0, dtype=np.float32),
+        class_id=np.zeros(0, dtype=int),
+        tracker_id=np.zeros(0, dtype=int),
+    )
+
+
+def _extrapolar_xyxy(medias: np.ndarray, k: int, formato: str = 'xyah') -> np.ndarray:
+    """Estado do Kalman (x, y, a|w, h, vx, vy, va|vw, vh) avançado k frames → xyxy."""
+    m = medias[:, :4] + k * medias[:, 4:8]
+    h = m[:, 3]
+    w = m[:, 2] * h if formato == 'xyah' else m[:, 2]
+    return np.stack([m[:, 0] - w / 2, m[:, 1] - h / 2,
+                     m[:, 0] + w / 2, m[:, 1] + h / 2], axis=1).astype(np.float32)
+
+
+class RastreadorSupervision:
+    """sv.ByteTrack sobre as detecções do predict."""
+
+    modo = 'bytetrack'
+
+    def __init__(self, frame_rate: int = 30):
+        self._tracker = sv.ByteTrack(frame_rate=frame_rate)
+        self._classes = {}   # tracker_id → class_id (os tracks do supervision não guardam a classe)
+        self._passos  = 0
+
+    def atualizar(self, detections: sv.Detections, frame=None) -> sv.Detections:
+        detections = self._tracker.update_with_detections(detections)
+        self._passos = 0
+        if detections.class_id is not None:
+            self._classes = dict(zip(detections.tracker_id.tolist(), detections.class_id.tolist()))
+        return detections
+
+    def prever(self) -> sv.Detections:
+        self._passos += 1
+        tracks = [t for t in self._tracker.tracked_tracks
+                  if t.is_activated and t.external_track_id in self._classes]
+        if not tracks:
+            return _detections_vazias()
+        ids = np.array([t.external_track_id for t in tracks], dtype=int)
+        return sv.Detections(
+            xyxy=_extrapolar_xyxy(np.array([t.mean for t in tracks]), self._passos),
+            confidence=np.array([t.score for t in tracks], dtype=np.float32),
+            class_id=np.array([self._classes[i] for i in ids.tolist()], dtype=int),
+            tracker_id=ids,
+        )
+
+
+class RastreadorUltralytics:
+    """
+    Tracker do Ultralytics (ByteTrack/BoT-SORT) usado fora do model.track,
+    com os parâmetros de custom_tracker.yaml. Uma instância por câmera, então
+    duas câmeras não compartilham mais o mesmo estado persistido.
+    """
+
+    modo = 'ultralytics'
+
+    def __init__(self, tracker_cfg=TRACKER_CFG, frame_rate: int = 30):
+        from ultralytics.trackers.track import TRACKER_MAP
+        from ultralytics.utils import IterableSimpleNamespace, YAML
+
+        cfg = IterableSimpleNamespace(**YAML.load(str(tracker_cfg)))
+        if cfg.tracker_type not in TRACKER_MAP:
+            raise ValueError(f"tracker_type inválido em {tracker_cfg}: {cfg.tracker_type}")
+        self._tracker = TRACKER_MAP[cfg.tracker_type](args=cfg, frame_rate=frame_rate)
+        self._passos  = 0
+
+    def __getstate__(self):
+        # O contador de IDs do Ultralytics é global (BaseTrack._count): vai junto no checkpoint
+        from ultralytics.trackers.basetrack import BaseTrack
+        estado = self.__dict__.copy()
+        estado['_proximo_id'] = BaseTrack._count
+        return estado
+
+    def __setstate__(self, estado):
+        from ultralytics.trackers.basetrack import BaseTrack
+        proximo = estado.pop('_proximo_id', 0)
+        self.__dict__.update(estado)
+        BaseTrack._count = max(BaseTrack._count, proximo)
+
+    def atualizar(self, detections: sv.Detections, frame=None) -> sv.Detections:
+        from ultralytics.engine.results import Boxes
+
+        if len(detections) == 0:
+            dados = np.zeros((0, 6), dtype=np.float32)
+        else:
+            dados = np.hstack([
+                detections.xyxy,
+                detections.confidence.reshape(-1, 1),
+                detections.class_id.reshape(-1, 1),
+            ]).astype(np.float32)
+        shape  = frame.shape[:2] if frame is not None else (0, 0)
+        tracks = self._tracker.update(Boxes(dados, shape), frame)
+        self._passos = 0
+
+        # tracks: [x1, y1, x2, y2, track_id, score, cls, idx]
+        if len(tracks) == 0:
+            return _detections_vazias()
+        return sv.Detections(
+            xyxy=tracks[:, :4].astype(np.float32),
+            confidence=tracks[:, 5].astype(np.float32),
+            class_id=tracks[:, 6].astype(int),
+            tracker_id=tracks[:, 4].astype(int),
+        )
+
+
+    def prever(self) -> sv.Detections:
+        self._passos += 1
+        tracks = [t for t in self._tracker.tracked_stracks if t.is_activated]
+        if not tracks:
+            return _detections_vazias()
+        # BoT-SORT usa Kalman em xywh; ByteTrack em xyah
+        formato = 'xywh' if type(tracks[0].kalman_filter).__name__ == 'KalmanFilterXYWH' else 'xyah'
+        return sv.Detections(
+            xyxy=_extrapolar_xyxy(np.array([t.mean for t in tracks]), self._passos, formato),
+            confidence=np.array([t.score for t in tracks], dtype=np.float32),
+            class_id=np.array([t.cls for t in tracks], dtype=int),
+            tracker_id=np.array([t.track_id for t in tracks], dtype=int),
+        )
+
+
+class SemRastreador:
+    """Sem associação: devolve as detecções como vieram (tracker_id = None)."""
+
+    modo = 'nenhum'
+
+    def __init__(self):
+        self._ultimas = _detections_vazias()
+
+    def atualizar(self, detections: sv.Detections, frame=None) -> sv.Detections:
+        self._ultimas = detections
+        return detections
+
+    def prever(self) -> sv.Detections:
+        """Sem modelo de movimento: repete as últimas detecções."""
+        return self._ultimas
+
+
+def criar_rastreador(modo: str = MODO_PADRAO, frame_rate: int = 30,
+                     tracker_cfg=TRACKER_CFG):
+    """Cria o backend de rastreamento pedido (um por câmera)."""
+    if modo == 'bytetrack':
+        return RastreadorSupervision(frame_rate=frame_rate)
+    if modo == 'ultralytics':
+        return RastreadorUltralytics(tracker_cfg=tracker_cfg, frame_rate=frame_rate)
+    if modo == 'nenhum':
+        return SemRastreador()
+    raise ValueError(f"Modo de rastreamento desconhecido: {modo} (use {', '.join(MODOS)})")
+
+
+def detectar(model, frame, classes=(0,), **kwargs) -> sv.Detections:
+    """Uma passada de YOLO (predict, sem tracker interno) → sv.Detections."""
+    results = model.predict(frame, classes=list(classes), verbose=False, **kwargs)[0]
+    return sv.Detections.from_ultralytics(results)
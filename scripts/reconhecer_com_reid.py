@@ -7,15 +7,19 @@ import cv2
 import torch
 import torch.nn as nn
 import numpy as np
-from ultralytics import YOLO
 import supervision as sv
 from pathlib import Path
-import json
 import argparse
-from collections import Counter
-from torchvision import transforms, models
-from PIL import Image
-from scipy.spatial.distance import cosine
+from contextlib import nullcontext
+from torchvision import models
+
+import banco_embeddings
+from cache_reid import CacheTracks
+from controle_qualidade import ControladorQualidade, imgsz_controlavel, resolver_alvo
+from detector_backend import OPCOES_BACKEND, carregar_detector
+from galeria import Galeria
+from preprocessamento_reid import IMG_SIZE, preprocessar
+from rastreamento import MODOS_COM_ID, MODO_PADRAO, criar_rastreador, detectar
 
 # Configurações
 # Caminhos de vídeo passados via CLI (--cam1 / --cam2)
@@ -66,8 +70,8 @@ class ReconhecedorReID:
                 "Execute: python treinar_reid_model.py"
             )
         
-        embeddings_file = EMBEDDINGS_DIR / 'embeddings_database.json'
-        if not embeddings_file.exists():
+        embeddings_file = EMBEDDINGS_DIR / 'embeddings_database'   # .npy + manifest ou .json antigo
+        if not banco_embeddings.existe(embeddings_file):
             raise FileNotFoundError(
                 f"Embeddings não encontrados!\n"
                 "Execute: python treinar_reid_model.py (opção 2 ou 3)"
@@ -86,86 +90,85 @@ class ReconhecedorReID:
         
         # Carregar embeddings database
         print("📥 Carregando embeddings dos jogadores...")
-        with open(embeddings_file) as f:
-            embeddings_data = json.load(f)
+        nomes, matriz, manifest = banco_embeddings.carregar(embeddings_file)
+        if manifest.get('modelo_hash') and manifest['modelo_hash'] != banco_embeddings.hash_arquivo(MODEL_REID):
+            print(f"⚠️  Embeddings gerados com outro {MODEL_REID} — rode treinar_reid_model.py (opção 2)")
         
-        self.embeddings_db = {
-            nome: np.array(emb) 
-            for nome, emb in embeddings_data.items()
-        }
+        # Matriz (P, D) normalizada; um jogador pode ter vários protótipos (galeria.py)
+        self.galeria = Galeria.de_linhas(nomes, matriz)
         
-        print(f"✓ {len(self.embeddings_db)} jogadores na database\n")
+        print(f"✓ {len(self.galeria)} jogadores na database\n")
         
-        # Transformação para inferência
-        self.transform = transforms.Compose([
-            transforms.Resize((256, 128)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], 
-                               std=[0.229, 0.224, 0.225])
-        ])
+        # Buffer de entrada (L, 3, 256, 128) reaproveitado entre frames (preprocessamento_reid)
+        self._entrada = np.empty((1, 3, *IMG_SIZE), dtype=np.float32)
         
-        # Janela de votação por track_id (evita erro de classificação no 1º frame)
-        self.WINDOW_SIZE = 10
-        self.cache = {}  # track_id → list de (nome, confianca) dos últimos WINDOW_SIZE frames
+        # Janela de votação por track_id (evita erro de classificação no 1º frame);
+        # re-embeda só quando o track muda ou ainda está indeciso (cache_reid.py)
+        self.cache = CacheTracks(self.galeria.jogadores)
     
-    def extrair_embedding(self, crop_bgr):
-        """Extrai embedding de uma detecção"""
-        # Converter BGR -> RGB
-        crop_rgb = cv2.cvtColor(crop_bgr, cv2.COLOR_BGR2RGB)
-        img_pil = Image.fromarray(crop_rgb)
-        
-        # Transformar e processar
-        img_tensor = self.transform(img_pil).unsqueeze(0).to(device)
+    def extrair_embeddings(self, crops_bgr):
+        """Embeddings (N, D) de várias detecções numa única passada do modelo"""
+        n = len(crops_bgr)
+        if len(self._entrada) < n:
+            self._entrada = np.empty((n, 3, *IMG_SIZE), dtype=np.float32)
+        # Redimensionar, BGR -> RGB e normalizar direto no buffer
+        img_tensor = torch.from_numpy(preprocessar(crops_bgr, self._entrada)[:n]).to(device)
         
         with torch.no_grad():
-            _, embedding = self.model(img_tensor)
+            _, embeddings = self.model(img_tensor)
         
-        return embedding.cpu().numpy().flatten()
+        return embeddings.cpu().numpy()
     
-    def reconhecer(self, crop_bgr, track_id):
-        """Reconhece jogador usando janela de votação (evita erro no 1º frame)"""
-        # Extrair embedding e comparar com database
-        embedding_query = self.extrair_embedding(crop_bgr)
-        melhor_match = None
-        melhor_similaridade = 0
-
-        for nome, embedding_db in self.embeddings_db.items():
-            similaridade = 1 - cosine(embedding_query, embedding_db)
-            if similaridade > melhor_similaridade:
-                melhor_similaridade = similaridade
-                melhor_match = nome
+    def extrair_embedding(self, crop_bgr):
+        """Extrai embedding de uma detecção"""
+        return self.extrair_embeddings([crop_bgr])[0]
+    
+    def reconhecer_frame(self, crops_bgr, track_ids, forcar=True):
+        """
+        Reconhece as detecções de um frame usando a janela de votação de cada track
+        (evita erro no 1º frame). Só extrai embeddings dos crops que o cache pede,
+        todos num lote, e casa o lote com a galeria num único matmul.
+        forcar=False (fora da cadência do controle de qualidade) limita isso a
+        tracks ainda sem voto.
+        """
+        novos = [j for j, (crop, track_id) in enumerate(zip(crops_bgr, track_ids))
+                 if self.cache.precisa_embedding(track_id, crop)
+                 and (forcar or not self.cache.tem_votos(track_id))]
 
-        # Registrar resultado do frame atual na janela do track
-        nome_frame = melhor_match if melhor_similaridade >= SIMILARITY_THRESHOLD else None
-        conf_frame = melhor_similaridade if nome_frame else 0.0
+        if novos and len(self.galeria):
+            embeddings = self.extrair_embeddings([crops_bgr[j] for j in novos])
+            indices, scores = self.galeria.top_k(embeddings, k=1)
+            # Registrar resultado do frame atual na janela de cada track
+            for j, indice, score in zip(novos, indices[:, 0], scores[:, 0]):
+                indice = int(indice) if score >= SIMILARITY_THRESHOLD else -1
+                self.cache.registrar(track_ids[j], crops_bgr[j], indice, float(score))
 
-        if track_id not in self.cache:
-            self.cache[track_id] = []
-        self.cache[track_id].append((nome_frame, conf_frame))
-        if len(self.cache[track_id]) > self.WINDOW_SIZE:
-            self.cache[track_id].pop(0)
+        return [self.votacao(track_id) for track_id in track_ids]
 
-        # Votação por maioria dentro da janela
-        votos = [nome for nome, _ in self.cache[track_id] if nome is not None]
-        if not votos:
-            return {'nome': f'Desconhecido (ID {track_id})', 'confianca': 0}
+    def reconhecer(self, crop_bgr, track_id, forcar=True):
+        """Reconhece uma detecção (ver reconhecer_frame)"""
+        return self.reconhecer_frame([crop_bgr], [track_id], forcar)[0]
 
-        nome_vencedor = Counter(votos).most_common(1)[0][0]
-        confianca_media = float(np.mean(
-            [conf for nome, conf in self.cache[track_id] if nome == nome_vencedor]
-        ))
-        return {'nome': nome_vencedor, 'confianca': confianca_media}
+    def votacao(self, track_id):
+        """Resultado atual da janela do track, sem extrair um novo embedding"""
+        return self.cache.votacao(track_id)
 
 
-def processar_video(video_path, camera_name):
-    """Processa vídeo com reconhecimento ReID"""
+def processar_video(video_path, camera_name, modo_rastreador=MODO_PADRAO, detector=None, alvo=None,
+                    headless=False):
+    """
+    Processa vídeo com reconhecimento ReID.
+    headless: sem janela (nem anotação do frame) — executor do Flask / servidor sem DISPLAY.
+    alvo: taxa a sustentar (ver controle_qualidade.py) ajustando imgsz, stride e
+    frequência do ReID por track (entre recálculos vale a votação da janela).
+    """
     
     print(f"\n🎥 Processando: {camera_name}")
     print(f"   Vídeo: {Path(video_path).name}\n")
     
     # Inicializar
-    yolo_model = YOLO(MODEL_YOLO)
-    tracker = sv.ByteTrack()
+    yolo_model = carregar_detector(detector, MODEL_YOLO)
+    tracker = criar_rastreador(modo_rastreador)
     reconhecedor = ReconhecedorReID()
     
     # Anotadores
@@ -185,6 +188,14 @@ def processar_video(video_path, camera_name):
     
     cap = cv2.VideoCapture(video_path)
     frame_count = 0
+
+    alvo_fps = resolver_alvo(alvo, cap.get(cv2.CAP_PROP_FPS))
+    controle = None
+    if alvo_fps:
+        controle = ControladorQualidade(alvo_fps, imgsz=imgsz_controlavel(yolo_model),
+                                        reid_cada=1, nome=camera_name)
+        print(f"✓ Controle de qualidade: alvo {alvo_fps:.1f} fps\n")
+    medir = controle.medir if controle else (lambda etapa: nullcontext())
     
     while cap.isOpened():
         ret, frame = cap.read()
@@ -192,30 +203,39 @@ def processar_video(video_path, camera_name):
             break
         
         frame_count += 1
+        if controle is not None:
+            controle.frame()
+            if not controle.processar_frame(frame_count - 1):
+                continue
         
-        # Detecção e rastreamento
-        results = yolo_model.track(
-            frame,
-            persist=True,
-            classes=[0],  # Apenas pessoas
-            verbose=False
-        )[0]
+        # Detecção (predict) + um único rastreador
+        with medir('detector'):
+            extra = {'imgsz': controle.imgsz} if controle and controle.imgsz else {}
+            detections = detectar(yolo_model, frame, classes=[0], **extra)  # Apenas pessoas
+        detections = tracker.atualizar(detections, frame)
+        rodar_reid = controle is None or controle.rodar_reid(frame_count - 1)
+        reconhecedor.cache.novo_frame(frame_count)
         
-        detections = sv.Detections.from_ultralytics(results)
-        detections = tracker.update_with_detections(detections)
+        # Reconhecimento (crops do frame em lote; fora da cadência do ReID,
+        # tracks já vistos usam a votação atual)
+        indices, crops = [], []
+        for i in range(len(detections)):
+            x1, y1, x2, y2 = detections.xyxy[i].astype(int)
+            crop = frame[max(0, y1):y2, max(0, x1):x2]
+            if crop.size > 0:
+                indices.append(i)
+                crops.append(crop)
+        with medir('reid'):
+            resultados = reconhecedor.reconhecer_frame(
+                crops, [detections.tracker_id[i] for i in indices], forcar=rodar_reid)
+        resultados = dict(zip(indices, resultados))
         
-        # Reconhecimento
         labels = []
         for i in range(len(detections)):
             track_id = detections.tracker_id[i]
-            x1, y1, x2, y2 = detections.xyxy[i].astype(int)
+            resultado = resultados.get(i)
             
-            # Crop
-            crop = frame[max(0, y1):y2, max(0, x1):x2]
-            
-            if crop.size > 0:
-                # Reconhecer
-                resultado = reconhecedor.reconhecer(crop, track_id)
+            if resultado is not None:
                 nome = resultado['nome']
                 confianca = resultado['confianca']
                 
@@ -238,6 +258,9 @@ def processar_video(video_path, camera_name):
             else:
                 labels.append(f"ID {track_id}")
         
+        if headless:
+            continue
+        
         # Desenhar
         frame_anotado = box_annotator.annotate(frame.copy(), detections)
         frame_anotado = label_annotator.annotate(frame_anotado, detections, labels)
@@ -254,7 +277,11 @@ def processar_video(video_path, camera_name):
             break
     
     cap.release()
-    cv2.destroyAllWindows()
+    if not headless:
+        cv2.destroyAllWindows()
+    if controle is not None:
+        print(f"\n⚙️  Controle de qualidade: {controle.resumo()}")
+    print(f"🧠 ReID: {reconhecedor.cache.resumo()}")
     
     # Relatório
     print("\n" + "="*70)
@@ -276,6 +303,13 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Reconhecimento de jogadores com ReID')
     parser.add_argument('--cam1', metavar='VIDEO', help='Vídeo da Câmera 1')
     parser.add_argument('--cam2', metavar='VIDEO', help='Vídeo da Câmera 2')
+    parser.add_argument('--rastreador', default=MODO_PADRAO, choices=MODOS_COM_ID,
+                        help='Backend de rastreamento (padrão: bytetrack)')
+    parser.add_argument('--detector', default=None, choices=OPCOES_BACKEND,
+                        help='Backend do YOLO (padrão: DETECTOR_BACKEND ou pytorch)')
+    parser.add_argument('--alvo', default=None,
+                        help='Taxa a sustentar (tempo-real, 2x ou fps): ajusta imgsz, stride e frequência do ReID')
+    parser.add_argument('--headless', action='store_true', help='Sem janela do OpenCV')
     args = parser.parse_args()
 
     if not args.cam1 and not args.cam2:
@@ -287,9 +321,11 @@ if __name__ == '__main__':
 
     try:
         if args.cam1:
-            processar_video(args.cam1, "Câmera 1")
+            processar_video(args.cam1, "Câmera 1", args.rastreador, args.detector, args.alvo,
+                            args.headless)
         if args.cam2:
-            processar_video(args.cam2, "Câmera 2")
+            processar_video(args.cam2, "Câmera 2", args.rastreador, args.detector, args.alvo,
+                            args.headless)
     except FileNotFoundError as e:
         print(f"\n❌ Erro: {e}")
     except Exception as e:
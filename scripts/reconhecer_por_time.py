@@ -1,12 +1,15 @@
 import cv2
 import numpy as np
-from ultralytics import YOLO
 import supervision as sv
 import os
 import json
 from pathlib import Path
 from collections import defaultdict
 
+from detector_backend import OPCOES_BACKEND, carregar_detector
+from galeria import Galeria
+from rastreamento import MODOS_COM_ID, MODO_PADRAO, criar_rastreador, detectar
+
 # Configurações
 VIDEO_ESQ = "/home/nunes/Downloads/Jogo 03-02-2026 - Ataque do 🔵 (🔵 1 x 1 ⚫)2.mp4"
 VIDEO_DIR = "/home/nunes/Downloads/Jogo 03-02-2026 - Ataque do ⚫ (⚫ 1 x 1 🔵)2.mp4"
@@ -24,9 +27,9 @@ class JogadorRecognizerPorTime:
         self.times_file = times_file
         self.images_dir = Path(images_dir)
         
-        # Embeddings separados por time
-        self.embeddings_azul = {}
-        self.embeddings_preto = {}
+        # Galerias separadas por time: um protótipo por ID classificado (galeria.py)
+        self.galeria_azul = Galeria.de_dicionario({})
+        self.galeria_preto = Galeria.de_dicionario({})
         
         # Configuração dos times
         with open(times_file, 'r', encoding='utf-8') as f:
@@ -97,6 +100,33 @@ class JogadorRecognizerPorTime:
         
         return features
     
+    def _imagens_do_id(self, id_num):
+        """Cards de um ID: melhor crop (*_id_12.jpg) e demais do top-K (*_id_12_2.jpg, ...)"""
+        return [*self.images_dir.glob(f"*_id_{id_num}.jpg"), *self.images_dir.glob(f"*_id_{id_num}_*.jpg")]
+    
+    def _galeria_do_time(self, jogadores):
+        """nome → IDs classificados: cada ID vira um protótipo (média dos seus cards)"""
+        prototipos = {}
+        for nome, ids in jogadores.items():
+            por_id = []
+            n_refs = 0
+            for id_num in ids:
+                embeddings = []
+                for img_path in self._imagens_do_id(id_num):
+                    img = cv2.imread(str(img_path))
+                    if img is not None:
+                        features = self.extract_features(img)
+                        if features is not None:
+                            embeddings.append(features)
+                if embeddings:
+                    por_id.append(np.mean(embeddings, axis=0))
+                    n_refs += len(embeddings)
+            
+            if por_id:
+                prototipos[nome] = por_id
+                print(f"  ✓ {nome}: {n_refs} refs em {len(por_id)} protótipos")
+        return Galeria.de_dicionario(prototipos)
+    
     def load_references(self):
         """Carrega referências separadas por time"""
         print("\n🔍 Carregando referências por time...")
@@ -124,80 +154,63 @@ class JogadorRecognizerPorTime:
         
         # Processar time azul
         print(f"\n🔵 TIME AZUL:")
-        for nome, ids in jogadores_azul.items():
-            embeddings = []
-            for id_num in ids:
-                for img_path in self.images_dir.glob(f"*_id_{id_num}.jpg"):
-                    img = cv2.imread(str(img_path))
-                    if img is not None:
-                        features = self.extract_features(img)
-                        if features is not None:
-                            embeddings.append(features)
-            
-            if embeddings:
-                self.embeddings_azul[nome] = np.mean(embeddings, axis=0)
-                print(f"  ✓ {nome}: {len(embeddings)} refs")
+        self.galeria_azul = self._galeria_do_time(jogadores_azul)
         
         # Processar time preto
         print(f"\n⚫ TIME PRETO:")
-        for nome, ids in jogadores_preto.items():
-            embeddings = []
-            for id_num in ids:
-                for img_path in self.images_dir.glob(f"*_id_{id_num}.jpg"):
-                    img = cv2.imread(str(img_path))
-                    if img is not None:
-                        features = self.extract_features(img)
-                        if features is not None:
-                            embeddings.append(features)
-            
-            if embeddings:
-                self.embeddings_preto[nome] = np.mean(embeddings, axis=0)
-                print(f"  ✓ {nome}: {len(embeddings)} refs")
+        self.galeria_preto = self._galeria_do_time(jogadores_preto)
         
-        total = len(self.embeddings_azul) + len(self.embeddings_preto)
-        print(f"\n✓ Total: {total} jogadores ({len(self.embeddings_azul)} azul + {len(self.embeddings_preto)} preto)\n")
+        total = len(self.galeria_azul) + len(self.galeria_preto)
+        print(f"\n✓ Total: {total} jogadores ({len(self.galeria_azul)} azul + {len(self.galeria_preto)} preto)\n")
         
         return total > 0
     
-    def recognize(self, image):
-        """Reconhece jogador considerando o time"""
-        # Detectar time pela cor
-        team = self.detect_team_color(image)
-        
-        if team is None:
-            return None, 0.0, None
-        
-        # Escolher pool de jogadores do time correto
-        if team == 'azul':
-            embeddings = self.embeddings_azul
-        else:
-            embeddings = self.embeddings_preto
-        
-        if not embeddings:
-            return None, 0.0, team
-        
-        # Extrair features
-        features = self.extract_features(image)
-        if features is None:
-            return None, 0.0, team
-        
-        # Comparar apenas com jogadores do mesmo time
-        best_match = None
-        best_similarity = 0.0
-        
-        for nome, ref_embedding in embeddings.items():
-            similarity = np.dot(features, ref_embedding)
-            if similarity > best_similarity:
-                best_similarity = similarity
-                best_match = nome
-        
-        if best_similarity >= SIMILARITY_THRESHOLD:
-            return best_match, best_similarity, team
+    def recognize_batch(self, images):
+        """
+        Reconhece os crops de um frame considerando o time: features de todos,
+        depois um único matmul (N, D) @ (D, P) por galeria de time.
+        Retorna [(nome ou None, similaridade, time)] na ordem dos crops.
+        """
+        resultados = [(None, 0.0, None)] * len(images)
+        por_time = {'azul': ([], []), 'preto': ([], [])}   # time → (índices, features)
+        
+        for j, image in enumerate(images):
+            # Detectar time pela cor
+            team = self.detect_team_color(image)
+            if team is None:
+                continue
+            resultados[j] = (None, 0.0, team)
+            
+            # Escolher pool de jogadores do time correto
+            galeria = self.galeria_azul if team == 'azul' else self.galeria_preto
+            if not len(galeria):
+                continue
+            
+            # Extrair features
+            features = self.extract_features(image)
+            if features is not None:
+                por_time[team][0].append(j)
+                por_time[team][1].append(features)
+        
+        # Comparar apenas com jogadores do mesmo time (cosseno contra todos os protótipos)
+        for team, (indices, features) in por_time.items():
+            if not indices:
+                continue
+            galeria = self.galeria_azul if team == 'azul' else self.galeria_preto
+            for j, [(best_match, best_similarity)] in zip(indices, galeria.buscar(np.stack(features), k=1)):
+                if best_similarity >= SIMILARITY_THRESHOLD:
+                    resultados[j] = (best_match, best_similarity, team)
+                else:
+                    resultados[j] = (None, best_similarity, team)
         
-        return None, best_similarity, team
+        return resultados
+    
+    def recognize(self, image):
+        """Reconhece jogador considerando o time (ver recognize_batch)"""
+        return self.recognize_batch([image])[0]
 
 
-def process_videos():
+def process_videos(modo_rastreador=MODO_PADRAO, detector=None):
     """Processa vídeos com reconhecimento por time"""
     
     # Verificar arquivos
@@ -217,7 +230,7 @@ def process_videos():
         return
     
     print(f"Carregando modelo {MODEL_PATH}...")
-    model = YOLO(MODEL_PATH)
+    model = carregar_detector(detector, MODEL_PATH)
     
     label_annotator = sv.LabelAnnotator(
         text_position=sv.Position.TOP_CENTER,
@@ -236,7 +249,7 @@ def process_videos():
         print(f"⚽ Processando: {camera_name}")
         print(f"{'='*70}\n")
         
-        tracker = sv.ByteTrack()
+        tracker = criar_rastreador(modo_rastreador)
         cap = cv2.VideoCapture(video_path)
         frame_count = 0
         
@@ -249,19 +262,21 @@ def process_videos():
             
             frame_count += 1
             
-            results = model.track(
-                frame,
-                persist=True,
-                classes=[0],
-                verbose=False
-            )[0]
-            
-            detections = sv.Detections.from_ultralytics(results)
-            detections = tracker.update_with_detections(detections)
+            detections = detectar(model, frame, classes=[0])
+            detections = tracker.atualizar(detections, frame)
             
             labels = []
             colors = []
             
+            # Tracks ainda não reconhecidos: crops do frame casados em lote
+            pendentes = [i for i in range(len(detections))
+                         if detections.tracker_id[i] not in recognized_players]
+            crops = []
+            for i in pendentes:
+                x1, y1, x2, y2 = detections.xyxy[i].astype(int)
+                crops.append(frame[max(0, y1):y2, max(0, x1):x2])
+            resultados = dict(zip(pendentes, recognizer.recognize_batch(crops)))
+            
             for i in range(len(detections)):
                 track_id = detections.tracker_id[i]
                 
@@ -270,10 +285,7 @@ def process_videos():
                     emoji = "🔵" if team == 'azul' else "⚫"
                     labels.append(f"{emoji} {nome} ({conf:.0%})")
                 else:
-                    x1, y1, x2, y2 = detections.xyxy[i].astype(int)
-                    crop = frame[max(0, y1):y2, max(0, x1):x2]
-                    
-                    nome, similarity, team = recognizer.recognize(crop)
+                    nome, similarity, team = resultados[i]
                     
                     if nome:
                         recognized_players[track_id] = (nome, team, similarity)
@@ -328,12 +340,21 @@ def process_videos():
 
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Reconhecimento automático por times')
+    parser.add_argument('--rastreador', default=MODO_PADRAO, choices=MODOS_COM_ID,
+                        help='Backend de rastreamento (padrão: bytetrack)')
+    parser.add_argument('--detector', default=None, choices=OPCOES_BACKEND,
+                        help='Backend do YOLO (padrão: DETECTOR_BACKEND ou pytorch)')
+    args, _ = parser.parse_known_args()
+
     print("\n" + "="*70)
     print("🔵⚫ RECONHECIMENTO AUTOMÁTICO POR TIMES")
     print("="*70)
     print(f"✓ Modelo: {MODEL_PATH}")
     print(f"✓ Limiar: {SIMILARITY_THRESHOLD*100:.0f}%")
     print(f"✓ Separação por cor de colete")
+    print(f"✓ Rastreador: {args.rastreador}")
     print("="*70)
     
-    process_videos()
+    process_videos(args.rastreador, args.detector)
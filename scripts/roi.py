@@ -0,0 +1,92 @@
+"""
+ROI (Região de Interesse) por câmera.
+
+Em vez de rodar o YOLO no frame inteiro e descartar depois as detecções da
+arquibancada/banco, a inferência roda só no retângulo que envolve o polígono
+do ROI (o Ultralytics faz o letterbox do recorte para o imgsz). As caixas
+voltam para coordenadas do frame e o filtro pelo polígono é uma consulta numa
+máscara booleana pré-calculada, vetorizada sobre todas as detecções.
+
+Arquivo de configuração (JSON), um polígono por câmera em pixels do frame:
+
+    {
+        "ESQ": [[100, 100], [1800, 100], [1800, 900], [100, 900]],
+        "DIR": [[80, 150], [1850, 150], [1850, 950], [80, 950]]
+    }
+"""
+
+import json
+from pathlib import Path
+
+import cv2
+import numpy as np
+import supervision as sv
+
+
+class ROICamera:
+    """Polígono de ROI de uma câmera, com máscara e retângulo de recorte."""
+
+    def __init__(self, pontos):
+        self.pontos = np.asarray(pontos, dtype=np.int32).reshape(-1, 2)
+        if len(self.pontos) < 3:
+            raise ValueError("O ROI precisa de pelo menos 3 pontos")
+        self._shape    = None
+        self._mascara  = None
+        self._retangulo = None
+
+    def _preparar(self, shape):
+        """Máscara e retângulo calculados uma vez por resolução de frame."""
+        if self._shape == shape[:2]:
+            return
+        h, w = shape[:2]
+        mascara = np.zeros((h, w), dtype=np.uint8)
+        cv2.fillPoly(mascara, [self.pontos], 1)
+        self._mascara = mascara.astype(bool)
+
+        x, y, rw, rh = cv2.boundingRect(self.pontos)
+        x1, y1 = max(0, x), max(0, y)
+        x2, y2 = min(w, x + rw), min(h, y + rh)
+        if x2 <= x1 or y2 <= y1:
+            raise ValueError(f"ROI fora do frame ({w}x{h})")
+        self._retangulo = (x1, y1, x2, y2)
+        self._shape = shape[:2]
+
+    def recortar(self, frame):
+        """Recorte (view, sem cópia) do retângulo do ROI — é isso que vai para o YOLO."""
+        self._preparar(frame.shape)
+        x1, y1, x2, y2 = self._retangulo
+        return frame[y1:y2, x1:x2]
+
+    def retangulo(self, shape):
+        """(x1, y1, x2, y2) do recorte para frames desse tamanho."""
+        self._preparar(shape)
+        return self._retangulo
+
+    def mapear(self, detections: sv.Detections) -> sv.Detections:
+        """Caixas do recorte → coordenadas do frame."""
+        if len(detections) == 0 or self._retangulo is None:
+            return detections
+        x1, y1, _, _ = self._retangulo
+        detections.xyxy = detections.xyxy + np.array([x1, y1, x1, y1], dtype=detections.xyxy.dtype)
+        return detections
+
+    def filtrar(self, detections: sv.Detections) -> sv.Detections:
+        """Mantém as detecções cujo centro cai dentro do polígono (consulta na máscara)."""
+        if len(detections) == 0 or self._mascara is None:
+            return detections
+        h, w = self._mascara.shape
+        centros = (detections.xyxy[:, :2] + detections.xyxy[:, 2:]) / 2
+        cx = np.clip(centros[:, 0].astype(int), 0, w - 1)
+        cy = np.clip(centros[:, 1].astype(int), 0, h - 1)
+        return detections[self._mascara[cy, cx]]
+
+    def desenhar(self, frame, cor=(0, 255, 0), espessura=3):
+        cv2.polylines(frame, [self.pontos], True, cor, espessura)
+        return frame
+
+
+def carregar_rois(caminho) -> dict:
+    """Lê o JSON de ROIs → {camera: ROICamera}. Câmeras ausentes ficam sem ROI."""
+    with open(Path(caminho), 'r', encoding='utf-8') as f:
+        dados = json.load(f)
+    return {camera: ROICamera(pontos) for camera, pontos in dados.items() if pontos}
@@ -1,14 +1,23 @@
 import cv2
 import numpy as np
-from ultralytics import YOLO
-import supervision as sv
 import os
 import signal
 import sys
-import subprocess
-import json
+import time
 from pathlib import Path
 
+from controle_qualidade import ControladorQualidade, imgsz_controlavel, resolver_alvo
+from deteccao_fundo import carregar_faixa
+from detector_backend import carregar_detector
+from checkpoint_captura import caminho_padrao, carregar_checkpoint, remover_checkpoint, salvar_checkpoint
+from captura_video import CapturaAoVivo, abrir_fonte, e_stream, liberar_frame
+from gate_movimento import GateMovimento
+from gravador_crops import GravadorCrops
+from opcoes_captura import criar_parser
+from pipeline_camera import FiltroRosto, PipelineCamera, detectar_lote
+from roi import carregar_rois
+from rastreamento import criar_rastreador
+
 # Flag global para controlar interrupção
 STOP_FLAG = False
 STOP_FLAG_FILE = Path(".stop_script")
@@ -50,15 +59,7 @@ HEADLESS_MODE = (
 )
 
 # Suporte a vídeos customizados via argumentos de linha de comando
-import argparse as _argparse
-_parser = _argparse.ArgumentParser(add_help=False)
-_parser.add_argument('--video-esq',   default=None, help='Caminho ou URL do vídeo câmera ESQ')
-_parser.add_argument('--video-dir',   default=None, help='Caminho ou URL do vídeo câmera DIR')
-_parser.add_argument('--model',       default=None, help='Modelo YOLO (ex: yolo11n.pt)')
-_parser.add_argument('--confidence',  type=float, default=None, help='Confiança mínima 0-1')
-_parser.add_argument('--output-dir',  default=None, help='Pasta de saída das imagens')
-_parser.add_argument('--headless', action='store_true')
-_args, _ = _parser.parse_known_args()
+_args, _ = criar_parser().parse_known_args()
 
 if _args.video_esq:
     VIDEO_ESQ = _args.video_esq
@@ -70,6 +71,44 @@ if _args.confidence is not None:
     CONFIDENCE_THRESHOLD = _args.confidence
 if _args.output_dir:
     OUTPUT_DIR = _args.output_dir
+if _args.rostos:
+    USE_FACE_DETECTION = True
+
+# Modo batch: ESQ + DIR (e N frames consecutivos de cada) numa só chamada YOLO
+BATCH_FRAMES = max(0, _args.batch)
+
+# Leitura antecipada: uma thread de decode por câmera
+PREFETCH_FRAMES = max(0, _args.prefetch)
+
+# Um único backend de associação por câmera (ver rastreamento.py)
+TRACKER_MODE = _args.rastreador
+
+# Anotação sob demanda: só desenha se há janela, vídeo de saída ou preview
+OUTPUT_VIDEO     = _args.output_video
+PREVIEW_PATH     = _args.preview
+PREVIEW_INTERVAL = 1.0 / _args.preview_fps if _args.preview_fps > 0 else 0.0
+
+# Streams: resolução/fps reduzidos no ffmpeg; anel cobre fila de prefetch + lote em uso
+STREAM_WIDTH = _args.stream_width
+STREAM_FPS   = _args.stream_fps
+STREAM_BUFFERS = PREFETCH_FRAMES + max(1, BATCH_FRAMES) + 2
+
+# Ao vivo: latência limitada em vez de fila — fica no máximo LIVE_BUFFER frames atrás
+LIVE_MODE   = _args.live
+LIVE_BUFFER = max(1, _args.live_buffer)
+
+# Gate de movimento: frames sem detector usam a predição do tracker
+GATE_MODE   = _args.gate
+GATE_STRIDE = max(1, _args.gate_stride)
+GATE_LIMIAR = _args.gate_limiar
+
+# Cards: melhores K crops de cada track (ver melhores_crops.py)
+TOP_K = max(1, _args.top_k)
+
+# Checkpoints: retomar execuções interrompidas (.stop_script, SIGTERM, timeout)
+RESUME           = _args.resume
+CHECKPOINT_PATH  = _args.checkpoint or caminho_padrao(OUTPUT_DIR)
+CHECKPOINT_EVERY = max(0, _args.checkpoint_every)
 
 # Se apenas um vídeo foi informado, usa o mesmo para os dois lados
 if VIDEO_ESQ and not VIDEO_DIR:
@@ -82,240 +121,141 @@ elif not VIDEO_ESQ and not VIDEO_DIR:
     print("❌ Erro: nenhum vídeo fornecido. Use --video-esq e/ou --video-dir")
     sys.exit(1)
 
+# Modo multiprocesso: uma câmera por processo ou vídeo fatiado no tempo (--fatias)
+# (ver captura_multiprocesso.py e processamento_paralelo.py).
+# O processo é substituído (exec, mesmo PID — o executor continua podendo pará-lo)
+# porque o spawn dos workers reimporta o __main__, e este script roda no import.
+if _args.workers or _args.fatias > 1:
+    sys.stdout.flush()
+    _entrada = str(Path(__file__).resolve().with_name('captura_multiprocesso.py'))
+    _resolvidos = ['--video-esq', VIDEO_ESQ, '--video-dir', VIDEO_DIR, '--model', MODEL_PATH,
+                   '--confidence', str(CONFIDENCE_THRESHOLD), '--output-dir', OUTPUT_DIR]
+    if USE_FACE_DETECTION:
+        _resolvidos.append('--rostos')
+    os.execv(sys.executable, [sys.executable, _entrada] + sys.argv[1:] + _resolvidos)
+
 print(f"\n{'='*60}")
 print(f"🎬 Iniciando captura de imagens")
 print(f"{'='*60}")
 print(f"Modo: {'🖥️  Headless (sem janela)' if HEADLESS_MODE else '🪟 Com janela'}")
 print(f"Vídeo ESQ: {VIDEO_ESQ}")
 print(f"Vídeo DIR: {VIDEO_DIR}")
+print(f"Rastreador: {TRACKER_MODE}")
+if BATCH_FRAMES:
+    print(f"Batch: {BATCH_FRAMES} frame(s) por câmera ({2 * BATCH_FRAMES} imagens por inferência)")
 print(f"{'='*60}\n")
 
-# ROI (Região de Interesse) - Descomente e ajuste os pontos para limitar ao campo
-# Formato: lista de pontos [x, y] formando um polígono
-# USE_ROI = True
-# ROI_POINTS = np.array([[100, 100], [1800, 100], [1800, 900], [100, 900]], np.int32)
-USE_ROI = False
-ROI_POINTS = None
+# ROI (Região de Interesse) por câmera - polígonos num JSON passado em --roi
+# Formato: {"ESQ": [[100, 100], [1800, 100], [1800, 900], [100, 900]], "DIR": [...]}
+# O YOLO roda só no retângulo do ROI; fora do polígono as detecções são descartadas
+ROI_FILE = _args.roi
+ROIS = carregar_rois(ROI_FILE) if ROI_FILE else {}
+
+# Faixa do fundo do campo (--fundo 0,0.45): além do frame inteiro em 640, tiles
+# em resolução nativa só nessa faixa, onde os jogadores são pequenos demais
+FUNDO = carregar_faixa(_args.fundo, _args.fundo_tile)
+if FUNDO:
+    print(f"✓ Faixa do fundo: {FUNDO.y_inicio:.0%}-{FUNDO.y_fim:.0%} da altura em tiles de {FUNDO.tamanho}px")
+if ROIS:
+    print(f"ROI: {', '.join(sorted(ROIS))} ({ROI_FILE})\n")
 
 # Criar pasta para os cards dos jogadores
 if not os.path.exists(OUTPUT_DIR):
     os.makedirs(OUTPUT_DIR)
 
+# Gravação dos cards em background; o índice dos já salvos vem de um único scan
+gravador = GravadorCrops(OUTPUT_DIR)
+print(f"Cards já existentes em {OUTPUT_DIR}/: {gravador.n_existentes}")
+
 # Inicializar Modelo e Rastreadores
 print(f"Carregando modelo {MODEL_PATH}...")
-model = YOLO(MODEL_PATH)
-tracker_esq = sv.ByteTrack()
-tracker_dir = sv.ByteTrack()
-
-# Carregar detector de rostos (Haar Cascade)
+model = carregar_detector(_args.detector, MODEL_PATH)
+tracker_esq = criar_rastreador(TRACKER_MODE)
+tracker_dir = criar_rastreador(TRACKER_MODE)
+
+# Retomada: rastreadores (IDs continuam de onde pararam), cards salvos e frame inicial
+FONTES = {"ESQ": VIDEO_ESQ, "DIR": VIDEO_DIR}
+frame_inicial = 0
+if RESUME:
+    checkpoint = carregar_checkpoint(CHECKPOINT_PATH, FONTES)
+    if checkpoint is None:
+        print(f"⚠️  Nenhum checkpoint válido em {CHECKPOINT_PATH} — começando do início")
+    else:
+        tracker_esq = checkpoint['rastreadores']['ESQ']
+        tracker_dir = checkpoint['rastreadores']['DIR']
+        gravador.incluir_salvos(checkpoint['salvos'])
+        frame_inicial = checkpoint['frames']['ESQ']
+        if tracker_esq.modo != TRACKER_MODE:
+            print(f"⚠️  Checkpoint usa o rastreador '{tracker_esq.modo}' — mantido para preservar os IDs")
+        print(f"↻ Retomando do frame {frame_inicial} (checkpoint de {checkpoint['data']})")
+
+# Detector de rostos (Haar Cascade), compartilhado pelas duas câmeras
+filtro_rosto = FiltroRosto(USE_FACE_DETECTION)
 if USE_FACE_DETECTION:
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
     print("✓ Detector de rostos carregado")
 
-# Inicializar Anotadores com posição otimizada
-label_annotator = sv.LabelAnnotator(
-    text_position=sv.Position.TOP_CENTER,  # ID acima da caixa
-    text_scale=0.5,
-    text_thickness=1
-)
-box_annotator = sv.BoxAnnotator(thickness=2)
-
-def has_face(image):
-    """Verifica se há pelo menos um rosto na imagem"""
-    if not USE_FACE_DETECTION:
-        return True  # Se não estiver usando detecção, sempre retorna True
-    
-    if image is None or image.size == 0:
-        return False
-    
-    # Converte para escala de cinza
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    
-    # Detecta rostos
-    faces = face_cascade.detectMultiScale(
-        gray,
-        scaleFactor=1.1,
-        minNeighbors=3,
-        minSize=(20, 20)
-    )
-    
-    return len(faces) > 0
-
-def apply_roi_mask(detections, roi_points):
-    """Filtra detecções que estão fora da região de interesse"""
-    if roi_points is None:
-        return detections
-    
-    valid_indices = []
-    for i in range(len(detections)):
-        x1, y1, x2, y2 = detections.xyxy[i]
-        # Centro da caixa delimitadora
-        center_x = (x1 + x2) / 2
-        center_y = (y1 + y2) / 2
-        
-        # Verifica se o centro está dentro do polígono
-        if cv2.pointPolygonTest(roi_points, (center_x, center_y), False) >= 0:
-            valid_indices.append(i)
-    
-    # Filtra as detecções
-    if len(valid_indices) > 0:
-        detections = detections[valid_indices]
-    else:
-        # Retorna detecções vazias se nada estiver no ROI
-        detections = sv.Detections.empty()
-    
-    return detections
-
-def process_frame(frame, tracker, camera_name):
-    # Detecção simples e rápida
-    results = model.track(
-        frame, 
-        persist=True, 
-        classes=[0, 32],  # Pessoas e bola
-        verbose=False
-    )[0]
-    
-    detections = sv.Detections.from_ultralytics(results)
-    
-    # Aplicar ROI se configurado
-    if USE_ROI and ROI_POINTS is not None:
-        detections = apply_roi_mask(detections, ROI_POINTS)
-    
-    detections = tracker.update_with_detections(detections)
-
-    # Lógica para salvar fotos dos jogadores (Cards) com filtro de confiança e rosto
-    for i in range(len(detections)):
-        if detections.class_id[i] == 0:  # Se for pessoa
-            confidence = detections.confidence[i]
-            
-            # FILTRO DE CONFIANÇA: Só salva se tiver certeza >= threshold
-            if confidence > CONFIDENCE_THRESHOLD:
-                track_id = detections.tracker_id[i]
-                save_path = f"{OUTPUT_DIR}/{camera_name}_id_{track_id}.jpg"
-                
-                # Se a foto ainda não existe, tenta salvar o crop
-                if not os.path.exists(save_path):
-                    x1, y1, x2, y2 = detections.xyxy[i].astype(int)
-                    crop = frame[max(0, y1):y2, max(0, x1):x2]
-                    
-                    # Verifica se o crop tem conteúdo E se há rosto
-                    if crop.size > 0 and has_face(crop):
-                        cv2.imwrite(save_path, crop)
-                        print(f"✓ Rosto detectado - Salvando: {save_path}")
-
-    # Desenha na tela com confiança
-    labels = [
-        f"ID: {track_id} ({conf:.0%})" 
-        for track_id, conf in zip(detections.tracker_id, detections.confidence)
-    ]
-    
-    annotated_frame = box_annotator.annotate(scene=frame.copy(), detections=detections)
-    annotated_frame = label_annotator.annotate(scene=annotated_frame, detections=detections, labels=labels)
-    
-    # Desenhar ROI se ativo
-    if USE_ROI and ROI_POINTS is not None:
-        cv2.polylines(annotated_frame, [ROI_POINTS], True, (0, 255, 0), 3)
-    
-    return annotated_frame
+# Uma pipeline por câmera: rastreador, ROI, gate de movimento e gravação dos cards
+# (os TOP_K crops mais nítidos de cada track, gravados quando o track termina)
+pipe_esq = PipelineCamera("ESQ", model, tracker_esq, gravador, CONFIDENCE_THRESHOLD,
+                          roi=ROIS.get("ESQ"), filtro_rosto=filtro_rosto, top_k=TOP_K, fundo=FUNDO,
+                          gate=GateMovimento(GATE_STRIDE, GATE_LIMIAR) if GATE_MODE else None)
+pipe_dir = PipelineCamera("DIR", model, tracker_dir, gravador, CONFIDENCE_THRESHOLD,
+                          roi=ROIS.get("DIR"), filtro_rosto=filtro_rosto, top_k=TOP_K, fundo=FUNDO,
+                          gate=GateMovimento(GATE_STRIDE, GATE_LIMIAR) if GATE_MODE else None)
+
+def salvar_preview(imagem):
+    """Grava o preview de forma atômica (o Flask nunca lê um JPEG pela metade)."""
+    tmp_path = f"{PREVIEW_PATH}.tmp.jpg"
+    if cv2.imwrite(tmp_path, imagem, [cv2.IMWRITE_JPEG_QUALITY, 70]):
+        os.replace(tmp_path, PREVIEW_PATH)
 
 # Loop Principal
-class StreamCapture:
-    """
-    Imita cv2.VideoCapture mas obtém frames via pipe:
-      yt-dlp (download) | ffmpeg (decode) -> frames bgr24
-    Usado quando a fonte é uma URL de stream (YouTube, etc.)
-    """
-    def __init__(self, url):
-        self._url    = url
-        self._opened = False
-        self._procs  = []
-        self._w = self._h = 0
-
-        # Obtém dimensões via yt-dlp --dump-json
-        try:
-            info_r = subprocess.run(
-                [sys.executable, '-m', 'yt_dlp',
-                 '--extractor-args', 'youtube:player_client=android',
-                 '--dump-json', '--no-download', '--quiet', '--no-warnings',
-                 '--no-playlist', url],
-                capture_output=True, text=True, timeout=25
-            )
-            if info_r.returncode == 0 and info_r.stdout.strip():
-                info = json.loads(info_r.stdout.splitlines()[0])
-                self._w = info.get('width',  640) or 640
-                self._h = info.get('height', 360) or 360
-        except Exception:
-            pass
-
-        if not self._w:
-            self._w, self._h = 640, 360  # fallback 360p
-
-        # yt-dlp: baixa stream direto para stdout via cliente android (sem SABR)
-        yt_proc = subprocess.Popen(
-            [sys.executable, '-m', 'yt_dlp',
-             '--extractor-args', 'youtube:player_client=android',
-             '-f', '18/best[height<=480]/best',
-             '--no-playlist', '--quiet', '--no-warnings',
-             '-o', '-', url],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.DEVNULL
-        )
-        # ffmpeg: decodifica e emite frames BGR24 brutos para stdout
-        ff_proc = subprocess.Popen(
-            ['ffmpeg', '-i', 'pipe:0',
-             '-f', 'rawvideo', '-pix_fmt', 'bgr24',
-             '-vf', f'scale={self._w}:{self._h}',
-             'pipe:1', '-loglevel', 'quiet'],
-            stdin=yt_proc.stdout,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.DEVNULL
-        )
-        yt_proc.stdout.close()  # permite SIGPIPE se ffmpeg morrer
-        self._procs  = [yt_proc, ff_proc]
-        self._ff     = ff_proc
-        self._bytes_per_frame = self._w * self._h * 3
-        self._opened = True
-        print(f"\n📺 Stream pipe iniciado ({self._w}x{self._h}) — yt-dlp → ffmpeg → OpenCV")
-
-    def isOpened(self):
-        return self._opened and self._ff.poll() is None
-
-    def read(self):
-        if not self.isOpened():
-            return False, None
-        raw = self._ff.stdout.read(self._bytes_per_frame)
-        if len(raw) < self._bytes_per_frame:
-            self._opened = False
-            return False, None
-        frame = np.frombuffer(raw, dtype=np.uint8).reshape((self._h, self._w, 3))
-        return True, frame.copy()
-
-    def get(self, prop_id):
-        """Streams não têm frame count."""
-        return 0
-
-    def release(self):
-        self._opened = False
-        for p in self._procs:
-            try:
-                p.terminate()
-            except Exception:
-                pass
-
-
-def _open_video(path_or_url):
-    """Abre arquivo local ou stream YouTube via pipe."""
-    if path_or_url.startswith('http://') or path_or_url.startswith('https://'):
-        return StreamCapture(path_or_url)
-    return cv2.VideoCapture(path_or_url)
-
-cap_e = _open_video(VIDEO_ESQ)
-cap_d = _open_video(VIDEO_DIR)
+def _open_video(path_or_url, inicio=0):
+    """Abre arquivo local ou stream YouTube via pipe (com decode antecipado em thread)."""
+    return abrir_fonte(path_or_url, inicio, prefetch=PREFETCH_FRAMES,
+                       largura=STREAM_WIDTH, fps=STREAM_FPS, n_buffers=STREAM_BUFFERS,
+                       ao_vivo=LIVE_MODE, buffer_ao_vivo=LIVE_BUFFER, parar=lambda: STOP_FLAG)
+
+def _status_ao_vivo():
+    """Descartes e latência por câmera no modo ao vivo ('' fora dele)."""
+    partes = []
+    for nome, cap in (("ESQ", cap_e), ("DIR", cap_d)):
+        if isinstance(cap, CapturaAoVivo):
+            st = cap.estatisticas()
+            partes.append(f"{nome}: {st['descartados']} descartados, "
+                          f"latência {st['latencia_ms']:.0f} ms")
+    return (" | " + " | ".join(partes)) if partes else ""
+
+def _salvar_checkpoint():
+    salvar_checkpoint(CHECKPOINT_PATH, {
+        'fontes':       FONTES,
+        'frames':       {"ESQ": frames_concluidos, "DIR": frames_concluidos},
+        'rastreadores': {"ESQ": pipe_esq.rastreador, "DIR": pipe_dir.rastreador},
+        'salvos':       gravador.nomes_gravados(),
+    })
+
+if frame_inicial and any(e_stream(v) for v in FONTES.values()):
+    print("⚠️  Streams não permitem seek: a retomada mantém IDs e cards, mas segue do ponto atual")
+
+cap_e = _open_video(VIDEO_ESQ, frame_inicial)
+cap_d = _open_video(VIDEO_DIR, frame_inicial)
+
+# Controle de qualidade (--alvo): imgsz e stride ajustados para sustentar a taxa
+# (um controlador para as duas câmeras — mesmo modelo, mesmo processo)
+ALVO_FPS = resolver_alvo(_args.alvo, cap_e.get(cv2.CAP_PROP_FPS))
+CONTROLE = None
+if ALVO_FPS:
+    CONTROLE = ControladorQualidade(ALVO_FPS, imgsz=imgsz_controlavel(model), nome="captura")
+    pipe_esq.controle = pipe_dir.controle = CONTROLE
+    print(f"✓ Controle de qualidade: alvo {ALVO_FPS:.1f} fps")
 
 # Contadores
 total_detections = 0
 saved_with_face = 0
-frame_count = 0
+frame_count = frame_inicial
+frames_concluidos = frame_inicial     # pares totalmente processados (vai para o checkpoint)
+ultimo_checkpoint = frame_inicial
+interrompido = False
 total_frames = max(
     int(cap_e.get(cv2.CAP_PROP_FRAME_COUNT)),
     int(cap_d.get(cv2.CAP_PROP_FRAME_COUNT))
@@ -323,6 +263,15 @@ total_frames = max(
 # Streams de rede retornam 0 — usa modo sem total definido
 IS_STREAM = (total_frames == 0)
 
+# Vídeo de saída anotado (ESQ | DIR, 1280x360)
+video_writer = None
+if OUTPUT_VIDEO:
+    fps_saida = cap_e.get(cv2.CAP_PROP_FPS) or 25
+    video_writer = cv2.VideoWriter(OUTPUT_VIDEO, cv2.VideoWriter_fourcc(*'mp4v'),
+                                   fps_saida, (1280, 360))
+    print(f"✓ Gravando vídeo anotado em {OUTPUT_VIDEO}")
+ultimo_preview = 0.0
+
 print("\nIniciando processamento...")
 if HEADLESS_MODE:
     print("✓ Modo sem janela (headless) - execute 'touch .stop_script' para parar")
@@ -337,56 +286,154 @@ else:
 print(f"\u2713 Total de frames: {total_frames if not IS_STREAM else '(stream — sem total definido)'}\n")
 
 while cap_e.isOpened() and cap_d.isOpened() and not STOP_FLAG:
-    ret_e, frame_e = cap_e.read()
-    ret_d, frame_d = cap_d.read()
-    
-    if not ret_e or not ret_d:
+    # Lê N pares consecutivos (1 par fora do modo batch)
+    pares = []
+    for _ in range(max(1, BATCH_FRAMES)):
+        ret_e, frame_e = cap_e.read()
+        ret_d, frame_d = cap_d.read()
+        if not ret_e or not ret_d:
+            break
+        pares.append((frame_e, frame_d))
+
+    fim_video = len(pares) < max(1, BATCH_FRAMES)
+    if not pares:
         print("\n✓ Fim do vídeo alcançado")
         break
-    
-    frame_count += 1
-    
-    # Verifica flag de parada a cada 30 frames (~1 segundo)
-    if frame_count % 30 == 0:
-        check_stop_flag()
-        if STOP_FLAG:
-            print(f"\n\u26a0\ufe0f  Processamento interrompido no frame {frame_count}" +
-                  (f"/{total_frames}" if not IS_STREAM else ""))
-            break
-        # Mostra progresso
-        if IS_STREAM:
-            print(f"\rFrames: {frame_count}", end='', flush=True)
+
+    # Gate de movimento: quais frames de cada câmera passam pelo YOLO
+    # (com ROI, só o movimento dentro do retângulo do ROI conta)
+    # (controle de qualidade: frames fora do stride também seguem pela predição do Kalman)
+    no_stride = [CONTROLE is None or CONTROLE.processar_frame(frame_count + i) for i in range(len(pares))]
+    rodar_e = [ok and pipe_esq.precisa_detectar(e) for (e, _), ok in zip(pares, no_stride)]
+    rodar_d = [ok and pipe_dir.precisa_detectar(d) for (_, d), ok in zip(pares, no_stride)]
+
+    # Batch: [ESQ_1..ESQ_N, DIR_1..DIR_N] numa inferência, depois separa por câmera
+    if BATCH_FRAMES:
+        lote_e = [e for (e, _), r in zip(pares, rodar_e) if r]
+        lote_d = [d for (_, d), r in zip(pares, rodar_d) if r]
+        rois = [pipe_esq.roi] * len(lote_e) + [pipe_dir.roi] * len(lote_d)
+        if CONTROLE is None:
+            dets = iter(detectar_lote(model, lote_e + lote_d, rois, FUNDO) if rois else [])
         else:
-            progress = (frame_count / total_frames) * 100
-            print(f"\rProgresso: {frame_count}/{total_frames} frames ({progress:.1f}%)", end='', flush=True)
+            with CONTROLE.medir('detector'):
+                dets = iter(detectar_lote(model, lote_e + lote_d, rois, FUNDO, CONTROLE.imgsz) if rois else [])
+        dets_e = [next(dets) if r else None for r in rodar_e]
+        dets_d = [next(dets) if r else None for r in rodar_d]
+    else:
+        dets_e = dets_d = [None] * len(pares)
 
-    # Processar cada lado
-    out_e = process_frame(frame_e, tracker_esq, "ESQ")
-    out_d = process_frame(frame_d, tracker_dir, "DIR")
+    parar = False
+    for (frame_e, frame_d), det_e, det_d, r_e, r_d in zip(pares, dets_e, dets_d, rodar_e, rodar_d):
+        frame_count += 1
+        
+        # Verifica flag de parada a cada 30 frames (~1 segundo)
+        if frame_count % 30 == 0:
+            check_stop_flag()
+            if STOP_FLAG:
+                print(f"\n\u26a0\ufe0f  Processamento interrompido no frame {frame_count}" +
+                      (f"/{total_frames}" if not IS_STREAM else ""))
+                parar = interrompido = True
+                break
+            # Mostra progresso
+            if IS_STREAM:
+                print(f"\rFrames: {frame_count}" + _status_ao_vivo(), end='', flush=True)
+            else:
+                progress = (frame_count / total_frames) * 100
+                print(f"\rProgresso: {frame_count}/{total_frames} frames ({progress:.1f}%)", end='', flush=True)
+
+        # Anotação só quando alguém consome o resultado
+        agora = time.monotonic()
+        preview_devido = bool(PREVIEW_PATH) and agora - ultimo_preview >= PREVIEW_INTERVAL
+        anotar = (not HEADLESS_MODE) or video_writer is not None or preview_devido
+
+        # Processar cada lado (tracker próprio por câmera)
+        out_e = pipe_esq.processar(frame_e, det_e, anotar, prever=not r_e)
+        out_d = pipe_dir.processar(frame_d, det_d, anotar, prever=not r_d)
+        frames_concluidos = frame_count
+        if CONTROLE is not None:
+            CONTROLE.frame()
+
+        if not anotar:
+            continue
 
-    # Apenas mostra janela se não estiver em modo headless
-    if not HEADLESS_MODE:
         # Unificar os dois vídeos lado a lado
         combined = np.hstack((
             cv2.resize(out_e, (640, 360)), 
             cv2.resize(out_d, (640, 360))
         ))
 
-        cv2.imshow("Futebol de Terca - Analise Multi-Camera", combined)
+        if video_writer is not None:
+            video_writer.write(combined)
 
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            print("\n✓ Usuário solicitou parada")
-            break
+        if preview_devido:
+            salvar_preview(combined)
+            ultimo_preview = agora
+
+        # Apenas mostra janela se não estiver em modo headless
+        if not HEADLESS_MODE:
+            cv2.imshow("Futebol de Terca - Analise Multi-Camera", combined)
+
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                print("\n✓ Usuário solicitou parada")
+                parar = interrompido = True
+                break
+
+    # Frames (e crops, já copiados pelo gravador) não são mais usados: volta ao anel
+    for frame_e, frame_d in pares:
+        liberar_frame(cap_e, frame_e)
+        liberar_frame(cap_d, frame_d)
+
+    if CHECKPOINT_EVERY and frames_concluidos - ultimo_checkpoint >= CHECKPOINT_EVERY:
+        _salvar_checkpoint()
+        ultimo_checkpoint = frames_concluidos
+
+    if parar:
+        break
+    if fim_video:
+        print("\n✓ Fim do vídeo alcançado")
+        break
+
+# Tracks ainda abertos gravam seu top-K; depois esvazia a fila de gravação antes do resumo
+pipe_esq.finalizar()
+pipe_dir.finalizar()
+stats_gravacao = gravador.encerrar()
+
+# Parada antecipada (stop/SIGTERM/'q') → checkpoint para --resume; fim do vídeo → descarta
+interrompido = interrompido or STOP_FLAG
+if interrompido:
+    _salvar_checkpoint()
+    print(f"\n💾 Checkpoint salvo no frame {frames_concluidos}: {CHECKPOINT_PATH} (use --resume)")
+else:
+    remover_checkpoint(CHECKPOINT_PATH)
 
 print(f"\n\n{'='*60}")
 print(f"✅ Processamento finalizado!")
 print(f"{'='*60}")
 print(f"Frames processados: {frame_count}" + (f"/{total_frames}" if not IS_STREAM else " (stream)"))
 print(f"Imagens salvas em: {OUTPUT_DIR}/")
+if GATE_MODE:
+    print(f"Gate de movimento ESQ: {pipe_esq.gate.resumo()}")
+    print(f"Gate de movimento DIR: {pipe_dir.gate.resumo()}")
+if CONTROLE is not None:
+    print(f"Controle de qualidade: {CONTROLE.resumo()}")
+for _nome, _cap in (("ESQ", cap_e), ("DIR", cap_d)):
+    if isinstance(_cap, CapturaAoVivo):
+        _st = _cap.estatisticas()
+        print(f"Ao vivo {_nome}: {_st['entregues']}/{_st['lidos']} frames processados, "
+              f"{_st['descartados']} descartados, latência média {_st['latencia_media_ms']:.0f} ms "
+              f"(máx {_st['latencia_max_ms']:.0f} ms)")
+print(f"Tracks com cards: ESQ {pipe_esq.selecionador.tracks_gravados} | "
+      f"DIR {pipe_dir.selecionador.tracks_gravados} (até {TOP_K} crops por track)")
+print(f"Cards gravados: {stats_gravacao['gravados']} "
+      f"({stats_gravacao['pendentes_no_encerramento']} gravados no encerramento, "
+      f"{stats_gravacao['descartados']} descartados por fila cheia, "
+      f"{stats_gravacao['erros']} erros)")
 print(f"{'='*60}\n")
 
 cap_e.release()
 cap_d.release()
+if video_writer is not None:
+    video_writer.release()
 
 if not HEADLESS_MODE:
     cv2.destroyAllWindows()
\ No newline at end of file
@@ -16,6 +16,8 @@ import numpy as np
 from collections import defaultdict, Counter
 import shutil
 
+import banco_embeddings
+
 # Configurações
 DATASET_DIR = Path('dataset_reid')
 EMBEDDINGS_DIR = Path('embeddings_reid')
@@ -417,7 +419,7 @@ def gerar_embeddings():
     
     # Gerar embeddings para cada jogador
     EMBEDDINGS_DIR.mkdir(exist_ok=True)
-    embeddings_database = {}
+    nomes, linhas = [], []
     
     for jogador in classes:
         jogador_dir = DATASET_DIR / jogador
@@ -435,14 +437,16 @@ def gerar_embeddings():
         
         # Média dos embeddings
         avg_embedding = np.mean(embeddings_jogador, axis=0)
-        embeddings_database[jogador] = avg_embedding.tolist()
+        nomes.append(jogador)
+        linhas.append(avg_embedding.reshape(-1))
         
         print(f"   ✓ {len(embeddings_jogador)} imagens processadas")
     
-    # Salvar database
-    database_file = EMBEDDINGS_DIR / 'embeddings_database.json'
-    with open(database_file, 'w') as f:
-        json.dump(embeddings_database, f, indent=4)
+    # Salvar database: matriz .npy + manifest (banco_embeddings.py)
+    database_file = banco_embeddings.salvar(
+        EMBEDDINGS_DIR / 'embeddings_database', nomes, np.stack(linhas),
+        modelo=MODEL_PATH, modelo_hash=banco_embeddings.hash_arquivo(MODEL_PATH),
+        accuracy=checkpoint['val_acc'])
     
     # Salvar metadados
     metadata = {
@@ -461,7 +465,7 @@ def gerar_embeddings():
     print("✓ EMBEDDINGS GERADOS COM SUCESSO!")
     print("="*70)
     print(f"\n📁 Arquivos salvos em: {EMBEDDINGS_DIR}/")
-    print(f"   - embeddings_database.json ({len(classes)} jogadores)")
+    print(f"   - {database_file.name} + manifest ({len(nomes)} jogadores)")
     print(f"   - metadata.json")
     print(f"\n💡 Próximo passo: python reconhecer_com_reid.py")
 
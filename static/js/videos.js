@@ -252,6 +252,10 @@ async function processarVideos() {
     const model      = document.getElementById('cfg-model').value;
     const confidence = parseFloat(document.getElementById('cfg-confidence').value);
     const outputDir  = document.getElementById('cfg-output').value.trim() || 'jogadores_terca';
+    const aoVivo     = document.getElementById('cfg-ao-vivo').checked;
+    const retomar    = document.getElementById('cfg-retomar').checked;
+    const workers    = document.getElementById('cfg-workers').checked;
+    const alvo       = document.getElementById('cfg-alvo').value;
 
     const res  = await fetch('/api/videos/processar', {
       method: 'POST',
@@ -262,6 +266,10 @@ async function processarVideos() {
         model,
         confidence,
         output_dir: outputDir,
+        ao_vivo:    aoVivo,
+        retomar,
+        workers,
+        alvo,
       }),
     });
     const data = await res.json();
@@ -333,6 +341,11 @@ async function atualizarStatus() {
         `Capturando… (PID: ${data.pid})`;
       document.getElementById('btn-processar').classList.add('hidden');
       document.getElementById('btn-parar').classList.remove('hidden');
+      // Preview anotado (o script só desenha os frames que vão para cá)
+      const preview = document.getElementById('status-preview');
+      preview.onload  = () => preview.classList.remove('hidden');
+      preview.onerror = () => preview.classList.add('hidden');
+      preview.src = `/api/videos/preview?t=${Date.now()}`;
     } else {
       badge.textContent = '■ finalizado';
       badge.className   = 'status-badge stopped';
@@ -342,6 +355,7 @@ async function atualizarStatus() {
       document.getElementById('btn-processar').disabled = false;
       document.getElementById('btn-processar').classList.remove('hidden');
       document.getElementById('btn-parar').classList.add('hidden');
+      document.getElementById('status-preview').classList.add('hidden');
       atualizarBtnProcessar();
       clearInterval(_pollInterval);
       _pollInterval = null;